@@ -0,0 +1 @@
+"""Overhead benchmarks of bf; run with `python -m benchmarks`."""
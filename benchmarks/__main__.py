@@ -0,0 +1,80 @@
+"""Run the overhead benchmarks and print a report.
+
+Usage: python -m benchmarks [--latency 0.05] [--repeats 5] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.harness import Measurement, run_all
+
+
+def _counts(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="seconds each ssh/rsync spawn sleeps, like a network round trip",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--setups", type=_counts, default=[1, 8, 32], help="bf status fleet sizes"
+    )
+    parser.add_argument(
+        "--files", type=_counts, default=[10, 100, 1000], help="artifacts to copy"
+    )
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.latency, args.repeats, args.setups, args.files)
+    _print(results, args.latency)
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "latency_s": args.latency,
+                    "results": [result.to_dict() for result in results],
+                },
+                indent=2,
+            )
+        )
+    return 0
+
+
+def _print(results: list[Measurement], latency: float) -> None:
+    table = Table(title=f"bf overhead ({latency * 1000:.0f} ms per spawn)")
+    table.add_column("Scenario", style="bold")
+    table.add_column("Size", justify="right")
+    table.add_column("Wall", justify="right")
+    table.add_column("Overhead", justify="right")
+    table.add_column("ssh", justify="right")
+    table.add_column("rsync", justify="right")
+    table.add_column("HTTP", justify="right")
+
+    for result in results:
+        table.add_row(
+            result.scenario,
+            str(result.size),
+            f"{result.wall_s * 1000:.0f} ms",
+            f"{result.overhead_s * 1000:.0f} ms",
+            f"{result.spawns.get('ssh', 0):g}",
+            f"{result.spawns.get('rsync', 0):g}",
+            f"{result.http_requests:g}",
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""In-process stand-in for the GitLab pipelines and jobs API."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from urllib.parse import urlsplit
+
+_ENDPOINT = re.compile(r"^/api/v4/projects/(\d+)/(pipelines|jobs)$")
+
+
+class FakeGitLab:
+    """Serves `/api/v4/projects/<id>/{pipelines,jobs}` on a local port.
+
+    Every project is idle unless `busy` is set, in which case each listing
+    returns one running entry. Responses carry an ETag and conditional
+    requests are answered with 304, like GitLab does. `latency` delays
+    every response to model a distant server.
+    """
+
+    def __init__(self, latency: float = 0.0, busy: bool = False) -> None:
+        self.latency = latency
+        self.busy = busy
+        self._lock = threading.Lock()
+        self._requests: list[str] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-gitlab", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def requests(self) -> int:
+        with self._lock:
+            return len(self._requests)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+
+    def __enter__(self) -> FakeGitLab:
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _body(self, kind: str) -> bytes:
+        if not self.busy:
+            return b"[]"
+        entry = (
+            {"id": 1, "status": "running"}
+            if kind == "pipelines"
+            else {"id": 1, "name": "hil-test", "tag_list": ["hil"]}
+        )
+        return json.dumps([entry]).encode()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        gitlab = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                path = urlsplit(self.path).path
+                with gitlab._lock:
+                    gitlab._requests.append(path)
+                if gitlab.latency:
+                    time.sleep(gitlab.latency)
+
+                match = _ENDPOINT.match(path)
+                if match is None:
+                    self._reply(404, b'{"message": "404 Not Found"}')
+                    return
+                if not self.headers.get("PRIVATE-TOKEN"):
+                    self._reply(401, b'{"message": "401 Unauthorized"}')
+                    return
+
+                body = gitlab._body(match.group(2))
+                etag = f'W/"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304, b"", etag)
+                else:
+                    self._reply(200, body, etag)
+
+            def _reply(self, status: int, body: bytes, etag: str | None = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
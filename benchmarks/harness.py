@@ -0,0 +1,355 @@
+"""Overhead benchmarks of bf against local stand-ins for setups and GitLab.
+
+`ssh` and `rsync` are replaced by the shims in `shims/`, which run remote
+commands in a per-host directory under a temporary root after sleeping the
+injected latency, and log every spawn. The pipeline gate talks to an
+in-process `FakeGitLab`. Nothing leaves the machine, so what remains of a
+run's wall time beyond the injected latency is bf's own overhead.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from statistics import median
+from types import TracebackType
+from typing import Any
+from unittest.mock import patch
+
+import yaml
+
+from benchmarks.fake_gitlab import FakeGitLab
+
+SHIMS_DIR = Path(__file__).resolve().parent / "shims"
+TOKEN_ENV = "BF_BENCH_TOKEN"
+# Setups `bf status` probes at once; mirrors its thread pool.
+STATUS_WORKERS = 16
+ARTIFACT_SIZE = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class Measurement:
+    """Median cost of one repetition of a scenario."""
+
+    scenario: str
+    size: int
+    repeats: int
+    wall_s: float
+    injected_s: float
+    spawns: dict[str, float] = field(default_factory=dict)
+    http_requests: float = 0.0
+
+    @property
+    def overhead_s(self) -> float:
+        """Wall time not explained by the injected network latency."""
+        return max(self.wall_s - self.injected_s, 0.0)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "scenario": self.scenario,
+            "size": self.size,
+            "repeats": self.repeats,
+            "wall_s": round(self.wall_s, 4),
+            "injected_s": round(self.injected_s, 4),
+            "overhead_s": round(self.overhead_s, 4),
+            "spawns": self.spawns,
+            "http_requests": self.http_requests,
+        }
+
+
+class BenchEnvironment:
+    """A throwaway project, user config, cache and fleet of fake setups.
+
+    Setups are named `bench-<n>`; the "remote" home of each is
+    `<root>/remote/bench-<n>`. While entered, the process runs in the
+    project directory with the shims first on PATH.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self._stack = ExitStack()
+        self.root = Path()
+        self.gitlab = FakeGitLab()
+
+    def __enter__(self) -> BenchEnvironment:
+        self.root = Path(self._stack.enter_context(tempfile.TemporaryDirectory()))
+        self.project.mkdir()
+        self.remote_root.mkdir()
+        self.spawn_log.touch()
+
+        self._stack.enter_context(
+            patch.dict(
+                os.environ,
+                {
+                    "PATH": f"{SHIMS_DIR}{os.pathsep}{os.environ.get('PATH', '')}",
+                    "BF_BENCH_ROOT": str(self.remote_root),
+                    "BF_BENCH_SPAWN_LOG": str(self.spawn_log),
+                    "BF_BENCH_LATENCY": str(self.latency),
+                    "XDG_CACHE_HOME": str(self.root / "cache"),
+                    TOKEN_ENV: "bench-token",
+                },
+            )
+        )
+        self._stack.enter_context(
+            patch(
+                "bifrost.shared.config_manager.USER_CONFIG_DIR",
+                self.root / "user" / "config.yml",
+            )
+        )
+        self._stack.enter_context(self.gitlab)
+
+        cwd = Path.cwd()
+        os.chdir(self.project)
+        self._stack.callback(os.chdir, cwd)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._stack.close()
+
+    @property
+    def project(self) -> Path:
+        return self.root / "project"
+
+    @property
+    def remote_root(self) -> Path:
+        return self.root / "remote"
+
+    @property
+    def spawn_log(self) -> Path:
+        return self.root / "spawns.log"
+
+    def remote_home(self, setup_name: str) -> Path:
+        return self.remote_root / setup_name
+
+    def write_config(self, setups: int, transport: str = "ssh") -> None:
+        """Write the project config with `setups` setups gated by FakeGitLab.
+
+        `transport` is `ssh`, `agent` (ssh with `agent: true`) or `local`.
+        Local setups run in their would-be remote home, without the shims.
+        """
+        config = {
+            "version": 1,
+            "defaults": {"setup": "bench-0"},
+            "pipelines": {
+                "bench": {
+                    "url": self.gitlab.url,
+                    "project_id": 1,
+                    "token_env": TOKEN_ENV,
+                }
+            },
+            "setups": {
+                f"bench-{n}": self._setup_entry(f"bench-{n}", transport)
+                for n in range(setups)
+            },
+        }
+        (self.project / ".bifrost.yml").write_text(yaml.safe_dump(config))
+
+    def _setup_entry(self, name: str, transport: str) -> dict[str, Any]:
+        entry: dict[str, Any] = {"host": name, "user": "ci", "pipeline": "bench"}
+        if transport == "agent":
+            entry["agent"] = True
+        elif transport == "local":
+            home = self.remote_home(name)
+            home.mkdir(parents=True, exist_ok=True)
+            entry.update(transport="local", root=str(home))
+        return entry
+
+    def expire_gate_cache(self) -> None:
+        """Make the next gate check query GitLab, as a run minutes later would."""
+        shutil.rmtree(self.root / "cache" / "bifrost" / "gates", ignore_errors=True)
+
+    def take_spawns(self) -> Counter[str]:
+        """Subprocesses spawned through the shims since the last call."""
+        spawns = Counter(self.spawn_log.read_text().split())
+        self.spawn_log.write_text("")
+        return spawns
+
+    def measure(
+        self,
+        scenario: str,
+        size: int,
+        repeats: int,
+        once: Callable[[], None],
+        injected: Callable[[dict[str, float]], float],
+        prepare: Callable[[], None] | None = None,
+    ) -> Measurement:
+        """Time `once` over `repeats` repetitions.
+
+        `injected` turns the spawns of one repetition into the latency its
+        critical path had to sit through.
+        """
+        walls: list[float] = []
+        spawns: Counter[str] = Counter()
+        requests = 0
+        for _ in range(repeats):
+            if prepare is not None:
+                prepare()
+            self.expire_gate_cache()
+            self.take_spawns()
+            self.gitlab.reset()
+
+            started = time.perf_counter()
+            once()
+            walls.append(time.perf_counter() - started)
+
+            spawned = self.take_spawns()
+            spawns += spawned
+            requests += self.gitlab.requests
+
+        per_run = {name: count / repeats for name, count in sorted(spawns.items())}
+        return Measurement(
+            scenario=scenario,
+            size=size,
+            repeats=repeats,
+            wall_s=median(walls),
+            injected_s=injected(per_run),
+            spawns=per_run,
+            http_requests=requests / repeats,
+        )
+
+
+def bench_run(
+    env: BenchEnvironment, repeats: int, transport: str = "ssh"
+) -> Measurement:
+    """`Runner.run` of a trivial command, as `bf run -s bench-0 -- true` does."""
+    from bifrost.commands.run.runner import Runner
+    from bifrost.di import create_container
+
+    env.write_config(setups=1, transport=transport)
+
+    def fresh_process() -> None:
+        # Each bf invocation starts its own agent.
+        from bifrost.infra.agent import close_agents
+
+        close_agents()
+
+    def once() -> None:
+        container = create_container()
+        Runner(
+            container.get_config(),
+            container.get_log_store(),
+            container.get_gate_registry(),
+            container.get_lease_store(),
+        ).run("bench-0", ["true"])
+
+    return env.measure(
+        "run" if transport == "ssh" else f"run ({transport})",
+        1,
+        repeats,
+        once,
+        injected=lambda spawns: env.latency * sum(spawns.values()),
+        prepare=fresh_process if transport == "agent" else None,
+    )
+
+
+def bench_exec(env: BenchEnvironment, repeats: int) -> Measurement:
+    """`bf exec -s bench-0 -- true`, through the CLI."""
+    from typer.testing import CliRunner
+
+    from bifrost.cli.app import app
+
+    env.write_config(setups=1)
+    runner = CliRunner()
+
+    def once() -> None:
+        result = runner.invoke(app, ["exec", "-s", "bench-0", "--", "true"])
+        if result.exit_code != 0:
+            raise RuntimeError(f"bf exec failed: {result.output}")
+
+    return env.measure(
+        "exec",
+        1,
+        repeats,
+        once,
+        injected=lambda spawns: env.latency * sum(spawns.values()),
+    )
+
+
+def bench_status(env: BenchEnvironment, setups: int, repeats: int) -> Measurement:
+    """`bf status` over `setups` setups, through the CLI."""
+    from typer.testing import CliRunner
+
+    from bifrost.cli.app import app
+
+    env.write_config(setups=setups)
+    runner = CliRunner()
+
+    def once() -> None:
+        result = runner.invoke(app, ["status"])
+        if result.exit_code != 0:
+            raise RuntimeError(f"bf status failed: {result.output}")
+
+    # Each setup costs a reachability probe and a lease peek, one after the
+    # other; setups are probed STATUS_WORKERS at a time.
+    rounds = math.ceil(setups / STATUS_WORKERS)
+    return env.measure(
+        "status",
+        setups,
+        repeats,
+        once,
+        injected=lambda spawns: env.latency * 2 * rounds,
+    )
+
+
+def bench_copy_logs(env: BenchEnvironment, files: int, repeats: int) -> Measurement:
+    """`LogStore.copy_logs` of a run with `files` artifacts of 4 KiB."""
+    from bifrost.di import create_container
+
+    env.write_config(setups=1)
+    container = create_container()
+    setup = container.get_config().setups["bench-0"]
+    log_store = container.get_log_store()
+    run_id = f"copy-{files}"
+
+    artifacts = env.remote_home("bench-0") / setup.logs.remote_log_dir / run_id
+    for n in range(files):
+        path = artifacts / f"part-{n % 10}" / f"artifact-{n}.log"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(ARTIFACT_SIZE))
+
+    def prepare() -> None:
+        shutil.rmtree(log_store.local_log_dir(setup) / run_id, ignore_errors=True)
+
+    def once() -> None:
+        copied = log_store.copy_logs(setup, run_id)
+        if len(copied) != files:
+            raise RuntimeError(f"copied {len(copied)} of {files} artifacts")
+
+    return env.measure(
+        "copy_logs",
+        files,
+        repeats,
+        once,
+        injected=lambda spawns: env.latency * sum(spawns.values()),
+        prepare=prepare,
+    )
+
+
+def run_all(
+    latency: float,
+    repeats: int,
+    setup_counts: list[int],
+    file_counts: list[int],
+) -> list[Measurement]:
+    with BenchEnvironment(latency=latency) as env:
+        results = [
+            bench_run(env, repeats, transport)
+            for transport in ("ssh", "agent", "local")
+        ]
+        results.append(bench_exec(env, repeats))
+        results += [bench_status(env, count, repeats) for count in setup_counts]
+        results += [bench_copy_logs(env, count, repeats) for count in file_counts]
+    return results
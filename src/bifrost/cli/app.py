@@ -1,11 +1,129 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+from typing import Any
+
 import typer
+import typer.main
 from rich.console import Console
+from typer.core import TyperCommand, TyperGroup
 
 from bifrost.di import create_container
-from bifrost.shared import BifrostError
+from bifrost.shared.errors import BifrostError
+
+# name -> (module, attribute, help). The attribute is a command function or a
+# Typer sub-app; help is shown in `bf --help` without importing the module.
+LAZY_COMMANDS: dict[str, tuple[str, str, str]] = {
+    "bisect": (
+        "bifrost.commands.bisect.command",
+        "bisect",
+        "Find the first bad commit by running a command remotely.",
+    ),
+    "run": ("bifrost.commands.run.command", "run", "Run a command on a remote setup."),
+    "attach": (
+        "bifrost.commands.run.detached",
+        "attach",
+        "Stream the output of a detached run until it exits.",
+    ),
+    "wait": (
+        "bifrost.commands.run.detached",
+        "wait",
+        "Wait for a detached run to exit and copy back its logs.",
+    ),
+    "cancel": (
+        "bifrost.commands.run.detached",
+        "cancel",
+        "Stop a detached run and copy back its logs.",
+    ),
+    "exec": (
+        "bifrost.commands.exec.command",
+        "exec_command",
+        "Run a quick command on a setup and stream its output.",
+    ),
+    "ssh": (
+        "bifrost.commands.ssh.command",
+        "ssh",
+        "Open an interactive SSH session to a setup.",
+    ),
+    "status": (
+        "bifrost.commands.status.command",
+        "status",
+        "Show CI pipeline state and setup reachability.",
+    ),
+    "setups": (
+        "bifrost.commands.status.command",
+        "setups",
+        "List all configured setups.",
+    ),
+    "stats": (
+        "bifrost.commands.stats.command",
+        "stats",
+        "Show run latency and reliability per setup and command.",
+    ),
+    "logs": (
+        "bifrost.commands.logs",
+        "logs_app",
+        "Inspect logs still being copied in the background",
+    ),
+    "daemon": (
+        "bifrost.commands.daemon",
+        "daemon_app",
+        "Run bf commands from a warm background process",
+    ),
+    "config": (
+        "bifrost.commands.config",
+        "config_app",
+        "Manage setup configurations",
+    ),
+    "pipeline": (
+        "bifrost.commands.pipeline",
+        "pipeline_app",
+        "Manage CI/CD pipeline integration",
+    ),
+}
+
+
+class LazyGroup(TyperGroup):
+    """Root group that imports a command's module only when it is invoked.
+
+    Listing commands (`bf --help`) uses placeholders built from
+    `LAZY_COMMANDS`, so startup does not pay for httpx, YAML or rich tables
+    unless the invoked command needs them.
+    """
+
+    def list_commands(self, ctx: Any) -> list[str]:
+        return list(dict.fromkeys([*super().list_commands(ctx), *LAZY_COMMANDS]))
+
+    def get_command(self, ctx: Any, cmd_name: str) -> Any:
+        command = super().get_command(ctx, cmd_name)
+        if command is None and cmd_name in LAZY_COMMANDS:
+            _, _, help_text = LAZY_COMMANDS[cmd_name]
+            return TyperCommand(name=cmd_name, help=help_text)
+        return command
+
+    def resolve_command(self, ctx: Any, args: list[str]) -> Any:
+        if args and args[0] in LAZY_COMMANDS and args[0] not in self.commands:
+            self.add_command(load_command(args[0]), args[0])
+        return super().resolve_command(ctx, args)
+
+
+def load_command(name: str) -> Any:
+    """Import the module of command `name` and build its click command."""
+    module_name, attribute, _ = LAZY_COMMANDS[name]
+    target = getattr(importlib.import_module(module_name), attribute)
+    if isinstance(target, typer.Typer):
+        return typer.main.get_group(target)
+
+    single = typer.Typer(add_completion=False)
+    single.command(name=name)(target)
+    return typer.main.get_command(single)
+
 
 app = typer.Typer(
     name="bf",
+    cls=LazyGroup,
     help="Bifrost — bridge between local dev and remote test setups.",
     no_args_is_help=True,
 )
@@ -39,23 +157,38 @@ def callback(
         is_eager=True,
         help="Show version and exit",
     ),
+    trace: Path | None = typer.Option(  # noqa: B008
+        None,
+        "--trace",
+        help="Write a Chrome trace of every ssh, rsync and GitLab call to this file",
+    ),
 ) -> None:
     """Initialize dependency injection container."""
     ctx.obj = create_container()
+    if trace is not None:
+        _start_trace(ctx, trace)
 
 
-def main() -> None:
-    import bifrost.commands.run.command
-    import bifrost.commands.ssh.command
-    import bifrost.commands.status.command  # noqa: F401
-    from bifrost.commands.config import config_app
-    from bifrost.commands.pipeline import pipeline_app
+def _start_trace(ctx: typer.Context, path: Path) -> None:
+    """Record external calls until the command finishes, then write them."""
+    from bifrost.infra.trace import start_tracing, stop_tracing
 
-    app.add_typer(config_app)
-    app.add_typer(pipeline_app)
+    recorder = start_tracing()
+    command_start = recorder.now_us()
 
+    def write_trace() -> None:
+        recorder.complete(f"bf {ctx.invoked_subcommand}", "command", command_start, {})
+        stop_tracing()
+        recorder.write(path)
+        Console(stderr=True).print(f"[dim]Trace written to {path}[/dim]")
+
+    ctx.call_on_close(write_trace)
+
+
+def main() -> None:
     try:
         app()
     except BifrostError as e:
         Console(stderr=True).print(f"[red]Error:[/red] {e.message}")
-        raise typer.Exit(code=e.exit_code) from None
+        # Outside of the click context typer.Exit is a plain exception.
+        sys.exit(e.exit_code)
@@ -0,0 +1,135 @@
+"""Shell completion of setup, pipeline and pool names.
+
+`complete_names` answers the common case, completing a name after `--setup`,
+`--pipeline`, `--any` or as the argument of `bf config edit` and friends,
+from the name cache, before typer, rich or YAML are imported. Everything
+else, and any name request the cache cannot answer, falls through to the
+full app, whose name options use the `complete_*` callbacks below.
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+import sys
+
+from bifrost.infra.name_cache import read_names
+
+COMPLETE_VAR = "_BF_COMPLETE"
+
+# Options taking a name, and the kind of name.
+NAME_OPTIONS = {
+    "--setup": "setups",
+    "-s": "setups",
+    "--pipeline": "pipelines",
+    "--any": "pools",
+}
+# Commands whose argument is an existing name.
+NAME_ARGUMENTS = {
+    ("config", "edit"): "setups",
+    ("config", "remove"): "setups",
+    ("config", "set-default"): "setups",
+    ("pipeline", "edit"): "pipelines",
+    ("pipeline", "remove"): "pipelines",
+}
+
+
+def complete_names() -> bool:
+    """Print completions for a name from the cache.
+
+    Returns False if this is not a completion request for a name, or the
+    cached names are missing or stale; the full app must handle it then.
+    """
+    shell = os.environ.get(COMPLETE_VAR, "")
+    words = _completion_words(shell)
+    if words is None:
+        return False
+    args, incomplete = words
+
+    kind = _name_kind(args)
+    if kind is None:
+        return False
+    names = read_names(os.getcwd())
+    if names is None:
+        return False
+
+    matches = [name for name in names.get(kind, []) if name.startswith(incomplete)]
+    if shell == "complete_bash":
+        output = "\n".join(matches)
+    elif shell == "complete_zsh":
+        values = "\n".join(f'"{_zsh_escape(match)}"' for match in matches)
+        output = f"_arguments '*: :(({values}))'" if matches else "_files"
+    elif os.environ.get("_TYPER_COMPLETE_FISH_ACTION") == "is-args":
+        sys.exit(0 if matches else 1)
+    else:
+        output = "\n".join(matches)
+    print(output)
+    return True
+
+
+def complete_setups(incomplete: str) -> list[str]:
+    return _complete("setups", incomplete)
+
+
+def complete_pipelines(incomplete: str) -> list[str]:
+    return _complete("pipelines", incomplete)
+
+
+def complete_pools(incomplete: str) -> list[str]:
+    return _complete("pools", incomplete)
+
+
+def _complete(kind: str, incomplete: str) -> list[str]:
+    """Completion callback of the full app.
+
+    Reading the config refreshes the name cache for the next <Tab>.
+    """
+    from bifrost.infra.name_cache import config_names
+    from bifrost.shared import BifrostError, ConfigManager
+
+    names = read_names(os.getcwd())
+    if names is None:
+        try:
+            names = config_names(ConfigManager().read_config())
+        except BifrostError:
+            return []
+    return [name for name in names.get(kind, []) if name.startswith(incomplete)]
+
+
+def _completion_words(shell: str) -> tuple[list[str], str] | None:
+    """The words before the cursor (without `bf`) and the word being typed.
+
+    The environment is read the way typer's completion classes read it.
+    """
+    try:
+        if shell == "complete_bash":
+            words = shlex.split(os.environ["COMP_WORDS"])
+            cword = int(os.environ["COMP_CWORD"])
+            incomplete = words[cword] if cword < len(words) else ""
+            return words[1:cword], incomplete
+        if shell in ("complete_zsh", "complete_fish"):
+            line = os.environ.get("_TYPER_COMPLETE_ARGS", "")
+            args = shlex.split(line)[1:]
+            if args and not line.endswith(" "):
+                return args[:-1], args[-1]
+            return args, ""
+    except (KeyError, ValueError):
+        # Unbalanced quotes and the like; leave them to the full app.
+        return None
+    return None
+
+
+def _name_kind(args: list[str]) -> str | None:
+    if args and args[-1] in NAME_OPTIONS:
+        return NAME_OPTIONS[args[-1]]
+    return NAME_ARGUMENTS.get((args[0], args[1])) if len(args) == 2 else None
+
+
+def _zsh_escape(value: str) -> str:
+    return (
+        value.replace('"', '""')
+        .replace("'", "''")
+        .replace("$", "\\$")
+        .replace("`", "\\`")
+        .replace(":", r"\\:")
+    )
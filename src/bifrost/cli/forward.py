@@ -0,0 +1,130 @@
+"""Thin client of the bf daemon.
+
+When `bf daemon` is running, `bf` forwards the command line to it instead of
+importing the app: the daemon forks an already warm copy of itself that
+runs the command in the caller's directory and environment, writing
+straight to the caller's terminal through the stdin, stdout and stderr
+passed along with the request. Ctrl-C is relayed to the command, and its
+exit code becomes bf's.
+
+Everything here must stay cheap to import: it runs before typer, rich or
+YAML are loaded, and returns None whenever bf should run in-process.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+import bifrost
+from bifrost.infra.agent_server import FRAME_PREFIX, pack_frame
+from bifrost.infra.cache import cache_dir
+
+# Set to run every command in-process even if a daemon is running.
+NO_DAEMON_VAR = "BF_NO_DAEMON"
+# Commands that always run in-process: the daemon's own, and interactive
+# sessions, which need the caller's controlling terminal.
+IN_PROCESS_COMMANDS = frozenset({"daemon", "ssh"})
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+def daemon_socket_path() -> Path:
+    return cache_dir() / "daemon.sock"
+
+
+def daemon_key() -> str:
+    """Identifies the bifrost installation; a daemon of another one is not used."""
+    package = Path(bifrost.__file__)
+    return f"{sys.executable}:{package}:{package.stat().st_mtime_ns}"
+
+
+def forward_to_daemon(args: list[str]) -> int | None:
+    """Run `bf args` in the daemon; its exit code, or None to run in-process."""
+    if os.environ.get(NO_DAEMON_VAR) or not args or args[0] in IN_PROCESS_COMMANDS:
+        return None
+    sock = connect_daemon()
+    if sock is None:
+        return None
+
+    with sock:
+        request = {
+            "op": "run",
+            "key": daemon_key(),
+            "argv": args,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        }
+        try:
+            socket.send_fds(sock, [pack_frame(request)], [0, 1, 2])
+        except OSError:
+            return None
+
+        previous = {
+            signum: signal.signal(signum, _relay_to(sock))
+            for signum in FORWARDED_SIGNALS
+        }
+        try:
+            reply = read_frame(sock)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    if reply is None:
+        print("bf: the daemon exited while running the command", file=sys.stderr)
+        return 1
+    if reply.get("type") != "exit":
+        # A daemon of another bifrost installation, or one shutting down.
+        return None
+    return int(reply["code"])
+
+
+def connect_daemon() -> socket.socket | None:
+    path = daemon_socket_path()
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def read_frame(sock: socket.socket) -> dict[str, Any] | None:
+    """Read one frame's header; None if the connection closed first."""
+    prefix = _read_exactly(sock, FRAME_PREFIX.size)
+    if prefix is None:
+        return None
+    (length,) = FRAME_PREFIX.unpack(prefix)
+    header = _read_exactly(sock, length)
+    if header is None:
+        return None
+    decoded: dict[str, Any] = json.loads(header)
+    return decoded
+
+
+def _read_exactly(sock: socket.socket, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _relay_to(sock: socket.socket) -> Any:
+    def relay(signum: int, frame: Any) -> None:
+        # The command's process group does not own the terminal, so
+        # Ctrl-C reaches it only through here.
+        with suppress(OSError):
+            sock.sendall(pack_frame({"op": "signal", "signal": signum}))
+
+    return relay
@@ -0,0 +1,25 @@
+"""Console script entry point.
+
+Shell completion runs `bf` on every <Tab>. Names are answered here from the
+completion name cache, before the app and its dependencies are imported.
+With a bf daemon running, commands are forwarded to it before that, too.
+"""
+
+from __future__ import annotations
+
+import sys
+
+from bifrost.cli.completion import complete_names
+from bifrost.cli.forward import forward_to_daemon
+
+
+def main() -> None:
+    if complete_names():
+        return
+    code = forward_to_daemon(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+
+    from bifrost.cli.app import main as run_app
+
+    run_app()
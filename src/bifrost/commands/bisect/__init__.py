@@ -0,0 +1,9 @@
+from bifrost.commands.bisect.bisector import Bisector, BisectResult, BisectStep
+from bifrost.commands.bisect.command import bisect
+
+__all__ = [
+    "BisectResult",
+    "BisectStep",
+    "Bisector",
+    "bisect",
+]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from bifrost.commands.run.runner import Runner, new_run_id
+from bifrost.infra.git_ops import fetch_all, list_commits
+from bifrost.infra.transport import shared_connection
+from bifrost.shared import ConfigError, RunMetadata
+
+
+@dataclass(frozen=True, slots=True)
+class BisectStep:
+    round: int
+    commit: str
+    metadata: RunMetadata
+
+    @property
+    def is_good(self) -> bool:
+        return self.metadata.exit_code == 0
+
+
+@dataclass(frozen=True, slots=True)
+class BisectResult:
+    first_bad: str
+    rounds: int
+    steps: list[BisectStep] = field(default_factory=list)
+
+
+class Bisector:
+    """Finds the first bad commit by running a command on one or more setups.
+
+    With k setups, each round tests k evenly spaced candidates concurrently,
+    one per setup, shrinking the range to 1/(k+1) of its size (k-ary bisection).
+    The setups' leases are held for the whole bisection.
+    """
+
+    def __init__(self, runner: Runner) -> None:
+        self._runner = runner
+
+    def bisect(
+        self,
+        good: str,
+        bad: str,
+        setup_names: list[str] | None = None,
+        command: list[str] | None = None,
+        latest: bool = False,
+        force: bool = False,
+        on_step: Callable[[BisectStep], None] | None = None,
+    ) -> BisectResult:
+        setups = self._runner.resolve_setups(setup_names)
+        resolved_command = self._runner.resolve_command(setups[0], command)
+
+        with ExitStack() as stack:
+            for setup in setups:
+                stack.enter_context(shared_connection(setup))
+                stack.enter_context(self._runner.lease(setup, new_run_id()))
+
+            if latest:
+                for setup in setups:
+                    fetch_all(setup)
+
+            commits = list_commits(setups[0], good, bad)
+            if not commits:
+                raise ConfigError(f"No commits between '{good}' and '{bad}'")
+
+            # Invariant: commits[good_index] passes (-1 is `good` itself) and
+            # commits[bad_index] fails.
+            good_index, bad_index = -1, len(commits) - 1
+            steps: list[BisectStep] = []
+            rounds = 0
+
+            with ThreadPoolExecutor(max_workers=len(setups)) as pool:
+                while bad_index - good_index > 1:
+                    rounds += 1
+                    probes = _pick_probes(good_index, bad_index, len(setups))
+                    assignments = list(zip(probes, setups[: len(probes)], strict=True))
+                    if not force:
+                        for _, setup in assignments:
+                            self._runner.check_gate(setup)
+
+                    futures = [
+                        pool.submit(
+                            self._runner.execute,
+                            setup,
+                            resolved_command,
+                            run_id=new_run_id(),
+                            ref=commits[index],
+                        )
+                        for index, setup in assignments
+                    ]
+
+                    round_steps = []
+                    for (index, _), future in zip(assignments, futures, strict=True):
+                        step = BisectStep(
+                            round=rounds,
+                            commit=commits[index],
+                            metadata=future.result(),
+                        )
+                        round_steps.append(step)
+                        if on_step is not None:
+                            on_step(step)
+                    steps.extend(round_steps)
+
+                    for index, step in zip(probes, round_steps, strict=True):
+                        if not step.is_good:
+                            bad_index = index
+                            break
+                        good_index = index
+
+        return BisectResult(first_bad=commits[bad_index], rounds=rounds, steps=steps)
+
+
+def _pick_probes(good_index: int, bad_index: int, k: int) -> list[int]:
+    """Up to `k` distinct, evenly spaced indices strictly between the bounds."""
+    span = bad_index - good_index
+    count = min(k, span - 1)
+    return [good_index + span * (i + 1) // (count + 1) for i in range(count)]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import typer
+from rich.console import Console
+
+from bifrost.cli.completion import complete_setups
+from bifrost.commands.bisect.bisector import Bisector, BisectStep
+from bifrost.commands.run.command import create_runner
+
+console = Console()
+
+
+def bisect(
+    ctx: typer.Context,
+    good: str = typer.Option(..., "--good", "-g", help="Known good git ref"),
+    bad: str = typer.Option(..., "--bad", "-b", help="Known bad git ref"),
+    setup: list[str] | None = typer.Option(  # noqa: B008
+        None,
+        "--setup",
+        "-s",
+        help="Target setup name (repeat to test candidates on several in parallel)",
+        autocompletion=complete_setups,
+    ),
+    latest: bool = typer.Option(
+        False, "--latest", "-l", help="Fetch latest changes before bisecting"
+    ),
+    force: bool = typer.Option(False, "--force", "-f", help="Skip CI gate check"),
+    command: list[str] | None = typer.Argument(  # noqa: B008
+        None, help="Command deciding good (exit 0) or bad (non-zero), after --"
+    ),
+) -> None:
+    """Find the first bad commit by running a command remotely."""
+    runner = create_runner(ctx)
+
+    result = Bisector(runner).bisect(
+        good=good,
+        bad=bad,
+        setup_names=setup or None,
+        command=command or None,
+        latest=latest,
+        force=force,
+        on_step=_print_step,
+    )
+
+    console.print(
+        f"[bold]First bad commit:[/bold] {result.first_bad} "
+        f"({len(result.steps)} run(s) in {result.rounds} round(s))"
+    )
+
+
+def _print_step(step: BisectStep) -> None:
+    verdict = "[green]good[/green]" if step.is_good else "[red]bad[/red]"
+    console.print(
+        f"  round {step.round}: {step.commit[:12]} {verdict} "
+        f"on {step.metadata.setup} (run: {step.metadata.run_id})"
+    )
@@ -1,6 +1,7 @@
 """Config command group and subcommands."""
 
 from bifrost.commands.config.add import add_setup
+from bifrost.commands.config.apply import apply_changes
 from bifrost.commands.config.command import config_app
 from bifrost.commands.config.edit import edit_setup
 from bifrost.commands.config.list import list_setups
@@ -9,6 +10,7 @@ from bifrost.commands.config.set_default import set_default_setup
 
 __all__ = [
     "add_setup",
+    "apply_changes",
     "config_app",
     "edit_setup",
     "list_setups",
@@ -5,14 +5,17 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_pipelines
 from bifrost.commands.config.command import config_app
 from bifrost.di import Container
 from bifrost.shared import (
     BifrostConfig,
+    CiConfig,
     ConfigError,
     LogConfig,
     SetupConfig,
 )
+from bifrost.shared.selector import parse_label
 
 console = Console()
 err_console = Console(stderr=True)
@@ -33,7 +36,22 @@ def add_setup(
         None, "--local-log-dir", help="Local log directory"
     ),
     pipeline: str | None = typer.Option(
-        None, "--pipeline", help="Pipeline configuration name"
+        None,
+        "--pipeline",
+        help="Pipeline configuration name",
+        autocompletion=complete_pipelines,
+    ),
+    ci_tag: list[str] | None = typer.Option(  # noqa: B008
+        None, "--ci-tag", help="Runner tag of CI jobs using this setup (repeatable)"
+    ),
+    ci_job: list[str] | None = typer.Option(  # noqa: B008
+        None, "--ci-job", help="CI job name or glob using this setup (repeatable)"
+    ),
+    pool: list[str] | None = typer.Option(  # noqa: B008
+        None, "--pool", help="Pool this setup belongs to (repeatable)"
+    ),
+    label: list[str] | None = typer.Option(  # noqa: B008
+        None, "--label", help="Label as key=value (repeatable)"
     ),
 ) -> None:
     """Add a new setup configuration."""
@@ -72,6 +90,9 @@ def add_setup(
         runner=runner,
         logs=logs,
         pipeline=pipeline,
+        ci=CiConfig(tags=tuple(ci_tag or ()), jobs=tuple(ci_job or ())),
+        pools=tuple(pool or ()),
+        labels=dict(map(parse_label, label or ())),
     )
 
     if config is None:
@@ -0,0 +1,103 @@
+"""Apply a batch of setup and pipeline changes."""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import typer
+from rich.console import Console
+
+from bifrost.commands.config.command import config_app
+from bifrost.di import Container
+from bifrost.infra.utils import as_mapping
+from bifrost.shared import BifrostConfig, ConfigError, PipelineConfig, SetupConfig
+
+console = Console()
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigChanges:
+    """Setups and pipelines to add or replace (a config) or remove (None)."""
+
+    setups: dict[str, SetupConfig | None] = field(default_factory=dict)
+    pipelines: dict[str, PipelineConfig | None] = field(default_factory=dict)
+    default_setup: str | None = None
+
+    @classmethod
+    def from_mapping(cls, raw: Any) -> ConfigChanges:
+        data = as_mapping(raw, what="Config changes")
+        setups = {
+            name: None if value is None else SetupConfig.from_mapping(name, value)
+            for name, value in as_mapping(data.get("setups"), what="setups").items()
+        }
+        pipelines = {
+            name: None if value is None else PipelineConfig.from_mapping(value)
+            for name, value in as_mapping(
+                data.get("pipelines"), what="pipelines"
+            ).items()
+        }
+        defaults = as_mapping(data.get("defaults"), what="defaults")
+        default_setup = defaults.get("setup")
+        if default_setup is not None and not isinstance(default_setup, str):
+            raise ConfigError("defaults.setup must be a string")
+        return cls(setups=setups, pipelines=pipelines, default_setup=default_setup)
+
+    @property
+    def count(self) -> int:
+        return len(self.setups) + len(self.pipelines) + (self.default_setup is not None)
+
+    def apply(self, config: BifrostConfig) -> BifrostConfig:
+        setups = dict(config.setups)
+        for name, setup in self.setups.items():
+            if setup is None:
+                setups.pop(name, None)
+            else:
+                setups[name] = setup
+
+        pipelines = dict(config.pipelines)
+        for name, pipeline in self.pipelines.items():
+            if pipeline is None:
+                pipelines.pop(name, None)
+            else:
+                pipelines[name] = pipeline
+
+        default_setup = config.default_setup
+        if default_setup not in setups:
+            default_setup = None
+        if self.default_setup is not None:
+            default_setup = self.default_setup
+
+        # Dangling references are rejected when the result is written.
+        return BifrostConfig(
+            setups=setups, default_setup=default_setup, pipelines=pipelines
+        )
+
+
+@config_app.command("apply")
+def apply_changes(
+    ctx: typer.Context,
+    file: str = typer.Argument(
+        ...,
+        help="YAML file of setups and pipelines to change (- for stdin)",
+    ),
+) -> None:
+    """Apply many setup and pipeline changes in a single write."""
+    import yaml
+
+    container: Container = ctx.obj
+    config_manager = container.get_config_manager()
+
+    try:
+        text = sys.stdin.read() if file == "-" else Path(file).read_text()
+        raw = yaml.safe_load(text)
+    except OSError as e:
+        raise ConfigError(f"Cannot read changes file {file}: {e}") from e
+    except yaml.YAMLError as e:
+        raise ConfigError(f"Invalid YAML in {file}: {e}") from e
+
+    changes = ConfigChanges.from_mapping(raw)
+    config_manager.update_config(changes.apply)
+    console.print(f"[green]Applied {changes.count} change(s)[/green]")
@@ -5,9 +5,11 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_setups
 from bifrost.commands.config.command import config_app
 from bifrost.di import Container
-from bifrost.shared import BifrostConfig, LogConfig, SetupConfig
+from bifrost.shared import BifrostConfig, CiConfig, LogConfig, SetupConfig
+from bifrost.shared.selector import parse_label
 
 console = Console()
 err_console = Console(stderr=True)
@@ -16,7 +18,9 @@ err_console = Console(stderr=True)
 @config_app.command("edit")
 def edit_setup(
     ctx: typer.Context,
-    name: str = typer.Argument(..., help="Setup name to edit"),
+    name: str = typer.Argument(
+        ..., help="Setup name to edit", autocompletion=complete_setups
+    ),
     host: str | None = typer.Option(None, "--host", help="New SSH hostname or IP"),
     user: str | None = typer.Option(None, "--user", help="New SSH username"),
     port: int | None = typer.Option(None, "--port", help="New SSH port"),
@@ -27,6 +31,18 @@ def edit_setup(
     local_log_dir: str | None = typer.Option(
         None, "--local-log-dir", help="New local log directory"
     ),
+    ci_tag: list[str] | None = typer.Option(  # noqa: B008
+        None, "--ci-tag", help="New runner tags of CI jobs using this setup"
+    ),
+    ci_job: list[str] | None = typer.Option(  # noqa: B008
+        None, "--ci-job", help="New CI job names or globs using this setup"
+    ),
+    pool: list[str] | None = typer.Option(  # noqa: B008
+        None, "--pool", help="New pools this setup belongs to"
+    ),
+    label: list[str] | None = typer.Option(  # noqa: B008
+        None, "--label", help="New labels as key=value (replaces all)"
+    ),
 ) -> None:
     """Edit an existing setup configuration."""
     container: Container = ctx.obj
@@ -50,12 +66,19 @@ def edit_setup(
         runner=runner if runner is not None else setup.runner,
         logs=new_logs,
         pipeline=setup.pipeline,
+        ci=CiConfig(
+            tags=tuple(ci_tag) if ci_tag else setup.ci.tags,
+            jobs=tuple(ci_job) if ci_job else setup.ci.jobs,
+        ),
+        pools=tuple(pool) if pool else setup.pools,
+        labels=dict(map(parse_label, label)) if label else setup.labels,
     )
 
     new_setups = {**config.setups, name: new_setup}
     new_config = BifrostConfig(
         setups=new_setups,
         default_setup=config.default_setup,
+        pipelines=config.pipelines,
     )
 
     config_manager.write_config(new_config)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_setups
 from bifrost.commands.config.command import config_app
 from bifrost.di import Container
 from bifrost.shared import BifrostConfig
@@ -16,7 +17,9 @@ err_console = Console(stderr=True)
 @config_app.command("remove")
 def remove_setup(
     ctx: typer.Context,
-    name: str = typer.Argument(..., help="Setup name to remove"),
+    name: str = typer.Argument(
+        ..., help="Setup name to remove", autocompletion=complete_setups
+    ),
 ) -> None:
     """Remove a setup configuration."""
     container: Container = ctx.obj
@@ -36,6 +39,7 @@ def remove_setup(
     new_config = BifrostConfig(
         setups=new_setups,
         default_setup=new_default,
+        pipelines=config.pipelines,
     )
 
     config_manager.write_config(new_config)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_setups
 from bifrost.commands.config.command import config_app
 from bifrost.di import Container
 from bifrost.shared import BifrostConfig
@@ -16,7 +17,9 @@ err_console = Console(stderr=True)
 @config_app.command("set-default")
 def set_default_setup(
     ctx: typer.Context,
-    name: str = typer.Argument(..., help="Setup name to set as default"),
+    name: str = typer.Argument(
+        ..., help="Setup name to set as default", autocompletion=complete_setups
+    ),
 ) -> None:
     """Set the default setup."""
     container: Container = ctx.obj
@@ -33,6 +36,7 @@ def set_default_setup(
     new_config = BifrostConfig(
         setups=config.setups,
         default_setup=name,
+        pipelines=config.pipelines,
     )
 
     config_manager.write_config(new_config)
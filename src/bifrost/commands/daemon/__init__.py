@@ -0,0 +1,5 @@
+"""The bf daemon and the commands managing it."""
+
+from bifrost.commands.daemon.command import daemon_app
+
+__all__ = ["daemon_app"]
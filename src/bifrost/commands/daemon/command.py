@@ -0,0 +1,116 @@
+"""Daemon command group: start, stop and inspect the bf daemon."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any
+
+import typer
+from rich.console import Console
+
+from bifrost.cli.forward import connect_daemon, daemon_socket_path, read_frame
+from bifrost.infra.agent_server import pack_frame
+from bifrost.infra.cache import cache_dir
+
+console = Console()
+
+# Seconds `bf daemon start` waits for the daemon to accept commands.
+START_TIMEOUT = 10.0
+
+daemon_app = typer.Typer(
+    name="daemon",
+    help="Run bf commands from a warm background process",
+    no_args_is_help=True,
+)
+
+
+def daemon_request(op: str) -> dict[str, Any] | None:
+    """Send `op` to the running daemon; its reply, or None if none is running."""
+    sock = connect_daemon()
+    if sock is None:
+        return None
+    with sock:
+        try:
+            sock.sendall(pack_frame({"op": op}))
+            return read_frame(sock)
+        except OSError:
+            return None
+
+
+@daemon_app.command("start")
+def start(
+    foreground: bool = typer.Option(
+        False, "--foreground", help="Serve in this process instead of detaching"
+    ),
+) -> None:
+    """Start the daemon; later bf commands are forwarded to it."""
+    running = daemon_request("status")
+    if running is not None:
+        console.print(
+            f"[yellow]bf daemon is already running[/yellow] (pid {running['pid']})"
+        )
+        return
+
+    if foreground:
+        from bifrost.commands.daemon.server import Daemon
+
+        Daemon(daemon_socket_path()).serve()
+        return
+
+    log_path = cache_dir() / "daemon.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "bifrost.commands.daemon.server"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            cwd="/",
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = daemon_request("status")
+        if status is not None:
+            console.print(f"[green]bf daemon started[/green] (pid {status['pid']})")
+            return
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    console.print(f"[red]Error:[/red] bf daemon did not start, see {log_path}")
+    raise typer.Exit(code=1)
+
+
+@daemon_app.command("stop")
+def stop() -> None:
+    """Stop the daemon once the commands it is running finish."""
+    if daemon_request("stop") is None:
+        console.print("[yellow]bf daemon is not running[/yellow]")
+        return
+    console.print("[green]bf daemon stopped[/green]")
+
+
+@daemon_app.command("status")
+def status() -> None:
+    """Show whether the daemon runs, and what it keeps warm."""
+    state = daemon_request("status")
+    if state is None:
+        console.print("bf daemon is not running")
+        raise typer.Exit(code=1)
+
+    started = datetime.fromtimestamp(state["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    console.print(f"[green]bf daemon is running[/green] (pid {state['pid']})")
+    console.print(f"  Started:     {started}")
+    console.print(
+        f"  Commands:    {state['served']} served, {len(state['running'])} running"
+    )
+    for argv in state["running"]:
+        console.print(f"    bf {' '.join(argv)}")
+    connections = ", ".join(state["connections"]) or "-"
+    console.print(f"  Connections: {connections}")
+    pipelines = ", ".join(state["pipelines"]) or "-"
+    console.print(f"  Pipelines:   {pipelines}")
@@ -0,0 +1,574 @@
+"""The bf daemon: runs forwarded commands from a warm process.
+
+The daemon imports bf's dependencies once, holds a master ssh connection per
+setup and refreshes the gate answers of recently used pipelines in the shared
+gate cache. For every command it forks: the child inherits all of that, reads
+the project's config, takes over the caller's stdin, stdout and stderr, and
+runs the command as `bf` would have. The parent only ever does bookkeeping
+that cannot block: it learns each command's config from a pipe the child
+writes it to, and forks a short-lived child to refresh the gates. So one slow
+or crashing command, config or GitLab cannot stall the others.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import suppress
+from io import TextIOWrapper
+from pathlib import Path
+from typing import Any
+
+from bifrost.cli.forward import daemon_key, read_frame
+from bifrost.infra.agent_server import FRAME_PREFIX, pack_frame
+from bifrost.infra.cache import locked
+from bifrost.infra.pipeline_gate import (
+    GATE_CACHE_TTL,
+    GitLabPipelineGate,
+    forget_http_client,
+)
+from bifrost.infra.ssh import close_master, master_command, route_connections
+from bifrost.shared import (
+    BifrostConfig,
+    BifrostError,
+    CiConfig,
+    ConfigManager,
+    PipelineConfig,
+    SetupConfig,
+)
+
+# Seconds between refreshes of the gate answers of recently used pipelines;
+# commands then find them fresh in the gate cache and skip GitLab.
+GATE_REFRESH_INTERVAL = GATE_CACHE_TTL / 2
+# A pipeline no command used for this long is no longer refreshed.
+GATE_WARM_FOR = 600.0
+# Seconds before connecting again to a setup whose master connection failed.
+RECONNECT_AFTER = 60.0
+# Seconds a client has to send its request.
+REQUEST_TIMEOUT = 5.0
+# Imported before the first fork. Command modules are not: they create their
+# consoles at import, and those must detect the caller's terminal.
+PRELOADED_MODULES = (
+    "httpx",
+    "rich.console",
+    "rich.live",
+    "rich.table",
+    "typer",
+    "yaml",
+    "bifrost.cli.app",
+    "bifrost.infra.agent",
+    "bifrost.infra.git_ops",
+    "bifrost.infra.lease",
+    "bifrost.infra.log_store",
+    "bifrost.infra.transport",
+)
+
+
+class _Master:
+    """The daemon's master ssh connection to one `user@host`."""
+
+    def __init__(self, setup: SetupConfig) -> None:
+        self.setup = setup
+        self.control_dir = tempfile.mkdtemp(prefix="bf-daemon-ssh-")
+        self.control_path = str(Path(self.control_dir) / "control")
+        self.failed_at: float | None = None
+        self.connecting: subprocess.Popen[bytes] | None = subprocess.Popen(
+            master_command(setup, self.control_path),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self.connecting is None and os.path.exists(self.control_path)
+
+    def poll(self) -> None:
+        if self.connecting is None or self.connecting.poll() is None:
+            return
+        if self.connecting.returncode != 0:
+            self.failed_at = time.monotonic()
+        self.connecting = None
+
+    def close(self) -> None:
+        if self.connecting is not None:
+            self.connecting.kill()
+            self.connecting.wait()
+        close_master(self.setup, self.control_path)
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+
+class _WarmPipeline:
+    """A pipeline whose gate answer the daemon keeps fresh."""
+
+    def __init__(self, ci: CiConfig, environ: dict[str, str]) -> None:
+        self.ci = ci
+        self.environ = environ
+        self.used_at = time.monotonic()
+
+
+class _PendingConfig:
+    """A command's config report, as far as the daemon has read it."""
+
+    def __init__(self, environ: dict[str, str]) -> None:
+        self.environ = environ
+        self.data = b""
+
+
+class Daemon:
+    def __init__(self, socket_path: Path) -> None:
+        self._socket_path = socket_path
+        self._listener: socket.socket | None = None
+        self._wakeup: tuple[int, int] | None = None
+        self._stopping = False
+        self._started_at = time.time()
+        self._served = 0
+        self._children: dict[int, list[str]] = {}
+        # Pipes from commands reporting their config, by read end.
+        self._configs: dict[int, _PendingConfig] = {}
+        self._refresher: int | None = None
+        self._masters: dict[str, _Master] = {}
+        self._pipelines: dict[tuple[PipelineConfig, bool], _WarmPipeline] = {}
+        self._next_refresh = 0.0
+
+    def serve(self) -> None:
+        """Serve commands until stopped, then wait for the running ones."""
+        for module in PRELOADED_MODULES:
+            importlib.import_module(module)
+
+        self._socket_path.parent.mkdir(parents=True, exist_ok=True)
+        with locked(self._socket_path):
+            if _is_serving(self._socket_path):
+                raise BifrostError("bf daemon is already running")
+            self._socket_path.unlink(missing_ok=True)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(self._socket_path))
+            os.chmod(self._socket_path, 0o600)
+            listener.listen(64)
+        self._listener = listener
+
+        wakeup = os.pipe()
+        for fd in wakeup:
+            os.set_blocking(fd, False)
+        self._wakeup = wakeup
+        signal.set_wakeup_fd(wakeup[1])
+        # A handler, not the default, so that exiting children wake select().
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.signal(signal.SIGTERM, self._on_stop_signal)
+        signal.signal(signal.SIGINT, self._on_stop_signal)
+        _log(f"serving on {self._socket_path}")
+
+        try:
+            while not self._stopping or self._children:
+                self._serve_once()
+        finally:
+            self._close_listener()
+            for master in self._masters.values():
+                master.close()
+            signal.set_wakeup_fd(-1)
+            for fd in wakeup:
+                os.close(fd)
+            _log("stopped")
+
+    def stop(self) -> None:
+        """Stop accepting commands; new ones then run in-process."""
+        self._stopping = True
+        self._close_listener()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "started_at": self._started_at,
+            "served": self._served,
+            "running": list(self._children.values()),
+            "connections": sorted(
+                target for target, master in self._masters.items() if master.is_open
+            ),
+            "pipelines": sorted(
+                {
+                    f"{pipeline.url} #{pipeline.project_id}"
+                    for pipeline, _ in self._pipelines
+                }
+            ),
+        }
+
+    def _serve_once(self) -> None:
+        assert self._wakeup is not None
+        readable = [self._wakeup[0], *self._configs]
+        if self._listener is not None:
+            readable.append(self._listener.fileno())
+        # Exiting commands and connecting masters wake select() via SIGCHLD.
+        timeout = None
+        if not self._stopping:
+            timeout = max(self._next_refresh - time.monotonic(), 0.0)
+        ready, _, _ = select.select(readable, [], [], timeout)
+
+        if self._wakeup[0] in ready:
+            with suppress(BlockingIOError):
+                while os.read(self._wakeup[0], 512):
+                    pass
+        if self._listener is not None and self._listener.fileno() in ready:
+            conn, _ = self._listener.accept()
+            with conn:
+                self._handle(conn)
+        for fd in set(ready) & self._configs.keys():
+            self._receive_config(fd)
+        self._reap()
+        for master in self._masters.values():
+            master.poll()
+        if not self._stopping and time.monotonic() >= self._next_refresh:
+            self._refresh_gates()
+            self._next_refresh = time.monotonic() + GATE_REFRESH_INTERVAL
+
+    def _handle(self, conn: socket.socket) -> None:
+        conn.settimeout(REQUEST_TIMEOUT)
+        fds: list[int] = []
+        try:
+            request, fds = _receive_request(conn)
+            op = request.get("op")
+            if op == "run":
+                self._run(conn, request, fds)
+                fds = []
+            elif op == "status":
+                _send(conn, {"type": "status", **self.status()})
+            elif op == "stop":
+                self.stop()
+                _send(conn, {"type": "ok"})
+            else:
+                _send(conn, {"type": "error", "message": f"unknown op {op!r}"})
+        except (OSError, ValueError, KeyError) as e:
+            _log(f"bad request: {e}")
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _run(
+        self, conn: socket.socket, request: dict[str, Any], fds: list[int]
+    ) -> None:
+        if request.get("key") != daemon_key() or len(fds) != 3 or self._stopping:
+            _send(conn, {"type": "stale"})
+            for fd in fds:
+                os.close(fd)
+            return
+
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        reader, writer = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(reader)
+                self._become_child()
+                config = _read_config(request["cwd"])
+                route_connections(self._routes(config))
+                _report_config(writer, config)
+                code = _run_command(conn, request, fds)
+            finally:
+                os._exit(code)
+
+        os.close(writer)
+        os.set_blocking(reader, False)
+        self._configs[reader] = _PendingConfig(request["env"])
+        for fd in fds:
+            os.close(fd)
+        self._children[pid] = request["argv"]
+        self._served += 1
+
+    def _receive_config(self, fd: int) -> None:
+        """Read what a command reported of its config, acting on it at EOF."""
+        try:
+            chunk = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        pending = self._configs[fd]
+        if chunk:
+            pending.data += chunk
+            return
+
+        del self._configs[fd]
+        os.close(fd)
+        if not pending.data:
+            return
+        try:
+            config = BifrostConfig.from_mapping(
+                json.loads(pending.data), validate=False
+            )
+        except (ValueError, BifrostError) as e:
+            _log(f"bad config report: {e}")
+            return
+        self._connect(config)
+        self._track_pipelines(config, pending.environ)
+
+    def _become_child(self) -> None:
+        """Drop the daemon's own state in a freshly forked child."""
+        if self._listener is not None:
+            self._listener.close()
+        for fd in self._configs:
+            os.close(fd)
+        self._configs.clear()
+        signal.set_wakeup_fd(-1)
+        if self._wakeup is not None:
+            for fd in self._wakeup:
+                os.close(fd)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        forget_http_client()
+
+    def _routes(self, config: BifrostConfig | None) -> dict[str, str]:
+        if config is None:
+            return {}
+        routes = {}
+        for setup in config.setups.values():
+            master = self._masters.get(_target(setup))
+            if master is not None and master.is_open:
+                routes[setup.name] = master.control_path
+        return routes
+
+    def _connect(self, config: BifrostConfig) -> None:
+        """Open a master connection to each remote setup not connected yet."""
+        now = time.monotonic()
+        for setup in config.setups.values():
+            if setup.is_local:
+                continue
+            target = _target(setup)
+            master = self._masters.get(target)
+            if master is not None:
+                if master.connecting is not None or master.is_open:
+                    continue
+                if master.failed_at and now - master.failed_at < RECONNECT_AFTER:
+                    continue
+                master.close()
+            self._masters[target] = _Master(setup)
+
+    def _track_pipelines(self, config: BifrostConfig, environ: dict[str, str]) -> None:
+        for setup in config.setups.values():
+            pipeline = config.pipelines.get(setup.pipeline or "")
+            if pipeline is not None:
+                key = (pipeline, setup.ci.is_empty)
+                self._pipelines[key] = _WarmPipeline(setup.ci, environ)
+
+    def _refresh_gates(self) -> None:
+        """Refresh the warm pipelines' gates from a child, if none still does."""
+        now = time.monotonic()
+        for key, warm in list(self._pipelines.items()):
+            if now - warm.used_at > GATE_WARM_FOR:
+                del self._pipelines[key]
+        if not self._pipelines or self._refresher is not None:
+            return
+
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._become_child()
+                _refresh_gates(self._pipelines)
+            finally:
+                os._exit(0)
+        self._refresher = pid
+
+    def _reap(self) -> None:
+        for pid in list(self._children):
+            if _has_exited(pid):
+                del self._children[pid]
+        if self._refresher is not None and _has_exited(self._refresher):
+            self._refresher = None
+
+    def _close_listener(self) -> None:
+        if self._listener is None:
+            return
+        # Unlink first: a new daemon may already own the path once closed.
+        with suppress(OSError):
+            if (
+                os.stat(self._socket_path).st_ino
+                == os.fstat(self._listener.fileno()).st_ino
+            ):
+                self._socket_path.unlink()
+        self._listener.close()
+        self._listener = None
+
+    def _on_stop_signal(self, signum: int, frame: Any) -> None:
+        self.stop()
+
+
+def _report_config(fd: int, config: BifrostConfig | None) -> None:
+    """Tell the daemon which config the command runs with, then close `fd`."""
+    with suppress(OSError), open(fd, "wb") as pipe:
+        if config is not None:
+            pipe.write(json.dumps(config.to_dict()).encode())
+
+
+def _refresh_gates(
+    pipelines: dict[tuple[PipelineConfig, bool], _WarmPipeline],
+) -> None:
+    for (pipeline, _), warm in pipelines.items():
+        try:
+            gate = GitLabPipelineGate(
+                pipeline, cache_ttl=GATE_REFRESH_INTERVAL, environ=warm.environ
+            )
+            gate.is_busy("daemon", warm.ci)
+        except Exception as e:
+            _log(f"refreshing the gate of {pipeline.url} failed: {e}")
+
+
+def _has_exited(pid: int) -> bool:
+    try:
+        finished, _ = os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        return True
+    return finished != 0
+
+
+def _run_command(conn: socket.socket, request: dict[str, Any], fds: list[int]) -> int:
+    """Run the forwarded command line as the caller's `bf` would have."""
+    for target, fd in zip((0, 1, 2), fds, strict=True):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    if isinstance(sys.stdout, TextIOWrapper):
+        sys.stdout.reconfigure(line_buffering=sys.stdout.isatty())
+
+    conn.settimeout(None)
+    finished = threading.Event()
+    threading.Thread(target=_relay_signals, args=(conn, finished), daemon=True).start()
+
+    sys.argv = ["bf", *request["argv"]]
+    code = _invoke_app()
+    finished.set()
+
+    if "bifrost.infra.agent" in sys.modules:
+        from bifrost.infra.agent import close_agents
+
+        close_agents()
+    for stream in (sys.stdout, sys.stderr):
+        with suppress(OSError, ValueError):
+            stream.flush()
+    _send(conn, {"type": "exit", "code": code})
+    return code
+
+
+def _invoke_app() -> int:
+    from bifrost.cli.app import main
+
+    try:
+        main()
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _relay_signals(conn: socket.socket, finished: threading.Event) -> None:
+    """Deliver the caller's signals to this command.
+
+    If the caller goes away, the command is interrupted as Ctrl-C would.
+    """
+    while True:
+        try:
+            frame = read_frame(conn)
+        except (OSError, ValueError):
+            frame = None
+        if finished.is_set():
+            return
+        if frame is None:
+            os.kill(os.getpid(), signal.SIGINT)
+            return
+        if frame.get("op") == "signal":
+            os.kill(os.getpid(), int(frame["signal"]))
+
+
+def _receive_request(conn: socket.socket) -> tuple[dict[str, Any], list[int]]:
+    data, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+    try:
+        while len(data) < FRAME_PREFIX.size:
+            data += _recv(conn)
+        (length,) = FRAME_PREFIX.unpack(data[: FRAME_PREFIX.size])
+        while len(data) < FRAME_PREFIX.size + length:
+            data += _recv(conn)
+        request = json.loads(data[FRAME_PREFIX.size : FRAME_PREFIX.size + length])
+        if not isinstance(request, dict):
+            raise ValueError("request is not an object")
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+    return request, fds
+
+
+def _recv(conn: socket.socket) -> bytes:
+    chunk = conn.recv(1 << 16)
+    if not chunk:
+        raise ValueError("connection closed mid-request")
+    return chunk
+
+
+def _send(conn: socket.socket, header: dict[str, Any]) -> None:
+    with suppress(OSError):
+        conn.sendall(pack_frame(header))
+
+
+def _read_config(cwd: str) -> BifrostConfig | None:
+    """The config a command in `cwd` will read, warming the parsed layers."""
+    try:
+        os.chdir(cwd)
+        return ConfigManager().read_config()
+    except (OSError, BifrostError):
+        return None
+
+
+def _target(setup: SetupConfig) -> str:
+    return f"{setup.user}@{setup.host}"
+
+
+def _is_serving(socket_path: Path) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with probe:
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def _log(message: str) -> None:
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+def main() -> None:
+    """Entry point of the detached daemon started by `bf daemon start`."""
+    from bifrost.cli.forward import daemon_socket_path
+
+    try:
+        Daemon(daemon_socket_path()).serve()
+    except BifrostError as e:
+        _log(e.message)
+        sys.exit(e.exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from bifrost.commands.exec.command import exec_command
+
+__all__ = ["exec_command"]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import typer
+
+from bifrost.cli.completion import complete_setups
+from bifrost.commands.run.command import create_runner
+from bifrost.commands.run.errors import CiBusyError
+from bifrost.infra.transport import pooled_connection, run_remote
+
+
+def exec_command(
+    ctx: typer.Context,
+    setup: str | None = typer.Option(
+        None,
+        "--setup",
+        "-s",
+        help="Setup to run on",
+        autocompletion=complete_setups,
+    ),
+    gate: bool = typer.Option(
+        False,
+        "--gate",
+        help="Refuse to run while the setup's CI pipeline is busy",
+    ),
+    command: list[str] = typer.Argument(  # noqa: B008
+        ..., help="Command to run remotely (after --)"
+    ),
+) -> None:
+    """Run a quick command on a setup and stream its output."""
+    runner = create_runner(ctx)
+    setup_config = runner.resolve_setup(setup)
+    if gate and runner.is_busy(setup_config):
+        raise CiBusyError(f"CI pipeline is busy on setup '{setup_config.name}'")
+
+    # No lease, run id, run.json or log copy: the command's output is the
+    # result. Its exit code becomes bf's.
+    with pooled_connection(setup_config):
+        result = run_remote(setup_config, command, capture=False)
+    raise typer.Exit(code=result.returncode)
@@ -0,0 +1,5 @@
+"""Commands inspecting logs still being shipped in the background."""
+
+from bifrost.commands.logs.command import logs_app
+
+__all__ = ["logs_app"]
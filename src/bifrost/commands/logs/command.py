@@ -0,0 +1,95 @@
+"""Logs command group: inspect and retry background log shipping."""
+
+from __future__ import annotations
+
+import time
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from bifrost.di import Container
+from bifrost.infra.log_queue import LogJob
+
+console = Console()
+
+logs_app = typer.Typer(
+    name="logs",
+    help="Inspect logs still being copied in the background",
+    no_args_is_help=True,
+)
+
+
+@logs_app.command("pending")
+def pending(ctx: typer.Context) -> None:
+    """List runs whose run.json or logs are not shipped yet."""
+    container: Container = ctx.obj
+    queue = container.get_log_queue()
+    jobs = queue.jobs()
+    if not jobs:
+        console.print("No logs pending")
+        return
+
+    now = time.time()
+    table = Table(title="Pending logs")
+    table.add_column("Run", style="bold")
+    table.add_column("Setup")
+    table.add_column("Age", justify="right")
+    table.add_column("Attempts", justify="right")
+    table.add_column("Next try")
+    table.add_column("Last error")
+    for job in jobs:
+        table.add_row(
+            job.run_id,
+            job.setup.name,
+            _format_seconds(now - job.created_at),
+            str(job.attempts),
+            _next_try(job, now),
+            job.last_error or "-",
+        )
+    console.print(table)
+
+    if queue.worker_running():
+        console.print("[green]A worker is shipping them[/green]")
+    elif any(not job.failed for job in jobs):
+        console.print(
+            "[yellow]No worker is running[/yellow]; start one with bf logs retry"
+        )
+
+
+@logs_app.command("retry")
+def retry(
+    ctx: typer.Context,
+    run_id: str | None = typer.Argument(
+        None, help="Run to retry (default: every pending run)"
+    ),
+) -> None:
+    """Retry shipping now, including runs that gave up."""
+    container: Container = ctx.obj
+    queue = container.get_log_queue()
+    retried = queue.retry(run_id)
+    if not retried:
+        if run_id is not None:
+            console.print(f"[yellow]No logs pending for run {run_id}[/yellow]")
+            raise typer.Exit(code=1)
+        console.print("No logs pending")
+        return
+
+    queue.start_worker()
+    console.print(f"[green]Retrying {len(retried)} run(s)[/green]")
+
+
+def _next_try(job: LogJob, now: float) -> str:
+    if job.failed:
+        return "[red]gave up[/red]"
+    if job.next_attempt_at <= now:
+        return "now"
+    return f"in {_format_seconds(job.next_attempt_at - now)}"
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
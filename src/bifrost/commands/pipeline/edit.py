@@ -5,6 +5,7 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_pipelines
 from bifrost.commands.pipeline.command import pipeline_app
 from bifrost.di import Container
 from bifrost.shared import BifrostConfig, PipelineConfig
@@ -16,7 +17,9 @@ err_console = Console(stderr=True)
 @pipeline_app.command("edit")
 def edit_pipeline(
     ctx: typer.Context,
-    name: str = typer.Argument(..., help="Pipeline name to edit"),
+    name: str = typer.Argument(
+        ..., help="Pipeline name to edit", autocompletion=complete_pipelines
+    ),
     url: str | None = typer.Option(None, "--url", help="New GitLab instance URL"),
     project_id: int | None = typer.Option(
         None, "--project-id", help="New GitLab project ID"
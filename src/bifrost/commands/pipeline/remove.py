@@ -5,6 +5,7 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
+from bifrost.cli.completion import complete_pipelines
 from bifrost.commands.pipeline.command import pipeline_app
 from bifrost.di import Container
 from bifrost.shared import BifrostConfig
@@ -16,7 +17,9 @@ err_console = Console(stderr=True)
 @pipeline_app.command("remove")
 def remove_pipeline(
     ctx: typer.Context,
-    name: str = typer.Argument(..., help="Pipeline name to remove"),
+    name: str = typer.Argument(
+        ..., help="Pipeline name to remove", autocompletion=complete_pipelines
+    ),
 ) -> None:
     """Remove a pipeline configuration."""
     container: Container = ctx.obj
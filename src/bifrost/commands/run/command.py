@@ -1,44 +1,178 @@
 from __future__ import annotations
 
+import time
+from types import TracebackType
+
 import typer
 from rich.console import Console
+from rich.status import Status
+from rich.table import Table
 
-from bifrost.cli.app import app
+from bifrost.cli.completion import complete_pools, complete_setups
+from bifrost.commands.run.errors import RemoteCommandError
+from bifrost.commands.run.matrix import MatrixCell, MatrixRunner
+from bifrost.commands.run.pool import PoolDispatcher
 from bifrost.commands.run.runner import Runner
+from bifrost.commands.run.timings import PHASES
+from bifrost.commands.run.waiter import WaitStatus
 from bifrost.di import Container
+from bifrost.shared import ConfigError, RunMetadata, SshError
 
 console = Console()
 
 
-@app.command()
 def run(
     ctx: typer.Context,
-    setup: str | None = typer.Option(None, "--setup", "-s", help="Target setup name"),
-    ref: str | None = typer.Option(
-        None, "--ref", "-r", help="Git ref (branch/tag/commit) to checkout"
+    setup: list[str] | None = typer.Option(  # noqa: B008
+        None,
+        "--setup",
+        "-s",
+        help="Target setup name (repeat for a matrix run)",
+        autocompletion=complete_setups,
+    ),
+    select: str | None = typer.Option(
+        None,
+        "--select",
+        help="Target every setup matching a label selector, e.g. 'lab=berlin,dut=gen3'",
+    ),
+    any_pool: str | None = typer.Option(
+        None,
+        "--any",
+        help="Run on the best available setup of this pool",
+        autocompletion=complete_pools,
+    ),
+    check_load: bool = typer.Option(
+        False, "--check-load", help="With --any, prefer the least loaded idle setup"
+    ),
+    ref: list[str] | None = typer.Option(  # noqa: B008
+        None,
+        "--ref",
+        "-r",
+        help="Git ref (branch/tag/commit) to checkout (repeat for a matrix run)",
     ),
     latest: bool = typer.Option(
         False, "--latest", "-l", help="Fetch latest changes before running"
     ),
     force: bool = typer.Option(False, "--force", "-f", help="Skip CI gate check"),
+    wait: bool = typer.Option(
+        False,
+        "--wait",
+        "-w",
+        help="Wait for a busy setup instead of failing "
+        "(with several --setup values, use the first one to free up)",
+    ),
+    wait_timeout: float = typer.Option(
+        3600.0, "--wait-timeout", help="Give up waiting after this many seconds"
+    ),
     dry_run: bool = typer.Option(
         False, "--dry-run", help="Show what would be done without executing"
     ),
+    timings: bool = typer.Option(
+        False, "--timings", help="Show the time spent in each phase of the run"
+    ),
+    detach: bool = typer.Option(
+        False,
+        "--detach",
+        "-d",
+        help="Start the command on the setup and return; it keeps running if "
+        "the connection drops (see bf attach, bf wait and bf cancel)",
+    ),
+    background_logs: bool = typer.Option(
+        False,
+        "--background-logs",
+        help="Report the result right away; store run.json and copy logs "
+        "in the background (see bf logs pending)",
+    ),
     command: list[str] | None = typer.Argument(  # noqa: B008
         None, help="Command to run remotely (after --)"
     ),
 ) -> None:
     """Run a command on a remote setup."""
-    runner = _create_runner(ctx)
-
-    metadata = runner.run(
-        setup_name=setup,
-        command=command or None,
-        ref=ref,
-        latest=latest,
-        force=force,
-        dry_run=dry_run,
-    )
+    runner = create_runner(ctx)
+
+    if sum(bool(option) for option in (setup, select, any_pool)) > 1:
+        raise ConfigError("Use only one of --setup, --select and --any")
+    if select is not None:
+        setup = [member.name for member in runner.resolve_selector(select)]
+    if any_pool is not None:
+        setup = [_dispatch(ctx, runner, any_pool, check_load)]
+        # The chosen setup may still be busy; queue for it.
+        wait = True
+
+    timeout = wait_timeout if wait else None
+    matrix = len(ref or []) > 1 or (len(setup or []) > 1 and not wait)
+
+    if detach and (matrix or dry_run or background_logs):
+        raise ConfigError(
+            "--detach runs on one setup and ref, without --dry-run or --background-logs"
+        )
+
+    if matrix:
+        cells = MatrixRunner(runner).run(
+            setup_names=setup,
+            refs=ref,
+            command=command or None,
+            latest=latest,
+            force=force,
+            dry_run=dry_run,
+            wait_timeout=timeout,
+            background_logs=background_logs,
+        )
+        _print_matrix(cells, dry_run=dry_run)
+        if timings:
+            _print_timings([cell.metadata for cell in cells if cell.metadata])
+        # A dry run fails only on the rows whose gate check failed.
+        failed = [cell for cell in cells if cell.error or not (dry_run or cell.passed)]
+        if failed:
+            raise RemoteCommandError(f"{len(failed)} of {len(cells)} cell(s) failed")
+        return
+
+    setup_name = setup[0] if setup else None
+    if timeout is not None and not force:
+        started = time.monotonic()
+        with _WaitDisplay() as display:
+            chosen = runner.wait_for_setup(
+                runner.resolve_setups(setup), timeout, on_status=display
+            )
+        setup_name = chosen.name
+        # Queueing for the lease only gets what is left of the same budget.
+        timeout = max(timeout - (time.monotonic() - started), 0.0)
+        if display.waited:
+            console.print(f"[green]{setup_name} is free[/green], starting run")
+
+    if detach:
+        metadata = runner.detach(
+            setup_name=setup_name,
+            command=command or None,
+            ref=ref[0] if ref else None,
+            latest=latest,
+            force=force,
+            wait_timeout=timeout,
+        )
+        console.print(
+            f"[green]Run started[/green] on {metadata.setup} (run: {metadata.run_id})"
+        )
+        console.print(f"  Follow it with: bf attach {metadata.run_id}")
+        return
+
+    try:
+        metadata = runner.run(
+            setup_name=setup_name,
+            command=command or None,
+            ref=ref[0] if ref else None,
+            latest=latest,
+            force=force,
+            dry_run=dry_run,
+            wait_timeout=timeout,
+            background_logs=background_logs,
+        )
+    except RemoteCommandError as e:
+        if timings and e.metadata is not None:
+            _print_timings([e.metadata])
+        raise
+
+    if timings:
+        _print_timings([metadata])
 
     if dry_run:
         console.print("[bold]Dry run[/bold] — no commands executed")
@@ -50,13 +184,127 @@ def run(
     console.print(
         f"[green]Run completed[/green] on {metadata.setup} (run: {metadata.run_id})"
     )
-    if metadata.log_paths:
+    if background_logs:
+        console.print("  Logs: copying in the background (bf logs pending)")
+    elif metadata.log_paths:
         console.print(f"  Logs: {len(metadata.log_paths)} file(s) copied")
 
 
-def _create_runner(ctx: typer.Context) -> Runner:
+def create_runner(ctx: typer.Context) -> Runner:
+    """The runner for a command, sharing the stores of the command's container."""
     container: Container = ctx.obj
     config = container.get_config()
     log_store = container.get_log_store()
-    runner = Runner(config=config, log_store=log_store)
+    gates = container.get_gate_registry()
+    runner = Runner(
+        config=config,
+        log_store=log_store,
+        gates=gates,
+        leases=container.get_lease_store(),
+        log_queue=container.get_log_queue(),
+    )
     return runner
+
+
+def _dispatch(ctx: typer.Context, runner: Runner, pool: str, check_load: bool) -> str:
+    container: Container = ctx.obj
+    dispatcher = PoolDispatcher(
+        runner, container.get_lease_store(), container.get_log_store()
+    )
+    with console.status(f"Probing pool '{pool}'..."):
+        candidates = dispatcher.probe(pool, check_load=check_load)
+    chosen = dispatcher.choose(candidates)
+    if chosen is None:
+        raise SshError(f"No setup of pool '{pool}' is usable right now")
+
+    reason = (
+        "idle" if chosen.is_idle else f"expected wait ~{chosen.expected_wait / 60:.0f}m"
+    )
+    console.print(f"Dispatching to [bold]{chosen.setup.name}[/bold] ({reason})")
+    return chosen.setup.name
+
+
+class _WaitDisplay:
+    """Live status line shown while every candidate setup is busy."""
+
+    def __init__(self) -> None:
+        self._status: Status | None = None
+        self.waited = False
+
+    def __call__(self, status: WaitStatus) -> None:
+        message = (
+            f"Waiting for {', '.join(status.busy)} "
+            f"({status.elapsed:.0f}s elapsed, next check in "
+            f"{status.next_poll_in:.0f}s)"
+        )
+        for setup_name, error in status.errors.items():
+            message += f"\n  [yellow]{setup_name}: {error}[/yellow]"
+
+        self.waited = True
+        if self._status is None:
+            self._status = console.status(message)
+            self._status.start()
+        else:
+            self._status.update(message)
+
+    def __enter__(self) -> _WaitDisplay:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._status is not None:
+            self._status.stop()
+
+
+def _print_matrix(cells: list[MatrixCell], dry_run: bool) -> None:
+    refs = list(dict.fromkeys(cell.ref for cell in cells))
+    rows: dict[str, dict[str | None, MatrixCell]] = {}
+    for cell in cells:
+        rows.setdefault(cell.setup, {})[cell.ref] = cell
+
+    table = Table(title="Dry run — no commands executed" if dry_run else "Run Matrix")
+    table.add_column("Setup", style="bold")
+    for ref in refs:
+        table.add_column(ref or "(current)")
+
+    for setup_name, row in rows.items():
+        table.add_row(setup_name, *(_format_cell(row[ref], dry_run) for ref in refs))
+
+    console.print(table)
+
+
+def _print_timings(runs: list[RunMetadata]) -> None:
+    phases = [p for p in PHASES if any(p in run.timings for run in runs)]
+    show_ref = len({run.ref for run in runs}) > 1
+
+    table = Table(title="Timings (s)")
+    table.add_column("Setup", style="bold")
+    if show_ref:
+        table.add_column("Ref")
+    for phase in phases:
+        table.add_column(phase.capitalize(), justify="right")
+    table.add_column("Total", justify="right", style="bold")
+
+    for run in runs:
+        cells = [run.setup, *([run.ref or "(current)"] if show_ref else [])]
+        cells += [
+            f"{run.timings[phase]:.3f}" if phase in run.timings else "-"
+            for phase in phases
+        ]
+        table.add_row(*cells, f"{sum(run.timings.values()):.3f}")
+
+    console.print(table)
+
+
+def _format_cell(cell: MatrixCell, dry_run: bool) -> str:
+    if cell.metadata is None:
+        return f"[red]error[/red] {cell.error}"
+    if dry_run:
+        return f"[dim]{cell.metadata.run_id}[/dim]"
+    if cell.passed:
+        return f"[green]pass[/green] {cell.metadata.run_id}"
+    return f"[red]exit {cell.metadata.exit_code}[/red] {cell.metadata.run_id}"
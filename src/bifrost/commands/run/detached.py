@@ -0,0 +1,158 @@
+"""Commands following up runs started with `bf run --detach`."""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import typer
+from rich.console import Console
+
+from bifrost.cli.completion import complete_setups
+from bifrost.commands.run.command import create_runner
+from bifrost.commands.run.errors import RemoteCommandError
+from bifrost.commands.run.runner import Runner
+from bifrost.di import Container
+from bifrost.infra import detached
+from bifrost.infra.detached import DetachedRun
+from bifrost.infra.transport import pooled_connection
+from bifrost.shared import ConfigError, SetupConfig, SshError
+
+console = Console()
+
+# Seconds between polls of a running detached run.
+ATTACH_POLL_INTERVAL = 1.0
+WAIT_POLL_INTERVAL = 5.0
+
+_SETUP_OPTION = typer.Option(
+    None,
+    "--setup",
+    "-s",
+    help="Setup the run was started on (default: found from local logs)",
+    autocompletion=complete_setups,
+)
+
+
+def attach(
+    ctx: typer.Context,
+    run_id: str = typer.Argument(..., help="Run ID printed by bf run --detach"),
+    setup: str | None = _SETUP_OPTION,
+    offset: int = typer.Option(
+        0, "--offset", min=0, help="Skip this many lines of output already seen"
+    ),
+) -> None:
+    """Stream the output of a detached run until it exits."""
+    runner = create_runner(ctx)
+    setup_config = _find_setup(ctx, runner, run_id, setup)
+    with pooled_connection(setup_config):
+        run = _follow(setup_config, run_id, offset, stream=True)
+    _finish(runner, setup_config, run)
+
+
+def wait(
+    ctx: typer.Context,
+    run_id: str = typer.Argument(..., help="Run ID printed by bf run --detach"),
+    setup: str | None = _SETUP_OPTION,
+) -> None:
+    """Wait for a detached run to exit and copy back its logs."""
+    runner = create_runner(ctx)
+    setup_config = _find_setup(ctx, runner, run_id, setup)
+    with (
+        pooled_connection(setup_config),
+        console.status(f"Waiting for run {run_id} on {setup_config.name}..."),
+    ):
+        run = _follow(setup_config, run_id, 0, stream=False)
+    _finish(runner, setup_config, run)
+
+
+def cancel(
+    ctx: typer.Context,
+    run_id: str = typer.Argument(..., help="Run ID printed by bf run --detach"),
+    setup: str | None = _SETUP_OPTION,
+) -> None:
+    """Stop a detached run and copy back its logs."""
+    runner = create_runner(ctx)
+    setup_config = _find_setup(ctx, runner, run_id, setup)
+    with pooled_connection(setup_config):
+        with console.status(f"Cancelling run {run_id} on {setup_config.name}..."):
+            cancelled = detached.cancel(setup_config, run_id)
+        run = detached.poll(setup_config, run_id, lines=0)
+        metadata = runner.finish_detached(setup_config, run)
+
+    if cancelled:
+        console.print(
+            f"[yellow]Run cancelled[/yellow] on {metadata.setup} "
+            f"(run: {metadata.run_id}, exit {metadata.exit_code})"
+        )
+    else:
+        console.print(
+            f"Run {metadata.run_id} on {metadata.setup} had already exited "
+            f"(exit {metadata.exit_code})"
+        )
+
+
+def _find_setup(
+    ctx: typer.Context, runner: Runner, run_id: str, setup: str | None
+) -> SetupConfig:
+    if setup is not None:
+        return runner.resolve_setup(setup)
+    container: Container = ctx.obj
+    config = container.get_config()
+    found = container.get_log_store().find_run(config.setups.values(), run_id)
+    if found is None:
+        raise ConfigError(
+            f"Run '{run_id}' was not started from this project. Use --setup."
+        )
+    return found
+
+
+def _follow(
+    setup: SetupConfig, run_id: str, offset: int, *, stream: bool
+) -> DetachedRun:
+    """Poll a detached run until it is no longer running."""
+    interval = ATTACH_POLL_INTERVAL if stream else WAIT_POLL_INTERVAL
+    while True:
+        try:
+            run = detached.poll(
+                setup, run_id, offset, lines=detached.CHUNK_LINES if stream else 0
+            )
+        except SshError as e:
+            resume = (
+                f"bf attach {run_id} --offset {offset}"
+                if stream
+                else f"bf wait {run_id}"
+            )
+            raise SshError(
+                f"{e.message}. The run goes on; resume with: {resume}"
+            ) from e
+        if run.output:
+            sys.stdout.write(run.output)
+            sys.stdout.flush()
+        offset = run.offset
+        if run.more:
+            continue
+        if not run.running:
+            return run
+        time.sleep(interval)
+
+
+def _finish(runner: Runner, setup: SetupConfig, run: DetachedRun) -> None:
+    if run.state == "lost":
+        runner.abandon_detached(setup, run.metadata.run_id)
+        raise RemoteCommandError(
+            f"Run {run.metadata.run_id} on '{setup.name}' stopped without an exit "
+            "code (was the setup restarted?)"
+        )
+
+    metadata = runner.finish_detached(setup, run)
+    if metadata.exit_code != 0:
+        raise RemoteCommandError(
+            f"Command failed on '{setup.name}' (exit {metadata.exit_code})",
+            remote_exit_code=metadata.exit_code,
+            metadata=metadata,
+        )
+    console.print(
+        f"[green]Run completed[/green] on {metadata.setup} (run: {metadata.run_id})"
+    )
+    if metadata.log_paths:
+        console.print(f"  Logs: {len(metadata.log_paths)} file(s) copied")
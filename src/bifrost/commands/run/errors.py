@@ -1,4 +1,6 @@
-from bifrost.shared import BifrostError
+from __future__ import annotations
+
+from bifrost.shared import BifrostError, RunMetadata
 
 
 class CiBusyError(BifrostError):
@@ -8,6 +10,12 @@ class CiBusyError(BifrostError):
 class RemoteCommandError(BifrostError):
     exit_code = 5
 
-    def __init__(self, message: str, remote_exit_code: int = 1) -> None:
+    def __init__(
+        self,
+        message: str,
+        remote_exit_code: int = 1,
+        metadata: RunMetadata | None = None,
+    ) -> None:
         self.remote_exit_code = remote_exit_code
+        self.metadata = metadata
         super().__init__(message)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass
+
+from bifrost.commands.run.runner import Runner, new_run_id
+from bifrost.infra.git_ops import (
+    add_worktree,
+    fetch_refs,
+    remove_worktree,
+    resolve_refs,
+)
+from bifrost.infra.transport import shared_connection
+from bifrost.shared import BifrostError, RunMetadata, SetupConfig
+
+
+@dataclass(frozen=True, slots=True)
+class MatrixCell:
+    setup: str
+    ref: str | None
+    metadata: RunMetadata | None = None
+    error: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        return self.metadata is not None and self.metadata.exit_code == 0
+
+
+class MatrixRunner:
+    """Runs one command for every (setup, ref) cell.
+
+    Setups run concurrently. The cells of one setup run sequentially over a
+    single SSH connection, each in its own git worktree, after all refs have
+    been fetched and resolved in one go. Each setup's lease is held for its
+    whole row; with `wait_timeout`, a row starts as soon as its setup frees up.
+    """
+
+    def __init__(self, runner: Runner) -> None:
+        self._runner = runner
+
+    def run(
+        self,
+        setup_names: list[str] | None,
+        refs: list[str] | None,
+        command: list[str] | None = None,
+        latest: bool = False,
+        force: bool = False,
+        dry_run: bool = False,
+        wait_timeout: float | None = None,
+        background_logs: bool = False,
+    ) -> list[MatrixCell]:
+        setups = self._runner.resolve_setups(setup_names)
+        commands = {
+            setup.name: self._runner.resolve_command(setup, command) for setup in setups
+        }
+        planned_refs: list[str | None] = list(refs) if refs else [None]
+
+        with ThreadPoolExecutor(max_workers=len(setups)) as pool:
+            if dry_run:
+                rows = pool.map(
+                    lambda setup: self._plan_row(
+                        setup, planned_refs, commands[setup.name], force, wait_timeout
+                    ),
+                    setups,
+                )
+            else:
+                rows = pool.map(
+                    lambda setup: self._run_row(
+                        setup,
+                        refs or [],
+                        planned_refs,
+                        commands[setup.name],
+                        latest,
+                        force,
+                        wait_timeout,
+                        background_logs,
+                    ),
+                    setups,
+                )
+            return [cell for row in rows for cell in row]
+
+    def _plan_row(
+        self,
+        setup: SetupConfig,
+        planned_refs: list[str | None],
+        command: list[str],
+        force: bool,
+        wait_timeout: float | None,
+    ) -> list[MatrixCell]:
+        """Plan a row of a dry run, checking its gate as a single dry run does."""
+        try:
+            if not force:
+                if wait_timeout is None:
+                    self._runner.check_gate(setup)
+                else:
+                    self._runner.wait_for_setup([setup], wait_timeout)
+        except BifrostError as e:
+            return [
+                MatrixCell(setup=setup.name, ref=ref, error=e.message)
+                for ref in planned_refs
+            ]
+        return [
+            MatrixCell(
+                setup=setup.name,
+                ref=ref,
+                metadata=RunMetadata(
+                    run_id=new_run_id(), setup=setup.name, ref=ref, command=command
+                ),
+            )
+            for ref in planned_refs
+        ]
+
+    def _run_row(
+        self,
+        setup: SetupConfig,
+        refs: list[str],
+        planned_refs: list[str | None],
+        command: list[str],
+        latest: bool,
+        force: bool,
+        wait_timeout: float | None,
+        background_logs: bool,
+    ) -> list[MatrixCell]:
+        try:
+            with (
+                shared_connection(setup),
+                self._runner.lease(
+                    setup,
+                    new_run_id(),
+                    check_gate=not force,
+                    wait_timeout=wait_timeout,
+                ),
+            ):
+                if not refs:
+                    metadata = self._runner.execute(
+                        setup,
+                        command,
+                        run_id=new_run_id(),
+                        background_logs=background_logs,
+                    )
+                    return [MatrixCell(setup=setup.name, ref=None, metadata=metadata)]
+
+                if latest:
+                    fetch_refs(setup, refs)
+                commits = resolve_refs(setup, refs, latest=latest)
+
+                return [
+                    self._run_cell(setup, ref, commit, command, background_logs)
+                    for ref, commit in zip(refs, commits, strict=True)
+                ]
+        except BifrostError as e:
+            return [
+                MatrixCell(setup=setup.name, ref=ref, error=e.message)
+                for ref in planned_refs
+            ]
+
+    def _run_cell(
+        self,
+        setup: SetupConfig,
+        ref: str,
+        commit: str,
+        command: list[str],
+        background_logs: bool,
+    ) -> MatrixCell:
+        run_id = new_run_id()
+        worktree = f".bifrost/worktrees/{run_id}"
+        try:
+            add_worktree(setup, worktree, commit)
+        except BifrostError as e:
+            return MatrixCell(setup=setup.name, ref=ref, error=e.message)
+        try:
+            metadata = self._runner.execute(
+                setup,
+                command,
+                run_id=run_id,
+                ref=ref,
+                workdir=worktree,
+                background_logs=background_logs,
+            )
+        except BifrostError as e:
+            return MatrixCell(setup=setup.name, ref=ref, error=e.message)
+        finally:
+            # A leftover worktree only costs disk space; the cell's result,
+            # or its own error, is what counts.
+            with suppress(BifrostError):
+                remove_worktree(setup, worktree)
+        return MatrixCell(setup=setup.name, ref=ref, metadata=metadata)
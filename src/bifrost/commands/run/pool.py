@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from bifrost.commands.run.runner import Runner
+from bifrost.infra.lease import LeaseState, LeaseStore
+from bifrost.infra.log_store import LogStore
+from bifrost.infra.transport import check_reachable, read_load
+from bifrost.shared import BifrostError, SetupConfig
+
+# Assumed run duration (seconds) for setups without run history.
+DEFAULT_RUN_DURATION = 5 * 60
+
+
+@dataclass(frozen=True, slots=True)
+class PoolCandidate:
+    """Probe result for one member of a pool."""
+
+    setup: SetupConfig
+    reachable: bool
+    ci_busy: bool | None = None
+    lease: LeaseState | None = None
+    load: float | None = None
+    expected_wait: float = math.inf
+
+    @property
+    def is_idle(self) -> bool:
+        return (
+            self.reachable
+            and self.ci_busy is False
+            and self.lease is not None
+            and self.lease.is_free
+        )
+
+
+class PoolDispatcher:
+    """Picks the best setup of a pool for the next run.
+
+    All members are probed concurrently for reachability, CI gate and lease
+    state, and optionally CPU load. The first idle member wins (the least
+    loaded one when load is probed). If none is idle, the member with the
+    lowest expected wait wins, estimated from the durations of its recent runs.
+    """
+
+    def __init__(self, runner: Runner, leases: LeaseStore, log_store: LogStore) -> None:
+        self._runner = runner
+        self._leases = leases
+        self._log_store = log_store
+
+    def probe(self, pool: str, check_load: bool = False) -> list[PoolCandidate]:
+        members = self._runner.resolve_pool(pool)
+        with ThreadPoolExecutor(max_workers=min(16, len(members))) as executor:
+            return list(
+                executor.map(lambda setup: self._probe(setup, check_load), members)
+            )
+
+    def choose(self, candidates: list[PoolCandidate]) -> PoolCandidate | None:
+        idle = [candidate for candidate in candidates if candidate.is_idle]
+        if idle:
+            return min(idle, key=lambda c: c.load if c.load is not None else math.inf)
+
+        waiting = [c for c in candidates if c.expected_wait < math.inf]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda candidate: candidate.expected_wait)
+
+    def _probe(self, setup: SetupConfig, check_load: bool) -> PoolCandidate:
+        if not check_reachable(setup):
+            return PoolCandidate(setup=setup, reachable=False)
+
+        try:
+            ci_busy = self._runner.is_busy(setup)
+            lease = self._leases.peek(setup)
+            load = read_load(setup) if check_load else None
+        except BifrostError:
+            return PoolCandidate(setup=setup, reachable=True)
+
+        return PoolCandidate(
+            setup=setup,
+            reachable=True,
+            ci_busy=ci_busy,
+            lease=lease,
+            load=load,
+            expected_wait=self._expected_wait(setup, ci_busy, lease),
+        )
+
+    def _expected_wait(
+        self, setup: SetupConfig, ci_busy: bool, lease: LeaseState
+    ) -> float:
+        durations = self._log_store.recent_durations(setup)
+        typical = statistics.median(durations) if durations else DEFAULT_RUN_DURATION
+
+        wait = lease.queued * typical
+        expires_in, held_for = lease.expires_in, lease.held_for
+        if expires_in is not None and expires_in >= 0 and held_for is not None:
+            wait += max(typical - held_for, 0.0)
+        if ci_busy:
+            # A CI job gives no hint of its remaining time; assume a typical run.
+            wait = max(wait, typical)
+        return wait
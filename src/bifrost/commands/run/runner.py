@@ -1,21 +1,54 @@
 from __future__ import annotations
 
+import shlex
+import time
 import uuid
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager, suppress
+from dataclasses import replace
+from datetime import datetime
 
 from bifrost.commands.run.errors import CiBusyError, RemoteCommandError
+from bifrost.commands.run.timings import PhaseTimer
+from bifrost.commands.run.waiter import SetupWaiter, WaitStatus
+from bifrost.infra.detached import DetachedRun
+from bifrost.infra.detached import launch as launch_detached
 from bifrost.infra.git_ops import fetch_and_checkout
+from bifrost.infra.lease import LeaseState, LeaseStore
+from bifrost.infra.log_queue import LogQueue
 from bifrost.infra.log_store import LogStore
-from bifrost.infra.pipeline_gate import create_pipeline_gate
-from bifrost.infra.ssh import run_remote
-from bifrost.shared import BifrostConfig, ConfigError, RunMetadata, SetupConfig
+from bifrost.infra.pipeline_gate import PipelineGateRegistry
+from bifrost.infra.transport import run_remote
+from bifrost.shared import (
+    BifrostConfig,
+    BifrostError,
+    ConfigError,
+    LeaseHeldError,
+    RunMetadata,
+    SetupConfig,
+)
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
 
 
 class Runner:
     """Orchestrates running commands on remote setups."""
 
-    def __init__(self, config: BifrostConfig, log_store: LogStore) -> None:
+    def __init__(
+        self,
+        config: BifrostConfig,
+        log_store: LogStore,
+        gates: PipelineGateRegistry | None = None,
+        leases: LeaseStore | None = None,
+        log_queue: LogQueue | None = None,
+    ) -> None:
         self._config = config
         self._log_store = log_store
+        self._gates = gates or PipelineGateRegistry()
+        self._leases = leases or LeaseStore()
+        self._log_queue = log_queue or LogQueue()
 
     def resolve_setup(self, setup_name: str | None) -> SetupConfig:
         name = setup_name or self._config.default_setup
@@ -26,80 +59,334 @@ class Runner:
             raise ConfigError(f"Setup '{name}' not found. Available: {available}")
         return self._config.setups[name]
 
-    def run(
-        self,
-        setup_name: str | None = None,
-        command: list[str] | None = None,
-        ref: str | None = None,
-        latest: bool = False,
-        force: bool = False,
-        dry_run: bool = False,
-    ) -> RunMetadata:
-        setup = self.resolve_setup(setup_name)
+    def resolve_setups(self, setup_names: list[str] | None) -> list[SetupConfig]:
+        """Resolve several setup names, in order and without duplicates."""
+        names: list[str | None] = list(setup_names) if setup_names else [None]
+        setups: dict[str, SetupConfig] = {}
+        for name in names:
+            setup = self.resolve_setup(name)
+            setups[setup.name] = setup
+        return list(setups.values())
+
+    def resolve_pool(self, pool: str) -> list[SetupConfig]:
+        members = self._config.pool_members(pool)
+        if not members:
+            raise ConfigError(f"No setups in pool '{pool}'")
+        return members
+
+    def resolve_selector(self, selector: str) -> list[SetupConfig]:
+        members = self._config.select(selector)
+        if not members:
+            raise ConfigError(f"No setups match selector '{selector}'")
+        return members
+
+    def resolve_command(
+        self, setup: SetupConfig, command: list[str] | None
+    ) -> list[str]:
         resolved_command = command or ([setup.runner] if setup.runner else None)
         if not resolved_command:
             raise ConfigError(
                 f"No command provided and no default runner for setup '{setup.name}'"
             )
+        return resolved_command
 
+    def is_busy(self, setup: SetupConfig) -> bool:
         pipeline_config = (
             self._config.pipelines.get(setup.pipeline) if setup.pipeline else None
         )
-        pipeline_gate = create_pipeline_gate(pipeline_config)
-        if not force and pipeline_gate.is_busy(setup.name):
+        return self._gates.is_busy(pipeline_config, setup.name, setup.ci)
+
+    def check_gate(self, setup: SetupConfig) -> None:
+        if self.is_busy(setup):
             raise CiBusyError(
                 f"CI pipeline is busy on setup '{setup.name}'. Use --force to override."
             )
 
-        run_id = uuid.uuid4().hex[:12]
+    def wait_for_setup(
+        self,
+        setups: list[SetupConfig],
+        timeout: float,
+        on_status: Callable[[WaitStatus], None] | None = None,
+    ) -> SetupConfig:
+        """Block until one of `setups` is free and return it.
+
+        A setup is free when its CI gate is idle and nobody holds or waits for
+        its lease. Raises `CiBusyError` if all of them are still busy after
+        `timeout` seconds.
+        """
+
+        def is_taken(setup: SetupConfig) -> bool:
+            return self.is_busy(setup) or not self._leases.peek(setup).is_free
+
+        waiter = SetupWaiter(
+            is_taken, timeout, refresh=self._gates.forget, on_status=on_status
+        )
+        return waiter.wait(setups)
+
+    @contextmanager
+    def lease(
+        self,
+        setup: SetupConfig,
+        run_id: str,
+        *,
+        check_gate: bool = False,
+        wait_timeout: float | None = None,
+        on_wait: Callable[[WaitStatus], None] | None = None,
+        keep: bool = False,
+    ) -> Iterator[None]:
+        """Hold the lease of `setup` for `run_id`, checking its CI gate first.
+
+        Without `wait_timeout`, a busy gate or a held lease fails right away.
+        With it, the run queues for the lease and acquires it once the gate is
+        idle and every earlier waiter has had its turn. The lease is renewed
+        for as long as the block runs. With `keep`, a block that succeeds
+        leaves the lease held for someone else to renew and release.
+        """
+
+        def is_taken(setup: SetupConfig) -> bool:
+            # Every poll refreshes the queue ticket, which lapses otherwise.
+            acquired = self._leases.try_acquire(setup, run_id, queue=True).acquired
+            if check_gate and self.is_busy(setup):
+                if acquired:
+                    # Keep the turn while CI finishes, but not a lapsing lease.
+                    self._leases.renew(setup, run_id)
+                return True
+            return not acquired
+
+        try:
+            if wait_timeout is None:
+                if check_gate:
+                    self.check_gate(setup)
+                state = self._leases.try_acquire(setup, run_id)
+                if not state.acquired:
+                    raise LeaseHeldError(_describe_held_lease(setup, state))
+            else:
+                SetupWaiter(
+                    is_taken,
+                    wait_timeout,
+                    refresh=self._gates.forget,
+                    on_status=on_wait,
+                ).wait([setup])
+            with self._leases.keep_alive(setup, run_id):
+                yield
+        except BaseException:
+            self._release(setup, run_id)
+            raise
+        if not keep:
+            self._release(setup, run_id)
+
+    def _release(self, setup: SetupConfig, run_id: str) -> None:
+        # An unreleased lease is recovered by others once it expires.
+        with suppress(BifrostError):
+            self._leases.release(setup, run_id)
+
+    def run(
+        self,
+        setup_name: str | None = None,
+        command: list[str] | None = None,
+        ref: str | None = None,
+        latest: bool = False,
+        force: bool = False,
+        dry_run: bool = False,
+        wait_timeout: float | None = None,
+        on_wait: Callable[[WaitStatus], None] | None = None,
+        background_logs: bool = False,
+    ) -> RunMetadata:
+        """Run `command` on a setup.
+
+        The setup's lease is held from before checkout until logs are copied.
+        With `wait_timeout`, a busy setup is waited for up to that many seconds
+        instead of failing right away. The time spent in each phase is
+        reported in the metadata's `timings`. With `background_logs`, the run
+        returns once the command finishes; see `execute`.
+        """
+        timer = PhaseTimer()
+        with timer.phase("resolve"):
+            setup = self.resolve_setup(setup_name)
+            resolved_command = self.resolve_command(setup, command)
+        run_id = new_run_id()
 
         if dry_run:
+            if not force:
+                with timer.phase("gate"):
+                    if wait_timeout is None:
+                        self.check_gate(setup)
+                    else:
+                        self.wait_for_setup([setup], wait_timeout, on_status=on_wait)
             return RunMetadata(
                 run_id=run_id,
                 setup=setup.name,
                 ref=ref,
                 command=resolved_command,
+                timings=timer.timings,
+            )
+
+        with ExitStack() as stack:
+            # Gate check, lease acquisition and any waiting for either.
+            with timer.phase("gate"):
+                stack.enter_context(
+                    self.lease(
+                        setup,
+                        run_id,
+                        check_gate=not force,
+                        wait_timeout=wait_timeout,
+                        on_wait=on_wait,
+                    )
+                )
+            metadata = self.execute(
+                setup,
+                resolved_command,
+                run_id=run_id,
+                ref=ref,
+                latest=latest,
+                timer=timer,
+                background_logs=background_logs,
             )
 
-        if ref:
-            fetch_and_checkout(setup, ref, latest=latest)
+        if metadata.exit_code != 0:
+            raise RemoteCommandError(
+                f"Command failed on '{setup.name}' (exit {metadata.exit_code})",
+                remote_exit_code=metadata.exit_code,
+                metadata=metadata,
+            )
 
-        result = run_remote(setup, resolved_command)
+        return metadata
 
+    def detach(
+        self,
+        setup_name: str | None = None,
+        command: list[str] | None = None,
+        ref: str | None = None,
+        latest: bool = False,
+        force: bool = False,
+        wait_timeout: float | None = None,
+        on_wait: Callable[[WaitStatus], None] | None = None,
+    ) -> RunMetadata:
+        """Start `command` on a setup detached from this process and return.
+
+        The command runs under a supervisor on the setup, which renews the
+        lease taken here and releases it when the command exits. Follow it up
+        with `bifrost.infra.detached.poll` and `finish_detached`.
+        """
+        setup = self.resolve_setup(setup_name)
         metadata = RunMetadata(
-            run_id=run_id,
+            run_id=new_run_id(),
             setup=setup.name,
             ref=ref,
-            command=resolved_command,
-            exit_code=result.returncode,
+            command=self.resolve_command(setup, command),
         )
+        with self.lease(
+            setup,
+            metadata.run_id,
+            check_gate=not force,
+            wait_timeout=wait_timeout,
+            on_wait=on_wait,
+            keep=True,
+        ):
+            if ref:
+                fetch_and_checkout(setup, ref, latest=latest)
+            launch_detached(
+                setup,
+                metadata,
+                ttl=self._leases.ttl,
+                renew_interval=self._leases.renew_interval,
+            )
+        self._log_store.write_detached_metadata(setup, metadata)
+        return metadata
+
+    def finish_detached(self, setup: SetupConfig, run: DetachedRun) -> RunMetadata:
+        """Store the metadata of a detached run that exited and copy its logs.
+
+        A run already finished is not copied again.
+        """
+        finished = self._log_store.read_local_metadata(setup, run.metadata.run_id)
+        if finished is not None:
+            return finished
 
+        metadata = run.metadata
         self._log_store.store_run_metadata(setup, metadata)
+        log_paths = self._log_store.copy_logs(setup, metadata.run_id)
+        metadata = replace(metadata, log_paths=log_paths)
+        self._log_store.write_local_metadata(setup, metadata)
+        return metadata
 
-        if result.returncode != 0:
-            log_paths = self._log_store.copy_logs(setup, run_id)
-            metadata = RunMetadata(
-                run_id=metadata.run_id,
-                setup=metadata.setup,
-                ref=metadata.ref,
-                command=metadata.command,
-                timestamp=metadata.timestamp,
-                exit_code=metadata.exit_code,
-                log_paths=log_paths,
-            )
-            raise RemoteCommandError(
-                f"Command failed on '{setup.name}' (exit {result.returncode})",
-                remote_exit_code=result.returncode,
-            )
+    def abandon_detached(self, setup: SetupConfig, run_id: str) -> None:
+        """Release the lease a lost detached run may still hold.
+
+        A lost run's supervisor died before it could release the lease, which
+        would otherwise block the setup until it expires.
+        """
+        self._leases.release(setup, run_id)
+
+    def execute(
+        self,
+        setup: SetupConfig,
+        command: list[str],
+        *,
+        run_id: str,
+        ref: str | None = None,
+        latest: bool = False,
+        workdir: str | None = None,
+        timer: PhaseTimer | None = None,
+        background_logs: bool = False,
+    ) -> RunMetadata:
+        """Check out `ref`, run `command`, store its metadata and copy logs back.
+
+        Unlike `run`, a failing remote command is not raised; its exit code is
+        reported in the returned metadata. With `workdir`, the command runs in
+        that remote directory, which must already have `ref` checked out.
+        Phases are timed into `timer`, which `run` starts before the gate.
+
+        With `background_logs`, storing and copying are queued for the log
+        queue's worker instead; the returned metadata then lists no logs yet.
+        """
+        timer = timer or PhaseTimer()
+        remote_command = command
+        if workdir is not None:
+            remote_command = ["cd", shlex.quote(workdir), "&&", *command]
+        elif ref:
+            with timer.phase("checkout"):
+                fetch_and_checkout(setup, ref, latest=latest)
+
+        started = time.monotonic()
+        with timer.phase("execute"):
+            result = run_remote(setup, remote_command)
 
         metadata = RunMetadata(
-            run_id=metadata.run_id,
-            setup=metadata.setup,
-            ref=metadata.ref,
-            command=metadata.command,
-            timestamp=metadata.timestamp,
-            exit_code=metadata.exit_code,
-            log_paths=self._log_store.copy_logs(setup, run_id),
+            run_id=run_id,
+            setup=setup.name,
+            ref=ref,
+            command=command,
+            exit_code=result.returncode,
+            duration_s=round(time.monotonic() - started, 3),
+            timings=timer.timings,
         )
 
+        if background_logs:
+            self._log_store.write_local_metadata(setup, metadata)
+            self._log_queue.enqueue(setup, metadata, self._log_store.project_root)
+            self._log_queue.start_worker()
+            return metadata
+
+        with timer.phase("store"):
+            self._log_store.store_run_metadata(setup, metadata)
+        with timer.phase("copy"):
+            log_paths = self._log_store.copy_logs(setup, run_id)
+
+        # The stored run.json predates storing and copying; the local copy
+        # gets the complete timings.
+        metadata = replace(metadata, log_paths=log_paths, timings=timer.timings)
+        self._log_store.write_local_metadata(setup, metadata)
         return metadata
+
+
+def _describe_held_lease(setup: SetupConfig, state: LeaseState) -> str:
+    if state.holder is None:
+        return f"Setup '{setup.name}' has {state.queued} run(s) waiting. Use --wait."
+    # Lease times are by the setup's clock; show this machine's.
+    expires_at = time.time() + (state.expires_in or 0.0)
+    until = datetime.fromtimestamp(expires_at).strftime("%H:%M")
+    return (
+        f"Setup '{setup.name}' is leased by {state.holder.owner} "
+        f"(run {state.holder.run_id}) until {until}. Use --wait."
+    )
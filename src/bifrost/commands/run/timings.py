@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# Phases of a run, in the order they happen.
+PHASES = ("resolve", "gate", "checkout", "execute", "store", "copy")
+
+
+class PhaseTimer:
+    """Wall time spent in each phase of a run, by a monotonic clock.
+
+    A phase entered more than once accumulates; phases never entered (a
+    run without `--ref` has no checkout, a dry run nothing after the gate)
+    are absent. "gate" covers the CI gate check and taking the lease, and
+    any waiting for either, so a forced run, which skips only the check,
+    still spends time there; a forced dry run has no gate.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._timings: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - started
+            self._timings[name] = self._timings.get(name, 0.0) + elapsed
+
+    @property
+    def timings(self) -> dict[str, float]:
+        """Seconds per phase, rounded to milliseconds, in phase order."""
+        order = {name: position for position, name in enumerate(PHASES)}
+        return {
+            name: round(seconds, 3)
+            for name, seconds in sorted(
+                self._timings.items(), key=lambda item: order.get(item[0], len(order))
+            )
+        }
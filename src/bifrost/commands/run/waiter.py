@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from bifrost.commands.run.errors import CiBusyError
+from bifrost.shared import PipelineGateError, SetupConfig, SshError
+
+# The first re-check happens once the shared gate cache has expired.
+INITIAL_POLL_INTERVAL = 10.0
+MAX_POLL_INTERVAL = 60.0
+BACKOFF_FACTOR = 1.5
+JITTER = 0.2
+
+
+@dataclass(frozen=True, slots=True)
+class WaitStatus:
+    """One polling round that found every candidate setup busy."""
+
+    busy: list[str]
+    elapsed: float
+    next_poll_in: float
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class SetupWaiter:
+    """Polls until one of several candidate setups is free.
+
+    Every round checks all candidates concurrently and picks the first free one
+    in the given order. While all are busy, the pause between rounds grows from
+    `INITIAL_POLL_INTERVAL` to `MAX_POLL_INTERVAL`, with random jitter so that
+    several waiting bf processes do not poll in lockstep. Transient gate and
+    SSH failures count as busy and are retried.
+    """
+
+    def __init__(
+        self,
+        is_busy: Callable[[SetupConfig], bool],
+        timeout: float,
+        refresh: Callable[[], None] | None = None,
+        on_status: Callable[[WaitStatus], None] | None = None,
+        sleep: Callable[[float], None] | None = None,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._is_busy = is_busy
+        self._timeout = timeout
+        self._refresh = refresh
+        self._on_status = on_status
+        self._sleep = sleep or time.sleep
+        self._clock = clock or time.monotonic
+
+    def wait(self, setups: list[SetupConfig]) -> SetupConfig:
+        started = self._clock()
+        interval = INITIAL_POLL_INTERVAL
+
+        while True:
+            free, errors = self._poll(setups)
+            if free is not None:
+                return free
+
+            elapsed = self._clock() - started
+            remaining = self._timeout - elapsed
+            if remaining <= 0:
+                names = ", ".join(f"'{setup.name}'" for setup in setups)
+                raise CiBusyError(f"{names} still busy after waiting {elapsed:.0f}s")
+
+            delay = min(remaining, interval * random.uniform(1 - JITTER, 1 + JITTER))
+            if self._on_status is not None:
+                self._on_status(
+                    WaitStatus(
+                        busy=[setup.name for setup in setups],
+                        elapsed=elapsed,
+                        next_poll_in=delay,
+                        errors=errors,
+                    )
+                )
+            self._sleep(delay)
+            interval = min(interval * BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+            if self._refresh is not None:
+                self._refresh()
+
+    def _poll(
+        self, setups: list[SetupConfig]
+    ) -> tuple[SetupConfig | None, dict[str, str]]:
+        errors: dict[str, str] = {}
+
+        def check(setup: SetupConfig) -> bool:
+            try:
+                return self._is_busy(setup)
+            except (PipelineGateError, SshError) as e:
+                errors[setup.name] = e.message
+                return True
+
+        with ThreadPoolExecutor(max_workers=min(16, len(setups))) as pool:
+            busy = list(pool.map(check, setups))
+
+        for setup, setup_busy in zip(setups, busy, strict=True):
+            if not setup_busy:
+                return setup, errors
+        return None, errors
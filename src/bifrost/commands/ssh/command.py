@@ -3,18 +3,23 @@ from __future__ import annotations
 import typer
 from rich.console import Console
 
-from bifrost.cli.app import app
+from bifrost.cli.completion import complete_setups
 from bifrost.di import Container
-from bifrost.infra.ssh import open_interactive_session
+from bifrost.infra.transport import open_interactive_session
 from bifrost.shared import ConfigError
 
 console = Console()
 
 
-@app.command()
 def ssh(
     ctx: typer.Context,
-    setup: str | None = typer.Option(None, "--setup", "-s", help="Setup to connect to"),
+    setup: str | None = typer.Option(
+        None,
+        "--setup",
+        "-s",
+        help="Setup to connect to",
+        autocompletion=complete_setups,
+    ),
 ) -> None:
     """Open an interactive SSH session to a setup."""
     container: Container = ctx.obj
@@ -0,0 +1,3 @@
+from bifrost.commands.stats.command import stats
+
+__all__ = ["stats"]
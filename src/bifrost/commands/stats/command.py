@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from statistics import median
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from bifrost.cli.completion import complete_setups
+from bifrost.commands.run.timings import PHASES
+from bifrost.commands.stats.history import RunHistory, RunRecord, percentile
+from bifrost.di import Container
+from bifrost.shared import ConfigError, SetupConfig
+
+console = Console()
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+# Characters of the p50 trend; longer windows fold several days into one, so
+# the trend stays readable in a narrow terminal.
+TREND_WIDTH = 10
+
+
+def stats(
+    ctx: typer.Context,
+    setup: str | None = typer.Option(
+        None,
+        "--setup",
+        "-s",
+        help="Only runs on this setup",
+        autocompletion=complete_setups,
+    ),
+    select: str | None = typer.Option(
+        None, "--select", help="Only runs on setups matching a label selector"
+    ),
+    days: int = typer.Option(
+        30, "--days", "-d", min=1, help="Look back this many days"
+    ),
+    phases: bool = typer.Option(
+        False, "--phases", help="Also show percentiles of each run phase"
+    ),
+) -> None:
+    """Show run latency and reliability per setup and command."""
+    container: Container = ctx.obj
+    config = container.get_config()
+    log_store = container.get_log_store()
+
+    if setup and select:
+        raise ConfigError("Use either --setup or --select, not both")
+    if select:
+        selected = config.select(select)
+    elif setup:
+        if setup not in config.setups:
+            available = list(config.setups)
+            raise ConfigError(f"Setup '{setup}' not found. Available: {available}")
+        selected = [config.setups[setup]]
+    else:
+        selected = list(config.setups.values())
+
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=days)
+    names = {setup_config.name for setup_config in selected}
+    records = [
+        record
+        for record in RunHistory().load_all(
+            log_store.local_log_dir(setup_config) for setup_config in selected
+        )
+        if record.setup in names and record.timestamp >= since
+    ]
+    if not records:
+        console.print(f"[dim]No runs in the last {days} day(s)[/dim]")
+        return
+
+    groups = _group(records, selected)
+    _print_summary(groups, days, now)
+    if phases:
+        _print_phases(groups)
+
+
+def _group(
+    records: list[RunRecord], setups: Sequence[SetupConfig]
+) -> dict[tuple[str, str], list[RunRecord]]:
+    """Records by (setup, command), setups in config order."""
+    order = {setup.name: position for position, setup in enumerate(setups)}
+    groups: dict[tuple[str, str], list[RunRecord]] = {}
+    for record in sorted(records, key=lambda r: (order[r.setup], r.command)):
+        groups.setdefault((record.setup, record.command), []).append(record)
+    return groups
+
+
+def _print_summary(
+    groups: dict[tuple[str, str], list[RunRecord]], days: int, now: datetime
+) -> None:
+    table = Table(title=f"Runs in the last {days} day(s)")
+    table.add_column("Setup", style="bold")
+    table.add_column("Command")
+    table.add_column("Runs", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("Max", justify="right")
+    table.add_column("Copy rate", justify="right")
+    period = math.ceil(days / TREND_WIDTH)
+    table.add_column(
+        "Daily p50" if period == 1 else f"p50 per {period}d",
+        no_wrap=True,
+        min_width=math.ceil(days / period),
+    )
+
+    for (setup_name, command), records in groups.items():
+        totals = [r.total_s for r in records if r.total_s is not None]
+        rates = [r.throughput for r in records if r.throughput is not None]
+        failed = sum(record.failed for record in records)
+        table.add_row(
+            setup_name,
+            command,
+            str(len(records)),
+            _format_failures(failed, len(records)),
+            *_format_percentiles(totals),
+            _format_rate(median(rates)) if rates else "[dim]-[/dim]",
+            _sparkline(_period_medians(records, days, period, now)),
+        )
+
+    console.print(table)
+
+
+def _print_phases(groups: dict[tuple[str, str], list[RunRecord]]) -> None:
+    seen = {
+        phase for records in groups.values() for r in records for phase in r.timings
+    }
+    phases = [phase for phase in PHASES if phase in seen]
+
+    table = Table(title="Phase times (p50 / p95 / max)")
+    table.add_column("Setup", style="bold")
+    table.add_column("Command")
+    for phase in phases:
+        table.add_column(phase.capitalize(), justify="right")
+
+    for (setup_name, command), records in groups.items():
+        cells = []
+        for phase in phases:
+            values = [r.timings[phase] for r in records if phase in r.timings]
+            cells.append(
+                " / ".join(_format_percentiles(values)) if values else "[dim]-[/dim]"
+            )
+        table.add_row(setup_name, command, *cells)
+
+    console.print(table)
+
+
+def _period_medians(
+    records: list[RunRecord], days: int, period: int, now: datetime
+) -> list[float | None]:
+    """Median total time per `period` days of the window, oldest first."""
+    periods = math.ceil(days / period)
+    by_period: list[list[float]] = [[] for _ in range(periods)]
+    for record in records:
+        age = (now - record.timestamp).days
+        if 0 <= age < days and record.total_s is not None:
+            by_period[periods - 1 - age // period].append(record.total_s)
+    return [median(values) if values else None for values in by_period]
+
+
+def _sparkline(values: list[float | None]) -> str:
+    known = [value for value in values if value is not None]
+    if not known:
+        return ""
+    low, high = min(known), max(known)
+    span = (high - low) or 1.0
+    steps = len(SPARK_CHARS) - 1
+    return "".join(
+        " " if value is None else SPARK_CHARS[round((value - low) / span * steps)]
+        for value in values
+    )
+
+
+def _format_percentiles(values: list[float]) -> list[str]:
+    if not values:
+        return ["[dim]-[/dim]"] * 3
+    return [
+        _format_seconds(percentile(values, 0.5)),
+        _format_seconds(percentile(values, 0.95)),
+        _format_seconds(max(values)),
+    ]
+
+
+def _format_failures(failed: int, runs: int) -> str:
+    text = f"{failed / runs:.0%}"
+    return f"[red]{text}[/red]" if failed else f"[green]{text}[/green]"
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, rest = divmod(round(seconds), 60)
+    return f"{minutes}m{rest:02d}s"
+
+
+def _format_rate(bytes_per_second: float) -> str:
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1000:
+            return f"{bytes_per_second:.0f} {unit}"
+        bytes_per_second /= 1000
+    return f"{bytes_per_second:.1f} GB/s"
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from bifrost.infra.cache import cache_dir, read_json, write_json_atomic
+
+# Bump when the layout of cached run records changes.
+HISTORY_CACHE_FORMAT = 1
+
+
+@dataclass(frozen=True, slots=True)
+class RunRecord:
+    """The parts of one local run.json that the statistics use."""
+
+    run_id: str
+    setup: str
+    command: str
+    timestamp: datetime
+    exit_code: int
+    duration_s: float | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    bytes_copied: int = 0
+
+    @property
+    def total_s(self) -> float | None:
+        """Wall time of the whole run; just the command for runs without timings."""
+        if self.timings:
+            return sum(self.timings.values())
+        return self.duration_s
+
+    @property
+    def failed(self) -> bool:
+        return self.exit_code != 0
+
+    @property
+    def throughput(self) -> float | None:
+        """Bytes per second copied back from the setup."""
+        copy_s = self.timings.get("copy")
+        if not self.bytes_copied or not copy_s:
+            return None
+        return self.bytes_copied / copy_s
+
+    @classmethod
+    def from_run_file(cls, run_file: Path) -> RunRecord | None:
+        """Read a run.json, or None if it is unreadable or malformed."""
+        try:
+            data = json.loads(run_file.read_text())
+            timings = data.get("timings") or {}
+            record = cls(
+                run_id=str(data["run_id"]),
+                setup=str(data["setup"]),
+                command=" ".join(data["command"]),
+                timestamp=_as_utc(datetime.fromisoformat(data["timestamp"])),
+                exit_code=int(data["exit_code"]),
+                duration_s=_optional_float(data.get("duration_s")),
+                timings={str(k): float(v) for k, v in timings.items()},
+                bytes_copied=_bytes_copied(run_file.parent),
+            )
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+        return record
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RunRecord:
+        return cls(
+            run_id=str(data["run_id"]),
+            setup=str(data["setup"]),
+            command=str(data["command"]),
+            timestamp=_as_utc(datetime.fromisoformat(data["timestamp"])),
+            exit_code=int(data["exit_code"]),
+            duration_s=_optional_float(data.get("duration_s")),
+            timings={str(k): float(v) for k, v in data["timings"].items()},
+            bytes_copied=int(data["bytes_copied"]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "setup": self.setup,
+            "command": self.command,
+            "timestamp": self.timestamp.isoformat(),
+            "exit_code": self.exit_code,
+            "duration_s": self.duration_s,
+            "timings": self.timings,
+            "bytes_copied": self.bytes_copied,
+        }
+
+
+class RunHistory:
+    """Run records of local log directories, scanned incrementally.
+
+    Records are cached per directory, keyed by each run.json's mtime and
+    size. A rescan only stats the run files and parses new or changed ones,
+    so reports over thousands of runs stay instant.
+    """
+
+    def load(self, log_dir: Path) -> list[RunRecord]:
+        cache_path = _cache_path(log_dir)
+        cached = read_json(cache_path)
+        known: dict[str, Any] = {}
+        if isinstance(cached, dict) and cached.get("format") == HISTORY_CACHE_FORMAT:
+            cached_runs = cached.get("runs")
+            known = cached_runs if isinstance(cached_runs, dict) else {}
+
+        runs: dict[str, Any] = {}
+        records: list[RunRecord] = []
+        for run_file in sorted(log_dir.glob("*/run.json")):
+            try:
+                stat = run_file.stat()
+            except OSError:
+                continue
+            key = run_file.parent.name
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            cached_record = _cached_record(known.get(key), stamp)
+            if cached_record is not None:
+                record = cached_record
+            else:
+                parsed = RunRecord.from_run_file(run_file)
+                if parsed is None:
+                    continue
+                record = parsed
+            runs[key] = {"stamp": stamp, "record": record.to_dict()}
+            records.append(record)
+
+        if runs != known:
+            # The cache is an optimization; a read-only cache dir is not an error.
+            with suppress(OSError):
+                write_json_atomic(
+                    cache_path, {"format": HISTORY_CACHE_FORMAT, "runs": runs}
+                )
+        return records
+
+    def load_all(self, log_dirs: Iterable[Path]) -> list[RunRecord]:
+        records: list[RunRecord] = []
+        for log_dir in dict.fromkeys(log_dirs):
+            records.extend(self.load(log_dir))
+        return records
+
+
+def _cached_record(entry: Any, stamp: list[int]) -> RunRecord | None:
+    """The record cached for a run file with `stamp`, if intact.
+
+    A damaged or hand-edited entry only costs parsing the run file again.
+    """
+    if not isinstance(entry, dict) or entry.get("stamp") != stamp:
+        return None
+    try:
+        return RunRecord.from_dict(entry["record"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values`, e.g. 0.95 for p95."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    # Older runs were stamped without a timezone, in UTC.
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def _optional_float(value: Any) -> float | None:
+    return None if value is None else float(value)
+
+
+def _bytes_copied(run_dir: Path) -> int:
+    return sum(
+        path.stat().st_size
+        for path in run_dir.rglob("*")
+        if path.is_file() and path.name != "run.json"
+    )
+
+
+def _cache_path(log_dir: Path) -> Path:
+    digest = hashlib.sha256(str(log_dir.resolve()).encode()).hexdigest()
+    return cache_dir() / "stats" / f"{digest}.json"
@@ -1,65 +1,107 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
 import typer
 from rich.console import Console
 from rich.table import Table
 
-from bifrost.cli.app import app
+from bifrost.cli.completion import complete_setups
 from bifrost.di import Container
-from bifrost.infra.pipeline_gate import create_pipeline_gate
-from bifrost.infra.ssh import check_reachable
+from bifrost.infra.lease import LeaseState
+from bifrost.infra.transport import check_reachable
+from bifrost.shared import BifrostConfig, ConfigError, SetupConfig
 
 console = Console()
 
 
-@app.command()
 def status(
     ctx: typer.Context,
     setup: str | None = typer.Option(
-        None, "--setup", "-s", help="Check a specific setup"
+        None,
+        "--setup",
+        "-s",
+        help="Check a specific setup",
+        autocompletion=complete_setups,
+    ),
+    select: str | None = typer.Option(
+        None, "--select", help="Check only setups matching a label selector"
     ),
 ) -> None:
     """Show CI pipeline state and setup reachability."""
     container: Container = ctx.obj
     config = container.get_config()
+    gates = container.get_gate_registry()
+    leases = container.get_lease_store()
 
-    setups_to_check = {setup: config.setups[setup]} if setup else config.setups
+    setups_to_check = _select(config, setup, select)
 
     table = Table(title="Setup Status")
     table.add_column("Setup", style="bold")
     table.add_column("Host")
     table.add_column("Reachable")
     table.add_column("CI Busy")
+    table.add_column("Held By")
 
-    for name, setup_config in setups_to_check.items():
+    def probe(setup_config: SetupConfig) -> tuple[bool, bool | None, str]:
         reachable = check_reachable(setup_config)
+        held_by = "[dim]n/a[/dim]"
+        if reachable:
+            with suppress(Exception):
+                held_by = _format_lease(leases.peek(setup_config))
         try:
             pipeline_config = (
                 config.pipelines.get(setup_config.pipeline)
                 if setup_config.pipeline
                 else None
             )
-            pipeline_gate = create_pipeline_gate(pipeline_config)
-            busy = pipeline_gate.is_busy(name)
+            busy = gates.is_busy(pipeline_config, setup_config.name, setup_config.ci)
         except Exception:
             busy = None
+        return reachable, busy, held_by
 
-        table.add_row(
-            name,
-            f"{setup_config.user}@{setup_config.host}",
-            "[green]yes[/green]" if reachable else "[red]no[/red]",
-            "[yellow]yes[/yellow]"
-            if busy
-            else "[green]no[/green]"
-            if busy is not None
-            else "[dim]n/a[/dim]",
-        )
+    with ThreadPoolExecutor(max_workers=min(16, len(setups_to_check) or 1)) as pool:
+        results = pool.map(probe, setups_to_check.values())
+
+        for (name, setup_config), (reachable, busy, held_by) in zip(
+            setups_to_check.items(), results, strict=True
+        ):
+            table.add_row(
+                name,
+                f"{setup_config.user}@{setup_config.host}",
+                "[green]yes[/green]" if reachable else "[red]no[/red]",
+                "[yellow]yes[/yellow]"
+                if busy
+                else "[green]no[/green]"
+                if busy is not None
+                else "[dim]n/a[/dim]",
+                held_by,
+            )
 
     console.print(table)
 
 
-@app.command()
-def setups(ctx: typer.Context) -> None:
+def _format_lease(state: LeaseState) -> str:
+    queued = f" [dim]+{state.queued} waiting[/dim]" if state.queued else ""
+    if state.holder is None:
+        return f"[dim]-[/dim]{queued}"
+
+    left = state.expires_in or 0.0
+    if left < 0:
+        return f"[dim]{state.holder.owner} (expired)[/dim]{queued}"
+    return (
+        f"[yellow]{state.holder.owner}[/yellow] "
+        f"(run {state.holder.run_id}, {left / 60:.0f}m left){queued}"
+    )
+
+
+def setups(
+    ctx: typer.Context,
+    select: str | None = typer.Option(
+        None, "--select", help="List only setups matching a label selector"
+    ),
+) -> None:
     """List all configured setups."""
     container: Container = ctx.obj
     config = container.get_config()
@@ -69,16 +111,34 @@ def setups(ctx: typer.Context) -> None:
     table.add_column("Host")
     table.add_column("User")
     table.add_column("Runner")
+    table.add_column("Labels")
     table.add_column("Default", justify="center")
 
-    for name, setup_config in config.setups.items():
+    for name, setup_config in _select(config, None, select).items():
         is_default = name == config.default_setup
+        labels = ",".join(f"{k}={v}" for k, v in setup_config.labels.items())
         table.add_row(
             name,
             setup_config.host,
             setup_config.user,
             setup_config.runner or "[dim]-[/dim]",
+            labels or "[dim]-[/dim]",
             "[green]✓[/green]" if is_default else "",
         )
 
     console.print(table)
+
+
+def _select(
+    config: BifrostConfig, setup: str | None, select: str | None
+) -> dict[str, SetupConfig]:
+    if setup and select:
+        raise ConfigError("Use either --setup or --select, not both")
+    if select:
+        return {member.name: member for member in config.select(select)}
+    if setup:
+        if setup not in config.setups:
+            available = list(config.setups)
+            raise ConfigError(f"Setup '{setup}' not found. Available: {available}")
+        return {setup: config.setups[setup]}
+    return config.setups
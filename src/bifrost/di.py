@@ -3,10 +3,18 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
-from bifrost.infra.log_store import LogStore
-from bifrost.shared import BifrostConfig, ConfigManager
+# Implementations are imported on first use to keep CLI startup fast.
+if TYPE_CHECKING:
+    from bifrost.infra.lease import LeaseStore
+    from bifrost.infra.log_queue import LogQueue
+    from bifrost.infra.log_store import LogStore
+    from bifrost.infra.pipeline_gate import PipelineGateRegistry
+    from bifrost.shared import BifrostConfig, ConfigManager
+
+# Seconds a pipeline gate answer is reused within one command.
+GATE_RESULT_MAX_AGE = 30.0
 
 
 class Container(Protocol):
@@ -15,6 +23,9 @@ class Container(Protocol):
     def get_config_manager(self) -> ConfigManager: ...
     def get_config(self, path: Path | None = None) -> BifrostConfig: ...
     def get_log_store(self) -> LogStore: ...
+    def get_gate_registry(self) -> PipelineGateRegistry: ...
+    def get_lease_store(self) -> LeaseStore: ...
+    def get_log_queue(self) -> LogQueue: ...
 
 
 class DefaultContainer:
@@ -28,10 +39,15 @@ class DefaultContainer:
         self._config_manager: ConfigManager | None = None
         self._config: BifrostConfig | None = None
         self._log_store: LogStore | None = None
+        self._gate_registry: PipelineGateRegistry | None = None
+        self._lease_store: LeaseStore | None = None
+        self._log_queue: LogQueue | None = None
 
     def get_config_manager(self) -> ConfigManager:
         """Get the configuration manager instance."""
         if self._config_manager is None:
+            from bifrost.shared import ConfigManager
+
             self._config_manager = ConfigManager()
         return self._config_manager
 
@@ -52,9 +68,35 @@ class DefaultContainer:
     def get_log_store(self) -> LogStore:
         """Get the log store instance."""
         if self._log_store is None:
+            from bifrost.infra.log_store import LogStore
+
             self._log_store = LogStore()
         return self._log_store
 
+    def get_gate_registry(self) -> PipelineGateRegistry:
+        """Get the pipeline gate registry shared by the whole command."""
+        if self._gate_registry is None:
+            from bifrost.infra.pipeline_gate import PipelineGateRegistry
+
+            self._gate_registry = PipelineGateRegistry(max_age=GATE_RESULT_MAX_AGE)
+        return self._gate_registry
+
+    def get_lease_store(self) -> LeaseStore:
+        """Get the setup lease store instance."""
+        if self._lease_store is None:
+            from bifrost.infra.lease import LeaseStore
+
+            self._lease_store = LeaseStore()
+        return self._lease_store
+
+    def get_log_queue(self) -> LogQueue:
+        """Get the queue of runs whose logs are shipped in the background."""
+        if self._log_queue is None:
+            from bifrost.infra.log_queue import LogQueue
+
+            self._log_queue = LogQueue()
+        return self._log_queue
+
 
 def create_container() -> Container:
     """Create a new dependency injection container.
@@ -0,0 +1,400 @@
+"""Transport through a resident bf agent on the setup.
+
+The first operation on an `agent: true` setup starts one ssh session running
+`agent_server.py` on the setup, uploading the script first if the setup does
+not have this exact version yet. Later operations are frames on that session:
+a command costs a fork on the setup instead of an ssh handshake and a login
+shell, and logs are fetched in two round trips without rsync. The session
+lives until the `connection()` block that started it ends, or until bf exits.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import select
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from pathlib import Path
+from typing import IO, Any
+
+from bifrost.infra import agent_server, trace
+from bifrost.infra.ssh import open_interactive_session, ssh_options
+from bifrost.shared import LogCopyError, SetupConfig, SshError
+
+AGENT_SOURCE = Path(agent_server.__file__).read_bytes()
+AGENT_DIGEST = hashlib.sha256(AGENT_SOURCE).hexdigest()
+# Relative to the login directory of the setup.
+AGENT_DIR = ".cache/bifrost"
+COMMAND_TIMEOUT = 600.0
+HANDSHAKE_TIMEOUT = 30.0
+
+# Runs the agent only if its content matches the digest; a corrupt or
+# tampered file is removed, so the next connection uploads it again.
+_LOADER = """\
+import hashlib, os, sys
+path, digest = sys.argv[1:3]
+source = open(path, "rb").read()
+if hashlib.sha256(source).hexdigest() != digest:
+    os.remove(path)
+    sys.stdout.write("bf-agent-error hash mismatch\\n")
+    sys.exit(1)
+sys.argv = [path]
+exec(compile(source, path, "exec"), {"__name__": "__main__", "__file__": path})
+"""
+
+_BOOTSTRAP = """\
+f={dir}/agent-{digest}.py
+if [ ! -f "$f" ]; then
+    echo bf-agent-upload
+    mkdir -p {dir} && head -c {size} > "$f.$$" && mv "$f.$$" "$f" || exit 1
+fi
+exec python3 -c {loader} "$f" {digest}
+"""
+
+
+class AgentSession:
+    """One running agent on a setup; requests are served one at a time."""
+
+    def __init__(self, setup: SetupConfig, connect_timeout: int | None = None) -> None:
+        self._setup = setup
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # Closed by close(); a file, so a chatty remote never blocks on it.
+        self._stderr = tempfile.TemporaryFile()  # noqa: SIM115
+        bootstrap = _BOOTSTRAP.format(
+            dir=AGENT_DIR,
+            digest=AGENT_DIGEST,
+            size=len(AGENT_SOURCE),
+            loader=shlex.quote(_LOADER),
+        )
+        argv = ["ssh", "-o", "BatchMode=yes"]
+        if connect_timeout is not None:
+            argv += ["-o", f"ConnectTimeout={connect_timeout}"]
+        argv += [
+            *ssh_options(setup),
+            f"{setup.user}@{setup.host}",
+            f"sh -c {shlex.quote(bootstrap)}",
+        ]
+
+        with trace.span("agent start", "agent", setup=setup.name) as traced:
+            try:
+                self._process = subprocess.Popen(
+                    argv,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=self._stderr,
+                    bufsize=0,
+                )
+            except OSError as e:
+                raise SshError(f"Failed to execute SSH to {setup.name}: {e}") from e
+            try:
+                traced["uploaded"] = self._handshake()
+            except BaseException:
+                self.close()
+                raise
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def request(
+        self,
+        header: dict[str, Any],
+        data: bytes = b"",
+        timeout: float = COMMAND_TIMEOUT,
+    ) -> Iterator[tuple[dict[str, Any], bytes]]:
+        """Send one request and yield its response frames, the terminal one last.
+
+        The session is held for the whole iteration, so consume it fully.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._write(agent_server.pack_frame({**header, "id": request_id}, data))
+            while True:
+                response, payload = self._read_frame(deadline)
+                if response.get("id") != request_id:
+                    continue
+                yield response, payload
+                if response.get("type") in agent_server.TERMINAL_TYPES:
+                    return
+
+    def call(
+        self, header: dict[str, Any], data: bytes = b"", timeout: float = 60.0
+    ) -> dict[str, Any]:
+        """Send a request answered by a single frame and return that frame."""
+        frames = list(self.request(header, data, timeout))
+        response = frames[-1][0]
+        if response.get("type") == "error":
+            raise SshError(
+                f"{header['op']} failed on {self._setup.name}: {response['message']}"
+            )
+        return response
+
+    def close(self) -> None:
+        if self._process.stdin is not None:
+            self._process.stdin.close()
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        if self._process.stdout is not None:
+            self._process.stdout.close()
+        self._stderr.close()
+
+    def _handshake(self) -> bool:
+        """Wait for the agent's hello, uploading the agent if asked to."""
+        deadline = time.monotonic() + HANDSHAKE_TIMEOUT
+        uploaded = False
+        while True:
+            line = self._read_line(deadline)
+            if line == "bf-agent-upload":
+                self._write(AGENT_SOURCE)
+                uploaded = True
+            elif line.startswith("bf-agent-error"):
+                raise SshError(f"bf agent failed on {self._setup.name}: {line[15:]}")
+            elif line.startswith("bf-agent "):
+                _, version, digest = line.split()
+                if int(version) != agent_server.PROTOCOL_VERSION or (
+                    digest != AGENT_DIGEST
+                ):
+                    raise SshError(f"Unexpected bf agent on {self._setup.name}")
+                return uploaded
+            # Anything else is noise from the setup's shell startup files.
+
+    def _read_line(self, deadline: float) -> str:
+        line = bytearray()
+        while not line.endswith(b"\n"):
+            line += self._read(1, deadline)
+        return line.decode(errors="replace").strip()
+
+    def _read_frame(self, deadline: float) -> tuple[dict[str, Any], bytes]:
+        prefix = self._read(agent_server.FRAME_PREFIX.size, deadline)
+        (length,) = agent_server.FRAME_PREFIX.unpack(prefix)
+        header = json.loads(self._read(length, deadline))
+        return header, self._read(header.get("size", 0), deadline)
+
+    def _read(self, size: int, deadline: float) -> bytes:
+        stdout = self._stdout()
+        data = bytearray()
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([stdout], [], [], max(remaining, 0))
+            if not ready:
+                self.close()
+                raise SshError(f"bf agent timed out on {self._setup.name}")
+            chunk = os.read(stdout.fileno(), size - len(data))
+            if not chunk:
+                raise SshError(
+                    f"bf agent on {self._setup.name} exited: {self._error_output()}"
+                )
+            data += chunk
+        return bytes(data)
+
+    def _write(self, data: bytes) -> None:
+        stdin = self._process.stdin
+        assert stdin is not None
+        try:
+            stdin.write(data)
+            stdin.flush()
+        except OSError as e:
+            raise SshError(f"bf agent on {self._setup.name} is gone: {e}") from e
+
+    def _stdout(self) -> IO[bytes]:
+        stdout = self._process.stdout
+        assert stdout is not None
+        return stdout
+
+    def _error_output(self) -> str:
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._stderr.seek(0)
+        output = self._stderr.read().decode(errors="replace").strip()
+        return output or f"exit code {self._process.returncode}"
+
+
+_sessions: dict[str, AgentSession] = {}
+_sessions_lock = threading.Lock()
+# Held while an agent starts, so setups connect in parallel but each only once.
+_start_locks: dict[str, threading.Lock] = {}
+
+
+def agent_session(
+    setup: SetupConfig, connect_timeout: int | None = None
+) -> AgentSession:
+    """The running agent of `setup`, started on first use."""
+    with _sessions_lock:
+        start_lock = _start_locks.setdefault(setup.name, threading.Lock())
+    with start_lock:
+        session = _sessions.get(setup.name)
+        if session is None or not session.alive:
+            session = AgentSession(setup, connect_timeout)
+            with _sessions_lock:
+                _sessions[setup.name] = session
+        return session
+
+
+def close_agent(setup: SetupConfig) -> None:
+    with _sessions_lock:
+        session = _sessions.pop(setup.name, None)
+    if session is not None:
+        session.close()
+
+
+@atexit.register
+def close_agents() -> None:
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+class AgentTransport:
+    """Reaches a setup through its resident bf agent."""
+
+    def __init__(self, setup: SetupConfig) -> None:
+        self._setup = setup
+
+    def run(
+        self, command: list[str], capture: bool = True
+    ) -> subprocess.CompletedProcess[str]:
+        remote_cmd = " ".join(command)
+        output = {"stdout": bytearray(), "stderr": bytearray()}
+        code = 255
+        with trace.span(
+            "agent exec",
+            "agent",
+            setup=self._setup.name,
+            command=trace.redact(remote_cmd),
+        ) as traced:
+            session = agent_session(self._setup)
+            for response, data in session.request(
+                {"op": "exec", "command": remote_cmd}
+            ):
+                kind = response["type"]
+                if kind in output:
+                    if capture:
+                        output[kind] += data
+                    else:
+                        stream = sys.stdout if kind == "stdout" else sys.stderr
+                        stream.buffer.write(data)
+                        stream.flush()
+                elif kind == "exit":
+                    code = response["code"]
+                elif kind == "error":
+                    raise SshError(
+                        f"Failed to run command on {self._setup.name}: "
+                        f"{response['message']}"
+                    )
+            traced["exit_code"] = code
+
+        if not capture:
+            return subprocess.CompletedProcess(command, code)
+        return subprocess.CompletedProcess(
+            command,
+            code,
+            stdout=output["stdout"].decode(errors="replace"),
+            stderr=output["stderr"].decode(errors="replace"),
+        )
+
+    def is_reachable(self, timeout: int = 5) -> bool:
+        try:
+            agent_session(self._setup, connect_timeout=timeout)
+        except SshError:
+            return False
+        return True
+
+    @contextmanager
+    def _connected(self) -> Iterator[None]:
+        started = self._setup.name not in _sessions
+        agent_session(self._setup)
+        try:
+            yield
+        finally:
+            if started:
+                close_agent(self._setup)
+
+    def connection(self) -> AbstractContextManager[None]:
+        return self._connected()
+
+    def write_file(self, path: str, content: str) -> None:
+        with trace.span("agent write", "agent", setup=self._setup.name, path=path):
+            agent_session(self._setup).call(
+                {"op": "write", "path": path}, content.encode()
+            )
+
+    def fetch_dir(self, remote_dir: str, local_dir: Path) -> None:
+        """Copy new and changed files of `remote_dir`, by size and mtime."""
+        with trace.span(
+            "agent fetch", "agent", setup=self._setup.name, path=remote_dir
+        ) as traced:
+            try:
+                traced["files"] = self._fetch(remote_dir, local_dir)
+            except (SshError, OSError) as e:
+                raise LogCopyError(
+                    f"Copying logs failed for {self._setup.name}: {e}"
+                ) from e
+
+    def _fetch(self, remote_dir: str, local_dir: Path) -> int:
+        session = agent_session(self._setup)
+        manifest = session.call({"op": "manifest", "path": remote_dir})
+        wanted = [
+            relative
+            for relative, size, mtime_ns in manifest["files"]
+            if not _is_same(local_dir / relative, size, mtime_ns)
+        ]
+        if not wanted:
+            return 0
+
+        target: IO[bytes] | None = None
+        current: dict[str, Any] = {}
+        try:
+            for response, data in session.request(
+                {"op": "read", "root": remote_dir, "paths": wanted}
+            ):
+                if response["type"] in ("file", "end", "error") and target:
+                    target.close()
+                    _finish(local_dir / current["path"], current)
+                    target = None
+                if response["type"] == "file":
+                    current = response
+                    path = local_dir / response["path"]
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    target = path.open("wb")
+                elif response["type"] == "data" and target:
+                    target.write(data)
+                elif response["type"] == "error":
+                    raise SshError(response["message"])
+        finally:
+            if target:
+                target.close()
+        return len(wanted)
+
+    def interactive(self) -> int:
+        return open_interactive_session(self._setup)
+
+
+def _is_same(path: Path, size: int, mtime_ns: int) -> bool:
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    return stat.st_size == size and stat.st_mtime_ns == mtime_ns
+
+
+def _finish(path: Path, header: dict[str, Any]) -> None:
+    os.chmod(path, header["mode"])
+    os.utime(path, ns=(header["mtime_ns"], header["mtime_ns"]))
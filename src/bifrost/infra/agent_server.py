@@ -0,0 +1,181 @@
+"""The bf agent: serves bf's requests on a setup over stdin/stdout.
+
+`bifrost.infra.agent` uploads this file to the setup and starts it once per
+connection, so every later operation costs a message instead of an ssh
+session and a login shell. It must run with a bare python3 (3.7+) and the
+standard library only.
+
+After a `bf-agent <version> <sha256>` hello line, both directions carry
+frames: a 4-byte big-endian length, a JSON header of that length and then,
+if the header has a `size`, that many bytes of payload. Requests carry an
+`id` and an `op`; every response frame echoes the `id`, and the last one of
+a request has a terminal `type` (see `TERMINAL_TYPES`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+from typing import Any, BinaryIO
+
+PROTOCOL_VERSION = 1
+CHUNK_SIZE = 64 * 1024
+FRAME_PREFIX = struct.Struct(">I")
+TERMINAL_TYPES = frozenset({"exit", "ok", "stat", "manifest", "end", "error"})
+
+
+def pack_frame(header: dict[str, Any], data: bytes = b"") -> bytes:
+    if data:
+        header = {**header, "size": len(data)}
+    encoded = json.dumps(header).encode()
+    return FRAME_PREFIX.pack(len(encoded)) + encoded + data
+
+
+class Server:
+    def __init__(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = threading.Lock()
+
+    def serve(self) -> None:
+        while True:
+            request = self._read_frame()
+            if request is None:
+                return
+            header, data = request
+            request_id = header.get("id")
+            try:
+                handler = getattr(self, "_op_" + str(header.get("op")))
+            except AttributeError:
+                self._send(request_id, {"type": "error", "message": "unknown op"})
+                continue
+            try:
+                handler(request_id, header, data)
+            except (OSError, ValueError, KeyError) as e:
+                self._send(request_id, {"type": "error", "message": str(e)})
+
+    def _op_exec(self, request_id: int, header: dict[str, Any], data: bytes) -> None:
+        process = subprocess.Popen(
+            ["/bin/sh", "-c", header["command"]],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        pumps = [
+            threading.Thread(target=self._pump, args=(request_id, name, pipe))
+            for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))
+        ]
+        for pump in pumps:
+            pump.start()
+        for pump in pumps:
+            pump.join()
+        self._send(request_id, {"type": "exit", "code": process.wait()})
+
+    def _op_write(self, request_id: int, header: dict[str, Any], data: bytes) -> None:
+        path = header["path"]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._send(request_id, {"type": "ok"})
+
+    def _op_stat(self, request_id: int, header: dict[str, Any], data: bytes) -> None:
+        try:
+            stat = os.stat(header["path"])
+        except FileNotFoundError:
+            self._send(request_id, {"type": "stat", "exists": False})
+            return
+        self._send(
+            request_id,
+            {
+                "type": "stat",
+                "exists": True,
+                "is_dir": os.path.isdir(header["path"]),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            },
+        )
+
+    def _op_manifest(
+        self, request_id: int, header: dict[str, Any], data: bytes
+    ) -> None:
+        root = header["path"]
+        if not os.path.isdir(root):
+            raise FileNotFoundError("No such directory: " + root)
+        files = []
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                relative = os.path.relpath(path, root)
+                files.append([relative, stat.st_size, stat.st_mtime_ns])
+        self._send(request_id, {"type": "manifest", "files": sorted(files)})
+
+    def _op_read(self, request_id: int, header: dict[str, Any], data: bytes) -> None:
+        """Stream the files `paths` under `root`, each as a file frame + data."""
+        root = header["root"]
+        for relative in header["paths"]:
+            path = os.path.join(root, relative)
+            stat = os.stat(path)
+            self._send(
+                request_id,
+                {
+                    "type": "file",
+                    "path": relative,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "mode": stat.st_mode & 0o777,
+                },
+            )
+            with open(path, "rb") as f:
+                chunk = f.read(CHUNK_SIZE)
+                while chunk:
+                    self._send(request_id, {"type": "data"}, chunk)
+                    chunk = f.read(CHUNK_SIZE)
+        self._send(request_id, {"type": "end"})
+
+    def _pump(self, request_id: int, name: str, pipe: BinaryIO) -> None:
+        fd = pipe.fileno()
+        for chunk in iter(lambda: os.read(fd, CHUNK_SIZE), b""):
+            self._send(request_id, {"type": name}, chunk)
+        pipe.close()
+
+    def _send(
+        self, request_id: int | None, header: dict[str, Any], data: bytes = b""
+    ) -> None:
+        frame = pack_frame({**header, "id": request_id}, data)
+        with self._write_lock:
+            self._writer.write(frame)
+            self._writer.flush()
+
+    def _read_frame(self) -> tuple[dict[str, Any], bytes] | None:
+        prefix = self._reader.read(FRAME_PREFIX.size)
+        if len(prefix) < FRAME_PREFIX.size:
+            return None
+        (length,) = FRAME_PREFIX.unpack(prefix)
+        header = json.loads(self._reader.read(length))
+        data = self._reader.read(header.get("size", 0))
+        return header, data
+
+
+def main() -> int:
+    # The loader bf starts this file with has verified it against this digest.
+    with open(__file__, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    writer = sys.stdout.buffer
+    writer.write(f"bf-agent {PROTOCOL_VERSION} {digest}\n".encode())
+    writer.flush()
+    Server(sys.stdin.buffer, writer).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
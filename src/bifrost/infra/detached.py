@@ -0,0 +1,277 @@
+"""Runs that outlive the bf process and connection that started them.
+
+`bf run --detach` starts the command under a supervisor on the setup, in its
+own session and immune to hangups, so a dropped connection or a sleeping
+laptop does not kill it. The supervisor keeps its state in the run directory
+`<remote_log_dir>/<run_id>/`:
+
+- `detached.json`: the run's metadata as it was launched
+- `pid`: the supervisor, which leads the command's process group
+- `output.log`: the command's stdout and stderr
+- `duration` and `exit_code`: written once the command exits, `exit_code` last
+
+The supervisor renews the setup's lease held for the run while the command
+runs, and releases it when the command exits (see `lease.py` for its format).
+"""
+
+from __future__ import annotations
+
+import json
+import shlex
+import subprocess
+from dataclasses import dataclass, replace
+
+from bifrost.infra.lease import LEASE_RENEW_INTERVAL, LEASE_TTL
+from bifrost.infra.transport import run_remote
+from bifrost.shared import (
+    BifrostError,
+    ConfigError,
+    RunMetadata,
+    SetupConfig,
+    SshError,
+)
+
+# Lines of output fetched per poll; a longer backlog takes several polls.
+CHUNK_LINES = 10_000
+# Seconds `cancel` gives the command to exit on SIGTERM before killing it.
+CANCEL_GRACE = 10
+
+# Shared by the supervisor and `cancel`, which both may finish a run.
+_PRELUDE = """
+dir=$1 run_id=$2
+lease="${dir%/*}/lease.json"
+finish() {
+    echo "$1" > "$dir/exit_code.tmp" && mv "$dir/exit_code.tmp" "$dir/exit_code"
+    grep -q "\\"run_id\\": \\"$run_id\\"" "$lease" 2>/dev/null && rm -f "$lease"
+}
+"""
+
+# Runs as the session leader, so its pid is the command's process group.
+# SIGTERM only ends the command; the supervisor still records its exit code.
+# While the command runs, a renewer keeps the run's lease from expiring.
+_SUPERVISOR_SCRIPT = (
+    _PRELUDE
+    + """
+command=$3 ttl=$4 interval=$5
+echo $$ > "$dir/pid.tmp" && mv "$dir/pid.tmp" "$dir/pid"
+trap : TERM INT
+renew() {
+    grep -q "\\"run_id\\": \\"$run_id\\"" "$lease" 2>/dev/null || return 1
+    expires=$(($(date +%s) + ttl))
+    sed "s/\\"expires_at\\": *[0-9]*/\\"expires_at\\": $expires/" "$lease" \\
+        > "$lease.renew.$run_id" && mv "$lease.renew.$run_id" "$lease"
+}
+(
+    trap 'kill "$sleeper" 2>/dev/null; exit 0' TERM
+    while :; do
+        sleep "$interval" & sleeper=$!
+        wait "$sleeper"
+        renew || exit 0
+    done
+) &
+renewer=$!
+started=$(date +%s)
+sh -c "$command" > "$dir/output.log" 2>&1 < /dev/null
+code=$?
+echo $(($(date +%s) - started)) > "$dir/duration"
+# A renewal still in flight must not recreate the released lease.
+kill "$renewer" 2>/dev/null
+wait "$renewer"
+finish "$code"
+"""
+)
+
+_LAUNCH_SCRIPT = """
+supervisor=$1 dir=$2 run_id=$3 metadata=$4 command=$5 ttl=$6 interval=$7
+mkdir -p "$dir" && dir=$(cd "$dir" && pwd) || exit 1
+printf '%s\\n' "$metadata" > "$dir/detached.json"
+setsid=
+command -v setsid > /dev/null 2>&1 && setsid=setsid
+$setsid nohup sh -c "$supervisor" bf-supervisor "$dir" "$run_id" "$command" \\
+    "$ttl" "$interval" < /dev/null > /dev/null 2>&1 &
+i=0
+while [ ! -f "$dir/pid" ] && [ $i -lt 100 ]; do sleep 0.05; i=$((i + 1)); done
+[ -f "$dir/pid" ] || exit 1
+echo STARTED
+"""
+
+# First line: the run's state, then its detached.json, then new output lines.
+# The state is read before the output, so an exited run's output is complete.
+_POLL_SCRIPT = """
+dir=$1 offset=$2 lines=$3
+[ -f "$dir/pid" ] || { echo MISSING; exit 0; }
+state=LOST
+kill -0 "$(cat "$dir/pid")" 2>/dev/null && state=RUNNING
+[ -f "$dir/exit_code" ] && \\
+    state="EXITED $(cat "$dir/exit_code") $(cat "$dir/duration" 2>/dev/null)"
+echo "$state"
+cat "$dir/detached.json"
+[ "$lines" -gt 0 ] && tail -n "+$((offset + 1))" "$dir/output.log" 2>/dev/null \\
+    | head -n "$lines"
+exit 0
+"""
+
+_CANCEL_SCRIPT = (
+    _PRELUDE
+    + """
+grace=$3
+[ -f "$dir/pid" ] || { echo MISSING; exit 0; }
+[ -f "$dir/exit_code" ] && { echo EXITED; exit 0; }
+pid=$(cat "$dir/pid")
+descendants() {
+    for child in $(pgrep -P "$1" 2>/dev/null); do
+        echo "$child"
+        descendants "$child"
+    done
+}
+signal() {
+    # Without setsid, the supervisor leads no process group of its own, so
+    # its descendants are signalled one by one, collected before any dies.
+    kill "-$1" "-$pid" 2>/dev/null || kill "-$1" $(descendants "$pid") 2>/dev/null
+}
+signal TERM
+i=0
+while [ ! -f "$dir/exit_code" ] && [ $i -lt $((grace * 10)) ]; do
+    sleep 0.1
+    i=$((i + 1))
+done
+if [ ! -f "$dir/exit_code" ]; then
+    signal KILL
+    kill -KILL "$pid" 2>/dev/null
+    finish 137
+fi
+echo CANCELLED
+"""
+)
+
+
+@dataclass(frozen=True, slots=True)
+class DetachedRun:
+    """A detached run as one poll found it."""
+
+    # As launched; once exited, with its exit code and duration.
+    metadata: RunMetadata
+    # "running", "exited", or "lost" if the supervisor died without an exit
+    # code, e.g. because the setup rebooted.
+    state: str
+    # New output lines, and the line offset to poll from next.
+    output: str = ""
+    offset: int = 0
+    # Whether more output is waiting beyond this poll's chunk.
+    more: bool = False
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+
+def remote_run_dir(setup: SetupConfig, run_id: str) -> str:
+    return f"{setup.logs.remote_log_dir}/{run_id}"
+
+
+def launch(
+    setup: SetupConfig,
+    metadata: RunMetadata,
+    ttl: int = LEASE_TTL,
+    renew_interval: float = LEASE_RENEW_INTERVAL,
+) -> None:
+    """Start `metadata.command` under a supervisor and return once it runs.
+
+    The command runs through the setup's shell in its login (or root)
+    directory, the way `run_remote` runs it. Every `renew_interval` seconds
+    until it exits, the supervisor extends the run's lease to `ttl` seconds.
+    """
+    result = _run_script(
+        setup,
+        _LAUNCH_SCRIPT,
+        _SUPERVISOR_SCRIPT,
+        remote_run_dir(setup, metadata.run_id),
+        metadata.run_id,
+        json.dumps(metadata.to_dict()),
+        " ".join(metadata.command),
+        str(ttl),
+        str(max(int(renew_interval), 1)),
+    )
+    if result.returncode != 0 or result.stdout.strip() != "STARTED":
+        raise SshError(
+            f"Failed to start run {metadata.run_id} on {setup.name}: "
+            f"{result.stderr.strip()}"
+        )
+
+
+def poll(
+    setup: SetupConfig, run_id: str, offset: int = 0, lines: int = CHUNK_LINES
+) -> DetachedRun:
+    """The state of a detached run and up to `lines` output lines past `offset`.
+
+    Only complete lines are returned while the command runs, so a line is
+    never split across polls.
+    """
+    result = _run_script(
+        setup, _POLL_SCRIPT, remote_run_dir(setup, run_id), str(offset), str(lines)
+    )
+    state_line, _, rest = result.stdout.partition("\n")
+    if result.returncode != 0 or not state_line:
+        raise SshError(
+            f"Failed to poll run {run_id} on {setup.name}: {result.stderr.strip()}"
+        )
+    if state_line == "MISSING":
+        raise ConfigError(f"No detached run '{run_id}' on {setup.name}")
+
+    metadata_line, _, output = rest.partition("\n")
+    try:
+        metadata = RunMetadata.from_mapping(json.loads(metadata_line))
+    except (ValueError, BifrostError) as e:
+        raise SshError(f"Run {run_id} on {setup.name} has no valid metadata") from e
+
+    state, *fields = state_line.split()
+    if state == "EXITED":
+        exit_code, duration = [*fields, "", ""][:2]
+        metadata = replace(
+            metadata,
+            exit_code=int(exit_code) if exit_code.lstrip("-").isdigit() else 1,
+            duration_s=float(duration) if duration.isdigit() else None,
+        )
+    elif state == "RUNNING":
+        # Leave a partly written last line for the next poll.
+        output = output[: output.rfind("\n") + 1]
+
+    received = output.count("\n") + (1 if output and output[-1] != "\n" else 0)
+    return DetachedRun(
+        metadata=metadata,
+        state=state.lower(),
+        output=output,
+        offset=offset + received,
+        more=lines > 0 and received >= lines,
+    )
+
+
+def cancel(setup: SetupConfig, run_id: str, grace: int = CANCEL_GRACE) -> bool:
+    """Stop a detached run: SIGTERM, then SIGKILL after `grace` seconds.
+
+    Returns False if the run had already exited.
+    """
+    result = _run_script(
+        setup,
+        _CANCEL_SCRIPT,
+        remote_run_dir(setup, run_id),
+        run_id,
+        str(grace),
+    )
+    status = result.stdout.strip()
+    if result.returncode != 0 or not status:
+        raise SshError(
+            f"Failed to cancel run {run_id} on {setup.name}: {result.stderr.strip()}"
+        )
+    if status == "MISSING":
+        raise ConfigError(f"No detached run '{run_id}' on {setup.name}")
+    return status == "CANCELLED"
+
+
+def _run_script(
+    setup: SetupConfig, script: str, *args: str
+) -> subprocess.CompletedProcess[str]:
+    return run_remote(
+        setup,
+        ["sh", "-c", shlex.quote(script), "bf-detached", *map(shlex.quote, args)],
+    )
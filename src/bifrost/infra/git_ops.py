@@ -1,12 +1,19 @@
-from bifrost.infra.ssh import run_remote
+import posixpath
+import shlex
+
+from bifrost.infra.transport import run_remote
 from bifrost.shared import SetupConfig, SshError
 
 
+def fetch_all(setup: SetupConfig) -> None:
+    result = run_remote(setup, ["git", "fetch", "--all"])
+    if result.returncode != 0:
+        raise SshError(f"git fetch failed on {setup.name}: {result.stderr.strip()}")
+
+
 def fetch_and_checkout(setup: SetupConfig, ref: str, latest: bool = False) -> None:
     if latest:
-        result = run_remote(setup, ["git", "fetch", "--all"])
-        if result.returncode != 0:
-            raise SshError(f"git fetch failed on {setup.name}: {result.stderr.strip()}")
+        fetch_all(setup)
 
     result = run_remote(setup, ["git", "checkout", ref])
     if result.returncode != 0:
@@ -20,5 +27,82 @@ def fetch_and_checkout(setup: SetupConfig, ref: str, latest: bool = False) -> No
             raise SshError(f"git pull failed on {setup.name}: {result.stderr.strip()}")
 
 
+def list_commits(setup: SetupConfig, good: str, bad: str) -> list[str]:
+    """Commits after `good` up to and including `bad`, oldest first."""
+    result = run_remote(
+        setup, ["git", "rev-list", "--reverse", "--ancestry-path", f"{good}..{bad}"]
+    )
+    if result.returncode != 0:
+        raise SshError(
+            f"git rev-list '{good}..{bad}' failed on {setup.name}: "
+            f"{result.stderr.strip()}"
+        )
+    return result.stdout.split()
+
+
+def fetch_refs(setup: SetupConfig, refs: list[str]) -> None:
+    """Fetch the objects of all `refs` from origin in a single git fetch."""
+    result = run_remote(setup, ["git", "fetch", "origin", *map(shlex.quote, refs)])
+    if result.returncode != 0:
+        raise SshError(f"git fetch failed on {setup.name}: {result.stderr.strip()}")
+
+
+def resolve_refs(
+    setup: SetupConfig, refs: list[str], latest: bool = False
+) -> list[str]:
+    """Resolve `refs` to commit SHAs in one round trip.
+
+    With `latest`, branches resolve to their freshly fetched `origin/` tip.
+    """
+    lookups = []
+    for ref in refs:
+        lookup = f"git rev-parse --verify {shlex.quote(ref + '^{commit}')}"
+        if latest and _is_branch(ref):
+            upstream = shlex.quote(f"origin/{ref}^{{commit}}")
+            lookup = f"{{ git rev-parse --verify -q {upstream} || {lookup}; }}"
+        lookups.append(lookup)
+
+    result = run_remote(setup, [" && ".join(lookups)])
+    commits = result.stdout.split()
+    if result.returncode != 0 or len(commits) != len(refs):
+        raise SshError(
+            f"Cannot resolve refs {refs} on {setup.name}: {result.stderr.strip()}"
+        )
+    return commits
+
+
+def add_worktree(setup: SetupConfig, path: str, commit: str) -> None:
+    result = run_remote(
+        setup, ["git", "worktree", "add", "--detach", shlex.quote(path), commit]
+    )
+    if result.returncode != 0:
+        raise SshError(
+            f"git worktree add '{path}' failed on {setup.name}: {result.stderr.strip()}"
+        )
+
+
+def remove_worktree(setup: SetupConfig, path: str) -> None:
+    """Remove a worktree, and the directory holding it once that is empty."""
+    command = ["git", "worktree", "remove", "--force", shlex.quote(path)]
+    parent = posixpath.dirname(path)
+    if parent:
+        # rmdir fails, harmlessly, while other worktrees are still in there.
+        command += [
+            "&&",
+            "{",
+            "rmdir",
+            shlex.quote(parent),
+            "2>/dev/null;",
+            "true;",
+            "}",
+        ]
+    result = run_remote(setup, command)
+    if result.returncode != 0:
+        raise SshError(
+            f"git worktree remove '{path}' failed on {setup.name}: "
+            f"{result.stderr.strip()}"
+        )
+
+
 def _is_branch(ref: str) -> bool:
     return len(ref) != 40 or not all(c in "0123456789abcdef" for c in ref)
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import getpass
+import json
+import shlex
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+
+from bifrost.infra.transport import run_remote
+from bifrost.shared import BifrostError, Lease, SetupConfig, SshError
+
+# Seconds after which a lease is considered abandoned (e.g. bf was killed).
+# Holders renew it every `LEASE_RENEW_INTERVAL` seconds, however long they run.
+LEASE_TTL = 60 * 60
+LEASE_RENEW_INTERVAL = 5 * 60
+# Seconds a queue ticket survives without being refreshed by its waiter.
+QUEUE_TICKET_TTL = 3 * 60
+
+# Shared by the scripts below. Leases live in `<remote_log_dir>/lease.json` and
+# are created with noclobber, which makes acquisition an atomic O_EXCL create.
+# Waiters line up as tickets named `<time>-<run_id>` in `lease-queue/`.
+# Every report carries the setup's clock, against which expiry is judged.
+_PRELUDE = """
+dir=$1 run_id=$2
+lease="$dir/lease.json"
+tickets="$dir/lease-queue"
+now=$(date +%s)
+expires_of() {
+    sed -n 's/.*"expires_at": *\\([0-9][0-9]*\\).*/\\1/p' "$1" 2>/dev/null
+}
+report() {
+    echo "$1 $(ls "$tickets" 2>/dev/null | wc -l) $now"
+    cat "$lease" 2>/dev/null
+    exit 0
+}
+"""
+
+_ACQUIRE_SCRIPT = (
+    _PRELUDE
+    + """
+owner=$3 ttl=$4 ticket_ttl=$5 queue=$6
+mkdir -p "$tickets" || exit 1
+
+for ticket in "$tickets"/*; do
+    [ -f "$ticket" ] || continue
+    expires=$(cat "$ticket" 2>/dev/null)
+    case $expires in ''|*[!0-9]*) expires=0 ;; esac
+    [ "$expires" -lt "$now" ] && rm -f "$ticket"
+done
+
+mine=$(ls "$tickets" | grep -e "-$run_id\\$" | head -n 1)
+if [ "$queue" = 1 ]; then
+    [ -n "$mine" ] || mine="$(printf '%012d' "$now")-$run_id"
+    echo $((now + ticket_ttl)) > "$tickets/$mine"
+fi
+first=$(ls "$tickets" | sort | head -n 1)
+if [ -n "$first" ] && [ "$first" != "$mine" ]; then
+    report HELD
+fi
+
+create() {
+    (
+        set -C
+        {
+            printf '{"owner": %s, "run_id": "%s", ' "$owner" "$run_id"
+            printf '"acquired_at": %s, "expires_at": %s}\\n' "$now" $((now + ttl))
+        } > "$lease"
+    ) 2>/dev/null
+}
+acquired() {
+    [ -n "$mine" ] && rm -f "$tickets/$mine"
+    report ACQUIRED
+}
+
+grep -q "\\"run_id\\": \\"$run_id\\"" "$lease" 2>/dev/null && acquired
+create && acquired
+
+current=$(cat "$lease" 2>/dev/null)
+expires=$(expires_of "$lease")
+if [ -z "$expires" ] || [ "$expires" -lt "$now" ]; then
+    stale="$lease.stale.$run_id"
+    if mv "$lease" "$stale" 2>/dev/null; then
+        if [ "$(cat "$stale")" = "$current" ]; then
+            rm -f "$stale"
+            create && acquired
+        else
+            mv -n "$stale" "$lease"
+        fi
+    fi
+fi
+report HELD
+"""
+)
+
+_RELEASE_SCRIPT = (
+    _PRELUDE
+    + """
+rm -f "$tickets"/*-"$run_id"
+grep -q "\\"run_id\\": \\"$run_id\\"" "$lease" 2>/dev/null && rm -f "$lease"
+report FREE
+"""
+)
+
+_RENEW_SCRIPT = (
+    _PRELUDE
+    + """
+ttl=$3
+grep -q "\\"run_id\\": \\"$run_id\\"" "$lease" 2>/dev/null || report LOST
+renewed="$lease.renew.$run_id"
+sed "s/\\"expires_at\\": *[0-9]*/\\"expires_at\\": $((now + ttl))/" "$lease" \\
+    > "$renewed" && mv "$renewed" "$lease" || exit 1
+report RENEWED
+"""
+)
+
+_PEEK_SCRIPT = (
+    _PRELUDE
+    + """
+[ -f "$lease" ] && report HELD
+report FREE
+"""
+)
+
+
+@dataclass(frozen=True, slots=True)
+class LeaseState:
+    acquired: bool
+    holder: Lease | None = None
+    queued: int = 0
+    # The setup's clock when the state was read, which lease times refer to.
+    now: int | None = None
+
+    @property
+    def expires_in(self) -> float | None:
+        """Seconds until the holder's lease expires (negative once expired)."""
+        if self.holder is None:
+            return None
+        now = self.now if self.now is not None else time.time()
+        return self.holder.expires_at - now
+
+    @property
+    def held_for(self) -> float | None:
+        """Seconds since the holder acquired the lease."""
+        if self.holder is None:
+            return None
+        now = self.now if self.now is not None else time.time()
+        return now - self.holder.acquired_at
+
+    @property
+    def is_free(self) -> bool:
+        """Whether nobody holds a live lease and nobody is queued."""
+        expires_in = self.expires_in
+        held = expires_in is not None and expires_in >= 0
+        return not held and self.queued == 0
+
+
+def lease_owner() -> str:
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "unknown"
+    return f"{user}@{socket.gethostname()}"
+
+
+class LeaseStore:
+    """Cooperative, per-setup leases stored on the setups themselves.
+
+    A lease is held by one run at a time and expires `ttl` seconds after it
+    was acquired or last renewed, after which the next acquirer recovers it.
+    Expiry is judged by the setup's clock. Waiting runs queue up first come,
+    first served: while tickets are queued, only the oldest may acquire.
+    """
+
+    def __init__(self, owner: str | None = None, ttl: int = LEASE_TTL) -> None:
+        self._owner = owner or lease_owner()
+        self._ttl = ttl
+
+    @property
+    def ttl(self) -> int:
+        """Seconds a lease lives past its acquisition or last renewal."""
+        return self._ttl
+
+    @property
+    def renew_interval(self) -> float:
+        """Seconds between renewals that keep a held lease from expiring."""
+        return float(min(LEASE_RENEW_INTERVAL, max(self._ttl, 1) / 4))
+
+    def try_acquire(
+        self, setup: SetupConfig, run_id: str, queue: bool = False
+    ) -> LeaseState:
+        """Acquire the lease for `run_id` if possible, without blocking.
+
+        With `queue`, the run joins (or stays in) the wait queue when the lease
+        is held. Waiters must call again within `QUEUE_TICKET_TTL` seconds to
+        keep their place.
+        """
+        return self._run(
+            setup,
+            _ACQUIRE_SCRIPT,
+            run_id,
+            json.dumps(self._owner),
+            str(self._ttl),
+            str(QUEUE_TICKET_TTL),
+            "1" if queue else "0",
+        )
+
+    def release(self, setup: SetupConfig, run_id: str) -> None:
+        """Release the lease of `run_id` and leave the wait queue."""
+        self._run(setup, _RELEASE_SCRIPT, run_id)
+
+    def renew(self, setup: SetupConfig, run_id: str) -> bool:
+        """Push the expiry of `run_id`'s lease `ttl` seconds into the future.
+
+        Returns False if `run_id` no longer holds the lease.
+        """
+        state = self._run(setup, _RENEW_SCRIPT, run_id, str(self._ttl))
+        return state.acquired
+
+    @contextmanager
+    def keep_alive(self, setup: SetupConfig, run_id: str) -> Iterator[None]:
+        """Renew `run_id`'s lease from a background thread while the block runs.
+
+        A failed renewal is retried at the next interval; the lease only
+        lapses if renewals keep failing for `ttl` seconds.
+        """
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(self.renew_interval):
+                with suppress(BifrostError):
+                    self.renew(setup, run_id)
+
+        thread = threading.Thread(
+            target=heartbeat, name=f"lease-{setup.name}", daemon=True
+        )
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            # A renewal still in flight must not recreate a released lease.
+            thread.join()
+
+    def peek(self, setup: SetupConfig) -> LeaseState:
+        return self._run(setup, _PEEK_SCRIPT, "")
+
+    def _run(self, setup: SetupConfig, script: str, *args: str) -> LeaseState:
+        command = [
+            "sh",
+            "-c",
+            shlex.quote(script),
+            "bf-lease",
+            shlex.quote(setup.logs.remote_log_dir),
+            *map(shlex.quote, args),
+        ]
+        result = run_remote(setup, command)
+        lines = result.stdout.splitlines()
+        if result.returncode != 0 or not lines:
+            raise SshError(
+                f"Lease operation failed on {setup.name}: {result.stderr.strip()}"
+            )
+
+        status, queued, now = [*lines[0].split(), "", ""][:3]
+        holder = None
+        if len(lines) > 1:
+            try:
+                holder = Lease.from_mapping(json.loads(lines[1]))
+            except (ValueError, BifrostError):
+                holder = None
+        return LeaseState(
+            acquired=status in ("ACQUIRED", "RENEWED"),
+            holder=holder,
+            queued=int(queued or 0),
+            now=int(now) if now.isdigit() else None,
+        )
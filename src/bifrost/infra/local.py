@@ -0,0 +1,75 @@
+import os
+import shutil
+import subprocess
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+from bifrost.infra.trace import run_process
+from bifrost.shared import LogCopyError, SetupConfig, SshError
+
+
+class LocalTransport:
+    """Reaches a setup on this machine, without ssh or rsync.
+
+    Commands run through `sh` in the setup's root directory, the way ssh runs
+    them in the login directory of a remote setup. Files are written in place,
+    and logs come back as hard links to the stored files; a copy is made only
+    where the log directory is on another filesystem.
+    """
+
+    def __init__(self, setup: SetupConfig) -> None:
+        self._setup = setup
+        self._root = Path(setup.root).expanduser() if setup.root else Path.home()
+
+    def run(
+        self, command: list[str], capture: bool = True
+    ) -> subprocess.CompletedProcess[str]:
+        try:
+            return run_process(
+                ["sh", "-c", " ".join(command)],
+                cwd=self._root,
+                capture_output=capture,
+                text=True,
+                timeout=600,
+            )
+        except subprocess.TimeoutExpired as e:
+            raise SshError(f"Command timed out on {self._setup.name}") from e
+        except OSError as e:
+            raise SshError(f"Failed to run command on {self._setup.name}: {e}") from e
+
+    def is_reachable(self, timeout: int = 5) -> bool:
+        return self._root.is_dir()
+
+    def connection(self) -> AbstractContextManager[None]:
+        return nullcontext()
+
+    def write_file(self, path: str, content: str) -> None:
+        target = self._root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+
+    def fetch_dir(self, remote_dir: str, local_dir: Path) -> None:
+        source = self._root / remote_dir
+        if not source.is_dir():
+            raise LogCopyError(f"No logs for {self._setup.name} in {source}")
+
+        try:
+            for path in source.rglob("*"):
+                target = local_dir / path.relative_to(source)
+                if path.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.unlink(missing_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+        except OSError as e:
+            raise LogCopyError(
+                f"Copying logs failed for {self._setup.name}: {e}"
+            ) from e
+
+    def interactive(self) -> int:
+        shell = os.environ.get("SHELL") or "/bin/sh"
+        return run_process([shell], cwd=self._root).returncode
@@ -0,0 +1,245 @@
+"""Durable queue of runs whose metadata and logs still need shipping.
+
+`bf run --background-logs` reports a run as soon as its command finishes and
+leaves storing run.json on the setup and copying the logs back to a detached
+worker. Each pending run is one JSON file under `cache_dir()/log-queue/jobs`,
+so jobs survive the worker, the terminal and reboots alike. At most one
+worker runs at a time; a failing job is retried with exponential backoff
+until it has failed `MAX_ATTEMPTS` times.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from bifrost.infra.cache import (
+    cache_dir,
+    read_json,
+    try_locked,
+    write_json_atomic,
+)
+from bifrost.infra.log_store import LogStore
+from bifrost.infra.utils import as_mapping, require_int, require_str
+from bifrost.shared import BifrostError, RunMetadata, SetupConfig
+
+LOG_QUEUE_FORMAT = 1
+# Attempts after which a job is left for `bf logs retry`.
+MAX_ATTEMPTS = 8
+# Seconds before the first retry; doubled for every further attempt.
+RETRY_BASE = 15.0
+RETRY_MAX = 15 * 60.0
+# Seconds the worker sleeps between looks for due jobs.
+POLL_INTERVAL = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class LogJob:
+    """A run whose run.json and logs are still to be shipped."""
+
+    setup: SetupConfig
+    metadata: RunMetadata
+    # Local project the logs are copied into.
+    project_root: str
+    created_at: float
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: str | None = None
+    # Whether run.json is already on the setup; a retry then only copies.
+    stored: bool = False
+
+    @classmethod
+    def from_mapping(cls, raw: Any) -> LogJob:
+        data = as_mapping(raw, what="Log job")
+        setup_name = require_str(data, "setup_name", what="Log job")
+        last_error = data.get("last_error")
+
+        return cls(
+            setup=SetupConfig.from_mapping(setup_name, data.get("setup")),
+            metadata=RunMetadata.from_mapping(data.get("metadata")),
+            project_root=require_str(data, "project_root", what="Log job"),
+            created_at=float(data.get("created_at", 0.0)),
+            attempts=require_int(data, "attempts", what="Log job"),
+            next_attempt_at=float(data.get("next_attempt_at", 0.0)),
+            last_error=last_error if isinstance(last_error, str) else None,
+            stored=data.get("stored") is True,
+        )
+
+    @property
+    def run_id(self) -> str:
+        return self.metadata.run_id
+
+    @property
+    def failed(self) -> bool:
+        return self.attempts >= MAX_ATTEMPTS
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "format": LOG_QUEUE_FORMAT,
+            "setup_name": self.setup.name,
+            "setup": self.setup.to_dict(),
+            "metadata": self.metadata.to_dict(),
+            "project_root": self.project_root,
+            "created_at": self.created_at,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at,
+            "last_error": self.last_error,
+            "stored": self.stored,
+        }
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that failed `attempts` times."""
+    return float(min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX))
+
+
+class LogQueue:
+    """Pending log shipments and the worker that drains them."""
+
+    def __init__(self, directory: Path | None = None) -> None:
+        self._directory = directory or cache_dir() / "log-queue"
+        self._jobs_dir = self._directory / "jobs"
+        self._worker_lock = self._directory / "worker"
+
+    @property
+    def worker_log(self) -> Path:
+        return self._directory / "worker.log"
+
+    def enqueue(
+        self, setup: SetupConfig, metadata: RunMetadata, project_root: Path
+    ) -> LogJob:
+        job = LogJob(
+            setup=setup,
+            metadata=metadata,
+            project_root=str(project_root),
+            created_at=time.time(),
+        )
+        self.save(job)
+        return job
+
+    def jobs(self) -> list[LogJob]:
+        """Queued jobs, oldest first; unreadable job files are skipped."""
+        jobs: list[LogJob] = []
+        for path in self._jobs_dir.glob("*.json"):
+            raw = read_json(path)
+            if raw is None:
+                continue
+            try:
+                jobs.append(LogJob.from_mapping(raw))
+            except BifrostError:
+                continue
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def save(self, job: LogJob) -> None:
+        write_json_atomic(self._job_path(job.run_id), job.to_dict())
+
+    def remove(self, run_id: str) -> None:
+        self._job_path(run_id).unlink(missing_ok=True)
+
+    def retry(self, run_id: str | None = None) -> list[LogJob]:
+        """Make a job, or every job, due again with a fresh set of attempts."""
+        retried = [
+            replace(job, attempts=0, next_attempt_at=0.0)
+            for job in self.jobs()
+            if run_id is None or job.run_id == run_id
+        ]
+        for job in retried:
+            self.save(job)
+        return retried
+
+    def worker_running(self) -> bool:
+        with try_locked(self._worker_lock) as acquired:
+            return not acquired
+
+    def start_worker(self) -> None:
+        """Spawn a detached worker unless one is already draining the queue."""
+        if self.worker_running():
+            return
+        self.worker_log.parent.mkdir(parents=True, exist_ok=True)
+        with self.worker_log.open("a") as log:
+            subprocess.Popen(
+                [sys.executable, "-m", "bifrost.infra.log_queue"],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                cwd="/",
+                start_new_session=True,
+            )
+
+    def work(self) -> int:
+        """Ship jobs until none is left but failed ones; the number shipped.
+
+        Returns right away if another worker holds the queue.
+        """
+        shipped = 0
+        while True:
+            with try_locked(self._worker_lock) as acquired:
+                if not acquired:
+                    return shipped
+                shipped += self._drain()
+            # A job enqueued while the lock was still held spawned no worker.
+            if not any(not job.failed for job in self.jobs()):
+                return shipped
+
+    def ship(self, job: LogJob) -> bool:
+        """Store and copy one job's run; reschedule it on failure."""
+        log_store = LogStore(Path(job.project_root))
+        try:
+            if not job.stored:
+                log_store.store_run_metadata(job.setup, job.metadata)
+                job = replace(job, stored=True)
+                self.save(job)
+            log_paths = log_store.copy_logs(job.setup, job.run_id)
+            log_store.write_local_metadata(
+                job.setup, replace(job.metadata, log_paths=log_paths)
+            )
+        except (BifrostError, OSError) as e:
+            attempts = job.attempts + 1
+            self.save(
+                replace(
+                    job,
+                    attempts=attempts,
+                    next_attempt_at=time.time() + retry_delay(attempts),
+                    last_error=str(e),
+                )
+            )
+            _log(f"{job.run_id} on {job.setup.name} failed (attempt {attempts}): {e}")
+            return False
+        self.remove(job.run_id)
+        _log(f"{job.run_id} on {job.setup.name} shipped")
+        return True
+
+    def _drain(self) -> int:
+        shipped = 0
+        while True:
+            pending = [job for job in self.jobs() if not job.failed]
+            if not pending:
+                return shipped
+            now = time.time()
+            due = [job for job in pending if job.next_attempt_at <= now]
+            if not due:
+                next_due = min(job.next_attempt_at for job in pending)
+                time.sleep(min(next_due - now, POLL_INTERVAL))
+                continue
+            for job in due:
+                shipped += self.ship(job)
+
+    def _job_path(self, run_id: str) -> Path:
+        return self._jobs_dir / f"{run_id}.json"
+
+
+def _log(message: str) -> None:
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+def main() -> None:
+    """Entry point of the detached worker spawned by `LogQueue.start_worker`."""
+    LogQueue().work()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import json
-import subprocess
+from collections.abc import Iterable
 from pathlib import Path
 
-from bifrost.infra.ssh import run_remote
-from bifrost.shared import LogCopyError, RunMetadata, SetupConfig
+from bifrost.infra.cache import write_bytes_atomic
+from bifrost.infra.transport import transport_for
+from bifrost.shared import BifrostError, RunMetadata, SetupConfig
 
 
 class LogStore:
@@ -14,48 +15,92 @@ class LogStore:
     def __init__(self, local_project_root: Path | None = None) -> None:
         self._project_root = local_project_root or Path.cwd()
 
+    @property
+    def project_root(self) -> Path:
+        return self._project_root
+
     def store_run_metadata(self, setup: SetupConfig, metadata: RunMetadata) -> None:
         remote_run_dir = f"{setup.logs.remote_log_dir}/{metadata.run_id}"
-        run_remote(setup, ["mkdir", "-p", remote_run_dir])
-
-        metadata_json = json.dumps(metadata.to_dict(), indent=2)
-        run_remote(
-            setup,
-            [
-                "bash",
-                "-c",
-                f"cat > {remote_run_dir}/run.json << 'BIFROST_EOF'\n"
-                f"{metadata_json}\nBIFROST_EOF",
-            ],
+        transport_for(setup).write_file(
+            f"{remote_run_dir}/run.json", json.dumps(metadata.to_dict(), indent=2)
         )
 
-    def copy_logs(self, setup: SetupConfig, run_id: str) -> list[str]:
-        remote_run_dir = f"{setup.logs.remote_log_dir}/{run_id}"
-        local_run_dir = self._project_root / setup.logs.local_log_dir / run_id
+    def local_log_dir(self, setup: SetupConfig) -> Path:
+        """Local directory holding one subdirectory per run copied back."""
+        return self._project_root / setup.logs.local_log_dir
 
-        local_run_dir.mkdir(parents=True, exist_ok=True)
+    def write_local_metadata(self, setup: SetupConfig, metadata: RunMetadata) -> None:
+        """Replace the local copy of a run's run.json with `metadata`.
 
-        ssh_target = f"{setup.user}@{setup.host}"
-        remote_path = f"{ssh_target}:{remote_run_dir}/"
-        local_path = str(local_run_dir) + "/"
+        The file is replaced rather than rewritten, since it may be a hard
+        link to the run.json stored on a local setup.
+        """
+        run_file = self.local_log_dir(setup) / metadata.run_id / "run.json"
+        write_bytes_atomic(
+            run_file, json.dumps(metadata.to_dict(), indent=2).encode(), mode=0o644
+        )
 
+    def read_local_metadata(
+        self, setup: SetupConfig, run_id: str
+    ) -> RunMetadata | None:
+        """The local run.json of `run_id`, or None if it was not copied back."""
+        run_file = self.local_log_dir(setup) / run_id / "run.json"
         try:
-            result = subprocess.run(
-                ["rsync", "-az", "--timeout=30", remote_path, local_path],
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-        except (subprocess.TimeoutExpired, OSError) as e:
-            raise LogCopyError(f"rsync failed for {setup.name}: {e}") from e
-
-        if result.returncode != 0:
-            raise LogCopyError(
-                f"rsync failed for {setup.name}: {result.stderr.strip()}"
-            )
+            return RunMetadata.from_mapping(json.loads(run_file.read_text()))
+        except (OSError, ValueError, BifrostError):
+            return None
+
+    def write_detached_metadata(
+        self, setup: SetupConfig, metadata: RunMetadata
+    ) -> None:
+        """Record a detached run locally, so it can be found by its run ID."""
+        run_file = self.local_log_dir(setup) / metadata.run_id / "detached.json"
+        write_bytes_atomic(
+            run_file, json.dumps(metadata.to_dict(), indent=2).encode(), mode=0o644
+        )
+
+    def find_run(
+        self, setups: Iterable[SetupConfig], run_id: str
+    ) -> SetupConfig | None:
+        """The setup whose local log directory holds `run_id`, if any."""
+        for setup in setups:
+            if (self.local_log_dir(setup) / run_id).is_dir():
+                return setup
+        return None
+
+    def copy_logs(self, setup: SetupConfig, run_id: str) -> list[str]:
+        remote_run_dir = f"{setup.logs.remote_log_dir}/{run_id}"
+        local_run_dir = self.local_log_dir(setup) / run_id
+
+        local_run_dir.mkdir(parents=True, exist_ok=True)
+        transport_for(setup).fetch_dir(remote_run_dir, local_run_dir)
 
         return [
             str(p.relative_to(self._project_root))
             for p in local_run_dir.rglob("*")
             if p.is_file()
         ]
+
+    def recent_durations(self, setup: SetupConfig, limit: int = 20) -> list[float]:
+        """Durations of the latest `limit` runs on `setup` copied back locally."""
+        local_dir = self.local_log_dir(setup)
+        run_files = sorted(
+            local_dir.glob("*/run.json"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+
+        durations: list[float] = []
+        for run_file in run_files:
+            try:
+                data = json.loads(run_file.read_text())
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict) or data.get("setup") != setup.name:
+                continue
+            duration = data.get("duration_s")
+            if isinstance(duration, int | float):
+                durations.append(float(duration))
+                if len(durations) == limit:
+                    break
+        return durations
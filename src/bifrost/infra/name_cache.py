@@ -0,0 +1,79 @@
+"""Setup, pipeline and pool names for shell completion.
+
+Completion runs `bf` on every <Tab>, which must not parse YAML. The config
+manager therefore keeps a small JSON file per working directory with the
+names of the config it read there, plus the mtime and size of every config
+file it read or looked for. The names are only trusted while none of those
+files changed, appeared or disappeared.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections.abc import Mapping
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from bifrost.infra.cache import cache_dir, read_json, write_json_atomic
+
+if TYPE_CHECKING:
+    from bifrost.shared.models import BifrostConfig
+
+# Bump when the layout of the names file changes.
+NAME_CACHE_FORMAT = 1
+
+# (mtime_ns, size) of a file, or None if it does not exist. A list, as in JSON.
+FileStamp = list[int] | None
+
+
+def file_stamp(path: Path | str) -> FileStamp:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def config_names(config: BifrostConfig) -> dict[str, list[str]]:
+    pools = {pool for setup in config.setups.values() for pool in setup.pools}
+    return {
+        "setups": list(config.setups),
+        "pipelines": list(config.pipelines),
+        "pools": sorted(pools),
+    }
+
+
+def read_names(directory: str) -> dict[str, list[str]] | None:
+    """Names of the config read in `directory`, or None if unknown or stale."""
+    data = read_json(_names_path(directory))
+    if not isinstance(data, dict) or data.get("format") != NAME_CACHE_FORMAT:
+        return None
+    sources = data.get("sources")
+    names = data.get("names")
+    if not isinstance(sources, dict) or not isinstance(names, dict):
+        return None
+    if any(file_stamp(path) != stamp for path, stamp in sources.items()):
+        return None
+    return names
+
+
+def write_names(
+    directory: str,
+    sources: Mapping[str, FileStamp],
+    names: dict[str, list[str]],
+) -> None:
+    """Record `names` as valid while all `sources` keep their stamps."""
+    path = _names_path(directory)
+    data = {"format": NAME_CACHE_FORMAT, "sources": dict(sources), "names": names}
+    if read_json(path) == data:
+        return
+    # The cache is an optimization; a read-only cache dir is not an error.
+    with suppress(OSError):
+        write_json_atomic(path, data)
+
+
+def _names_path(directory: str) -> Path:
+    digest = hashlib.sha256(directory.encode()).hexdigest()
+    return cache_dir() / "config" / f"names-{digest}.json"
@@ -1,59 +1,339 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
+import importlib.util
 import os
-from typing import Protocol
+import threading
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Protocol
 
-import httpx
+from bifrost.infra import trace
+from bifrost.infra.cache import cache_dir, locked, read_json, write_json_atomic
+from bifrost.shared import CiConfig, ConfigError, PipelineConfig, PipelineGateError
 
-from bifrost.shared import ConfigError, PipelineConfig
+if TYPE_CHECKING:
+    import httpx
+
+# Seconds a gate answer is shared between bf processes via the on-disk cache.
+GATE_CACHE_TTL = 10.0
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_RETRY_AFTER = 30.0
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide HTTP client, so all gate queries share one connection pool.
+
+    HTTP/2 is used when the optional `h2` package is installed.
+    """
+    import httpx
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=10,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+            atexit.register(_client.close)
+        return _client
+
+
+def forget_http_client() -> None:
+    """Drop the shared client without closing it.
+
+    A forked process must not use, or shut down, connections it shares with
+    its parent; it opens its own client on first use instead.
+    """
+    global _client
+    _client = None
 
 
 class PipelineGate(Protocol):
     """Protocol for checking if pipeline is busy."""
 
-    def is_busy(self, setup_name: str) -> bool: ...
+    def is_busy(self, setup_name: str, ci: CiConfig | None = None) -> bool: ...
 
 
 class NonePipelineGate:
     """No-op gate when no CI is configured."""
 
-    def is_busy(self, setup_name: str) -> bool:
+    def is_busy(self, setup_name: str, ci: CiConfig | None = None) -> bool:
         return False
 
 
 class GitLabPipelineGate:
-    """GitLab CI pipeline gate."""
+    """GitLab CI pipeline gate.
+
+    Without a CI filter, a setup is busy while any pipeline of the project is
+    running or pending. With one, it is busy only while a running or pending
+    job matches the setup's runner tags or job names.
+
+    Answers are cached on disk for `cache_ttl` seconds and shared by every bf
+    process of the user; one process refreshes an expired answer while the
+    others wait for it. Refreshes are conditional requests (ETag), and rate
+    limiting (HTTP 429) is retried after the server's `Retry-After` delay.
+    The token is read from `environ`, the process environment by default.
+    """
 
     RUNNING_STATUSES = frozenset({"running", "pending"})
+    JOBS_PER_PAGE = 100
 
-    def __init__(self, pipeline_config: PipelineConfig) -> None:
+    def __init__(
+        self,
+        pipeline_config: PipelineConfig,
+        cache_ttl: float = GATE_CACHE_TTL,
+        environ: Mapping[str, str] = os.environ,
+    ) -> None:
         self._config = pipeline_config
-        self._token = os.environ.get(pipeline_config.token_env, "")
+        self._cache_ttl = cache_ttl
+        self._api_url = (
+            f"{pipeline_config.url}/api/v4/projects/{pipeline_config.project_id}"
+        )
+        self._token = environ.get(pipeline_config.token_env, "")
         if not self._token:
             raise ConfigError(
                 f"GitLab token not found in environment variable "
                 f"'{pipeline_config.token_env}'"
             )
 
-    def is_busy(self, setup_name: str) -> bool:
-        url = f"{self._config.url}/api/v4/projects/{self._config.project_id}/pipelines"
+    def is_busy(self, setup_name: str, ci: CiConfig | None = None) -> bool:
+        if ci is None or ci.is_empty:
+            return bool(self._cached("pipelines", self._fetch_pipelines_busy))
+
+        jobs = self._cached("jobs", self._fetch_active_jobs)
+        return any(ci.matches(job["name"], job["tags"]) for job in jobs)
+
+    def _cached(
+        self, kind: str, fetch: Callable[[dict[str, Any]], tuple[Any, dict[str, Any]]]
+    ) -> Any:
+        """Return the cached `kind` answer, refreshing it with `fetch` if expired.
+
+        `fetch` receives the previous revalidation state (ETags) and returns the
+        new answer along with its new state.
+        """
+        key = f"{self._config.url}|{self._config.project_id}"
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_path = cache_dir() / "gates" / f"{digest}-{kind}.json"
+
+        with locked(cache_path):
+            entry = read_json(cache_path)
+            if not isinstance(entry, dict):
+                entry = {}
+            if time.time() - entry.get("checked_at", 0) < self._cache_ttl:
+                return entry["value"]
+
+            value, state = fetch(entry.get("state", {}))
+            write_json_atomic(
+                cache_path, {"checked_at": time.time(), "value": value, "state": state}
+            )
+            return value
+
+    def _fetch_pipelines_busy(
+        self, previous: dict[str, Any]
+    ) -> tuple[bool, dict[str, Any]]:
+        statuses = sorted(self.RUNNING_STATUSES)
+        with ThreadPoolExecutor(max_workers=len(statuses)) as pool:
+            answers = pool.map(
+                lambda status: self._query(status, previous.get(status)), statuses
+            )
+            results = dict(zip(statuses, answers, strict=True))
+
+        return any(result["busy"] for result in results.values()), results
+
+    def _query(self, status: str, previous: dict[str, Any] | None) -> dict[str, Any]:
         headers = {"PRIVATE-TOKEN": self._token}
-        params: dict[str, str | int] = {"status": "running", "per_page": 1}
+        if previous and previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        params: dict[str, Any] = {"status": status, "per_page": 1}
 
-        response = httpx.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
+        response = self._get(f"{self._api_url}/pipelines", headers, params)
+        if response.status_code == 304 and previous:
+            return previous
 
-        if response.json():
-            return True
+        return {"busy": bool(response.json()), "etag": response.headers.get("ETag")}
 
-        params["status"] = "pending"
-        response = httpx.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
+    def _fetch_active_jobs(
+        self, previous: dict[str, Any]
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """Fetch all running and pending jobs; pages after the first in parallel.
 
-        return bool(response.json())
+        A single-page result is revalidated with its ETag.
+        """
+        url = f"{self._api_url}/jobs"
+        params: dict[str, Any] = {
+            "scope[]": sorted(self.RUNNING_STATUSES),
+            "per_page": self.JOBS_PER_PAGE,
+        }
+        headers = {"PRIVATE-TOKEN": self._token}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+
+        first = self._get(url, headers, {**params, "page": 1})
+        if first.status_code == 304 and "jobs" in previous:
+            return previous["jobs"], previous
+
+        jobs = list(first.json())
+        total_pages = int(first.headers.get("X-Total-Pages") or 1)
+        headers.pop("If-None-Match", None)
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(8, total_pages - 1)) as pool:
+                pages = pool.map(
+                    lambda page: self._get(url, headers, {**params, "page": page}),
+                    range(2, total_pages + 1),
+                )
+                for page in pages:
+                    jobs.extend(page.json())
+        else:
+            # GitLab omits X-Total-Pages for very large result sets.
+            next_page = first.headers.get("X-Next-Page")
+            while next_page:
+                page = self._get(url, headers, {**params, "page": int(next_page)})
+                jobs.extend(page.json())
+                next_page = page.headers.get("X-Next-Page")
+
+        active = [
+            {"name": job.get("name", ""), "tags": job.get("tag_list", [])}
+            for job in jobs
+        ]
+        state: dict[str, Any] = {}
+        if total_pages == 1 and not first.headers.get("X-Next-Page"):
+            state = {"etag": first.headers.get("ETag"), "jobs": active}
+        return active, state
+
+    def _get(
+        self, url: str, headers: dict[str, str], params: dict[str, Any]
+    ) -> httpx.Response:
+        import httpx
+
+        project = f"GitLab project {self._config.project_id}"
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            try:
+                with trace.span(
+                    "GET",
+                    "http",
+                    url=trace.redact(url),
+                    params=trace.redact_params(params),
+                ) as traced:
+                    response = get_http_client().get(
+                        url, headers=headers, params=params
+                    )
+                    traced["status"] = response.status_code
+                    traced["bytes_received"] = len(response.content)
+            except httpx.HTTPError as e:
+                raise PipelineGateError(f"Cannot query {project}: {e}") from e
+
+            if response.status_code != 429:
+                break
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                raise PipelineGateError(f"Rate limited by {project}, try again later")
+            time.sleep(_retry_after(response, attempt))
+
+        if response.status_code >= 400:
+            raise PipelineGateError(
+                f"Cannot query {project}: HTTP {response.status_code}"
+            )
+        return response
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a rate-limited request."""
+    value = response.headers.get("Retry-After", "")
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+            delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            delay = 2.0**attempt
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
 
 
 def create_pipeline_gate(pipeline_config: PipelineConfig | None) -> PipelineGate:
     if pipeline_config is None:
         return NonePipelineGate()
     return GitLabPipelineGate(pipeline_config)
+
+
+class PipelineGateRegistry:
+    """Shares gates and their answers across setups for one command.
+
+    Builds one gate per pipeline config and memoizes its `is_busy` answer, so
+    setups referencing the same pipeline cost a single query. Concurrent
+    identical queries are coalesced into one in-flight call. Answers older than
+    `max_age` seconds are re-queried, which matters for long-running commands
+    such as bisect; failures are not memoized.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[PipelineConfig | None], PipelineGate] = create_pipeline_gate,
+        max_age: float | None = None,
+    ) -> None:
+        self._factory = factory
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._gates: dict[PipelineConfig | None, PipelineGate] = {}
+        self._results: dict[
+            tuple[PipelineConfig | None, CiConfig | None], tuple[float, Future[bool]]
+        ] = {}
+
+    def gate_for(self, pipeline_config: PipelineConfig | None) -> PipelineGate:
+        with self._lock:
+            gate = self._gates.get(pipeline_config)
+        if gate is None:
+            gate = self._factory(pipeline_config)
+            with self._lock:
+                gate = self._gates.setdefault(pipeline_config, gate)
+        return gate
+
+    def is_busy(
+        self,
+        pipeline_config: PipelineConfig | None,
+        setup_name: str,
+        ci: CiConfig | None = None,
+    ) -> bool:
+        key = (pipeline_config, ci)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._results.get(key)
+            is_owner = entry is None or self._is_expired(entry, now)
+            if entry is None or is_owner:
+                entry = self._results[key] = (now, Future())
+        _, result = entry
+
+        if is_owner:
+            try:
+                gate = self.gate_for(pipeline_config)
+                result.set_result(gate.is_busy(setup_name, ci))
+            except Exception as e:
+                with self._lock:
+                    if self._results.get(key) is entry:
+                        del self._results[key]
+                result.set_exception(e)
+
+        return result.result()
+
+    def forget(self) -> None:
+        """Drop memoized answers so the next queries reach the gates again."""
+        with self._lock:
+            self._results = {
+                key: entry
+                for key, entry in self._results.items()
+                if not entry[1].done()
+            }
+
+    def _is_expired(self, entry: tuple[float, Future[bool]], now: float) -> bool:
+        created_at, result = entry
+        if self._max_age is None or not result.done():
+            return False
+        return now - created_at > self._max_age
@@ -1,6 +1,152 @@
+import hashlib
+import posixpath
+import shlex
+import shutil
 import subprocess
+import tempfile
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, suppress
+from pathlib import Path
 
-from bifrost.shared import SetupConfig, SshError
+from bifrost.infra.cache import cache_dir
+from bifrost.infra.trace import run_process
+from bifrost.shared import LogCopyError, SetupConfig, SshError
+
+# Seconds a master connection opened by persistent_connection stays open
+# after its last session.
+PERSIST_SECONDS = 60
+# ssh refuses control socket paths longer than sun_path, which it further
+# extends with a random suffix while creating the socket.
+MAX_CONTROL_PATH = 80
+
+# Control sockets of multiplexed connections opened by shared_connection,
+# keyed by setup name.
+_control_paths: dict[str, str] = {}
+# Setups whose first ssh call opens the master itself, and for how long it
+# outlives its sessions.
+_persist: dict[str, int] = {}
+
+
+def ssh_options(setup: SetupConfig) -> list[str]:
+    """Extra ssh options routing through the setup's shared connection, if any."""
+    control_path = _control_paths.get(setup.name)
+    if control_path is None:
+        return []
+    options = ["-o", f"ControlPath={control_path}"]
+    persist = _persist.get(setup.name)
+    if persist is not None:
+        options += ["-o", "ControlMaster=auto", "-o", f"ControlPersist={persist}"]
+    return options
+
+
+def route_connections(control_paths: dict[str, str]) -> None:
+    """Route the named setups' ssh calls through already open master connections.
+
+    Replaces any previous routing; used by the bf daemon, which keeps the
+    masters open across commands.
+    """
+    _control_paths.clear()
+    _control_paths.update(control_paths)
+
+
+@contextmanager
+def persistent_connection(
+    setup: SetupConfig, persist: int = PERSIST_SECONDS
+) -> Iterator[None]:
+    """Route the block's ssh calls through a master shared across bf processes.
+
+    The first call opens the master on a per-target socket in the cache dir
+    and leaves it running `persist` seconds after its last session, so the
+    next bf process skips the handshake. A connection this process already
+    shares, such as the bf daemon's, is used instead.
+    """
+    target = f"{setup.user}@{setup.host}"
+    control_dir = cache_dir() / "ssh"
+    control_path = str(control_dir / hashlib.sha256(target.encode()).hexdigest()[:16])
+    if setup.name in _control_paths or len(control_path) > MAX_CONTROL_PATH:
+        yield
+        return
+
+    control_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    _control_paths[setup.name] = control_path
+    _persist[setup.name] = persist
+    try:
+        yield
+    finally:
+        del _control_paths[setup.name]
+        del _persist[setup.name]
+
+
+@contextmanager
+def shared_connection(setup: SetupConfig) -> Iterator[None]:
+    """Keep one multiplexed SSH connection to the setup open for the block.
+
+    Every ssh/rsync call made for the setup inside the block reuses the
+    connection instead of performing a fresh handshake. Nested use is a no-op.
+    """
+    if setup.name in _control_paths:
+        yield
+        return
+
+    control_dir = tempfile.mkdtemp(prefix="bf-ssh-")
+    control_path = str(Path(control_dir) / "control")
+    try:
+        result = run_process(
+            master_command(setup, control_path),
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        shutil.rmtree(control_dir, ignore_errors=True)
+        raise SshError(f"Failed to connect to {setup.name}: {e}") from e
+
+    if result.returncode != 0:
+        shutil.rmtree(control_dir, ignore_errors=True)
+        raise SshError(f"Failed to connect to {setup.name}: {result.stderr.strip()}")
+
+    _control_paths[setup.name] = control_path
+    try:
+        yield
+    finally:
+        del _control_paths[setup.name]
+        close_master(setup, control_path)
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+
+def master_command(setup: SetupConfig, control_path: str) -> list[str]:
+    """ssh command that opens a master connection on `control_path` and detaches."""
+    return [
+        "ssh",
+        "-o",
+        "BatchMode=yes",
+        "-o",
+        "ControlMaster=yes",
+        "-o",
+        f"ControlPath={control_path}",
+        "-o",
+        "ControlPersist=yes",
+        "-fN",
+        f"{setup.user}@{setup.host}",
+    ]
+
+
+def close_master(setup: SetupConfig, control_path: str) -> None:
+    """Close the master connection on `control_path` and its sessions."""
+    with suppress(subprocess.TimeoutExpired, OSError):
+        run_process(
+            [
+                "ssh",
+                "-o",
+                f"ControlPath={control_path}",
+                "-O",
+                "exit",
+                f"{setup.user}@{setup.host}",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
 
 
 def run_remote(
@@ -9,8 +155,8 @@ def run_remote(
     ssh_target = f"{setup.user}@{setup.host}"
     remote_cmd = " ".join(command)
     try:
-        return subprocess.run(
-            ["ssh", "-o", "BatchMode=yes", ssh_target, remote_cmd],
+        return run_process(
+            ["ssh", "-o", "BatchMode=yes", *ssh_options(setup), ssh_target, remote_cmd],
             capture_output=capture,
             text=True,
             timeout=600,
@@ -24,13 +170,14 @@ def run_remote(
 def check_reachable(setup: SetupConfig, timeout: int = 5) -> bool:
     ssh_target = f"{setup.user}@{setup.host}"
     try:
-        result = subprocess.run(
+        result = run_process(
             [
                 "ssh",
                 "-o",
                 "BatchMode=yes",
                 "-o",
                 f"ConnectTimeout={timeout}",
+                *ssh_options(setup),
                 ssh_target,
                 "true",
             ],
@@ -45,5 +192,63 @@ def check_reachable(setup: SetupConfig, timeout: int = 5) -> bool:
 
 def open_interactive_session(setup: SetupConfig) -> int:
     ssh_target = f"{setup.user}@{setup.host}"
-    result = subprocess.run(["ssh", ssh_target])
+    result = run_process(["ssh", ssh_target])
     return result.returncode
+
+
+def copy_dir(setup: SetupConfig, remote_dir: str, local_dir: Path) -> None:
+    """Copy the contents of `remote_dir` on the setup into `local_dir`."""
+    # --stats lets the trace record the bytes rsync moved, not its chatter.
+    rsync_cmd = ["rsync", "-az", "--stats", "--timeout=30"]
+    extra_ssh_options = ssh_options(setup)
+    if extra_ssh_options:
+        rsync_cmd += ["-e", shlex.join(["ssh", *extra_ssh_options])]
+
+    remote_path = f"{setup.user}@{setup.host}:{remote_dir}/"
+    try:
+        result = run_process(
+            [*rsync_cmd, remote_path, f"{local_dir}/"],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        raise LogCopyError(f"rsync failed for {setup.name}: {e}") from e
+
+    if result.returncode != 0:
+        raise LogCopyError(f"rsync failed for {setup.name}: {result.stderr.strip()}")
+
+
+class SshTransport:
+    """Reaches a setup over ssh and copies files back with rsync."""
+
+    def __init__(self, setup: SetupConfig) -> None:
+        self._setup = setup
+
+    def run(
+        self, command: list[str], capture: bool = True
+    ) -> subprocess.CompletedProcess[str]:
+        return run_remote(self._setup, command, capture=capture)
+
+    def is_reachable(self, timeout: int = 5) -> bool:
+        return check_reachable(self._setup, timeout)
+
+    def connection(self) -> AbstractContextManager[None]:
+        return shared_connection(self._setup)
+
+    def write_file(self, path: str, content: str) -> None:
+        run_remote(self._setup, ["mkdir", "-p", posixpath.dirname(path)])
+        run_remote(
+            self._setup,
+            [
+                "bash",
+                "-c",
+                f"cat > {path} << 'BIFROST_EOF'\n{content}\nBIFROST_EOF",
+            ],
+        )
+
+    def fetch_dir(self, remote_dir: str, local_dir: Path) -> None:
+        copy_dir(self._setup, remote_dir, local_dir)
+
+    def interactive(self) -> int:
+        return open_interactive_session(self._setup)
@@ -0,0 +1,101 @@
+"""How bf reaches a setup.
+
+Every operation on a setup (running a command, writing run.json, copying logs
+back, probing reachability) goes through the setup's transport. `ssh` setups
+use ssh and rsync, or a resident bf agent with `agent: true`; `local` setups
+run directly on this machine.
+"""
+
+import subprocess
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from typing import Protocol
+
+from bifrost.infra.local import LocalTransport
+from bifrost.infra.ssh import SshTransport, persistent_connection
+from bifrost.shared import SetupConfig
+
+
+class Transport(Protocol):
+    """Runs commands on a setup and moves files between it and this machine.
+
+    Remote paths are relative to the setup's login (or root) directory.
+    """
+
+    def run(
+        self, command: list[str], capture: bool = True
+    ) -> subprocess.CompletedProcess[str]:
+        """Run `command`, joined by spaces, through the setup's shell."""
+        ...
+
+    def is_reachable(self, timeout: int = 5) -> bool: ...
+
+    def connection(self) -> AbstractContextManager[None]:
+        """Keep the setup connected for the block, if the transport connects."""
+        ...
+
+    def write_file(self, path: str, content: str) -> None:
+        """Write `content` to `path`, creating its directory."""
+        ...
+
+    def fetch_dir(self, remote_dir: str, local_dir: Path) -> None:
+        """Copy the contents of `remote_dir` into `local_dir`.
+
+        Raises `LogCopyError` if they cannot be copied.
+        """
+        ...
+
+    def interactive(self) -> int:
+        """Open an interactive shell on the setup and return its exit code."""
+        ...
+
+
+def transport_for(setup: SetupConfig) -> Transport:
+    if setup.is_local:
+        return LocalTransport(setup)
+    if setup.agent:
+        # Imported on first use: it reads the agent script to hash it.
+        from bifrost.infra.agent import AgentTransport
+
+        return AgentTransport(setup)
+    return SshTransport(setup)
+
+
+def run_remote(
+    setup: SetupConfig, command: list[str], capture: bool = True
+) -> subprocess.CompletedProcess[str]:
+    return transport_for(setup).run(command, capture=capture)
+
+
+def check_reachable(setup: SetupConfig, timeout: int = 5) -> bool:
+    return transport_for(setup).is_reachable(timeout)
+
+
+def shared_connection(setup: SetupConfig) -> AbstractContextManager[None]:
+    """Reuse one connection for every call made for the setup in the block."""
+    return transport_for(setup).connection()
+
+
+def pooled_connection(setup: SetupConfig) -> AbstractContextManager[None]:
+    """Reuse a connection that outlives this process, if the setup connects.
+
+    Meant for short commands run in quick succession: the first opens a
+    connection the following ones, in other bf processes, reuse.
+    """
+    if setup.is_local:
+        return nullcontext()
+    return persistent_connection(setup)
+
+
+def open_interactive_session(setup: SetupConfig) -> int:
+    return transport_for(setup).interactive()
+
+
+def read_load(setup: SetupConfig) -> float | None:
+    """1-minute load average per CPU, or None if the setup does not report it."""
+    result = run_remote(setup, ["cat", "/proc/loadavg", "&&", "nproc"])
+    lines = result.stdout.split("\n")
+    try:
+        return float(lines[0].split()[0]) / max(int(lines[1]), 1)
+    except (IndexError, ValueError):
+        return None
@@ -33,3 +33,31 @@ def require_int(data: Mapping[str, Any], key: str, *, what: str) -> int:
         return int(value)
     except (TypeError, ValueError) as e:
         raise ConfigError(f"{what} '{key}' must be an int") from e
+
+
+def require_str_list(
+    data: Mapping[str, Any], key: str, *, what: str
+) -> tuple[str, ...]:
+    value = data.get(key)
+    if value is None:
+        return ()
+
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"{what} '{key}' must be a list of strings")
+
+    return tuple(value)
+
+
+def require_str_mapping(
+    data: Mapping[str, Any], key: str, *, what: str
+) -> dict[str, str]:
+    """Read a mapping of strings; integer values are accepted as strings."""
+    value = as_mapping(data.get(key), what=f"{what} '{key}'")
+    result: dict[str, str] = {}
+    for item_key, item_value in value.items():
+        if not isinstance(item_key, str) or isinstance(item_value, bool):
+            raise ConfigError(f"{what} '{key}' must map strings to strings")
+        if not isinstance(item_value, (str, int)):
+            raise ConfigError(f"{what} '{key}' must map strings to strings")
+        result[item_key] = str(item_value)
+    return result
@@ -3,26 +3,41 @@ from bifrost.shared.config_manager import (
     USER_CONFIG_DIR,
     ConfigManager,
 )
-from bifrost.shared.errors import BifrostError, ConfigError, LogCopyError, SshError
+from bifrost.shared.errors import (
+    BifrostError,
+    ConfigError,
+    LeaseHeldError,
+    LogCopyError,
+    PipelineGateError,
+    SshError,
+)
 from bifrost.shared.models import (
     BifrostConfig,
+    CiConfig,
+    Lease,
     LogConfig,
     PipelineConfig,
     RunMetadata,
     SetupConfig,
 )
+from bifrost.shared.selector import Selector
 
 __all__ = [
     "CONFIG_FILENAMES",
     "USER_CONFIG_DIR",
     "BifrostConfig",
     "BifrostError",
+    "CiConfig",
     "ConfigError",
     "ConfigManager",
+    "Lease",
+    "LeaseHeldError",
     "LogConfig",
     "LogCopyError",
     "PipelineConfig",
+    "PipelineGateError",
     "RunMetadata",
+    "Selector",
     "SetupConfig",
     "SshError",
 ]
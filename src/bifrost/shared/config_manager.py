@@ -1,21 +1,309 @@
 from __future__ import annotations
 
+import hashlib
+import pickle
+import time
+from collections.abc import Callable, Collection
+from contextlib import suppress
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-import yaml
-
+from bifrost.infra.cache import cache_dir, locked, write_bytes_atomic
+from bifrost.infra.name_cache import FileStamp, config_names, file_stamp, write_names
+from bifrost.infra.utils import as_mapping, require_str_list
+from bifrost.shared import models
 from bifrost.shared.errors import ConfigError
 from bifrost.shared.models import BifrostConfig
 
 CONFIG_FILENAMES = [".bifrost.yml", ".bifrost.yaml"]
 USER_CONFIG_DIR = Path.home() / ".config" / "bifrost" / "config.yml"
 
+# Bump when the pickled layout of the config models changes incompatibly.
+COMPILED_CONFIG_FORMAT = 3
+# A file modified this recently may still change within the same mtime tick,
+# so it is not snapshotted yet.
+RACY_MTIME_WINDOW = 2.0
+
+# Layers this process has loaded, by config file: (snapshot stamp, layer). A
+# long-lived process, and the commands the bf daemon forks from it, skip even
+# loading the snapshot while the file is unchanged.
+_loaded_layers: dict[Path, tuple[tuple[Any, ...], ConfigLayer]] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigLayer:
+    """One config file, parsed but not validated on its own.
+
+    `includes` are the file's `include:` entries as written; `include_paths`
+    are the same entries resolved against the file's directory.
+    """
+
+    path: Path
+    config: BifrostConfig
+    includes: tuple[str, ...] = ()
+    include_paths: tuple[Path, ...] = ()
+
 
 class ConfigManager:
+    """Reads and writes bifrost YAML config files.
+
+    A config is layered: the user config, then the project config, each
+    preceded by the files it lists under `include:` (recursively). Later
+    layers override setups, pipelines and the default setup of earlier ones
+    by name, so a project can include a shared inventory and override single
+    setups.
+
+    Every file is snapshotted separately in the cache directory, keyed by its
+    path, mtime and size. An unchanged file is loaded from its snapshot
+    without being opened, parsed or validated again. The names of a config
+    discovered from the working directory are also kept for shell completion
+    (see `bifrost.infra.name_cache`).
+    """
+
+    def __init__(self, use_cache: bool = True) -> None:
+        self._use_cache = use_cache
+        self._roots: list[Path] = []
+        self._base: BifrostConfig | None = None
+        # Working directory the roots were discovered from, and the stamps of
+        # every file read or looked for; used for the completion name cache.
+        self._directory: str | None = None
+        self._stamps: dict[str, FileStamp] = {}
+
     def read_config(self, path: Path | None = None) -> BifrostConfig:
-        config_file_path = self._find_config_file(path)
+        """Read the merged config.
+
+        With `path`, only that file and its includes are read; otherwise the
+        user config and the discovered project config.
+        """
+        self._stamps = {}
+        if path is not None:
+            roots = [self._find_config_file(path)]
+            directory = None
+        else:
+            directory = self._start_discovery()
+            roots = self._discover_roots()
+            if not roots:
+                raise ConfigError(
+                    f"No config file found. Expected {' or '.join(CONFIG_FILENAMES)} "
+                    f"in project root, or {USER_CONFIG_DIR}"
+                )
+
+        config = BifrostConfig.merge(
+            [layer.config for layer in self._load_layers(roots)]
+        )
+        self._roots = roots
+        self._base = config
+        self._directory = directory
+        self._store_names(config)
+        return config
+
+    def write_config(self, config: BifrostConfig, path: Path | None = None) -> Path:
+        """Write the changes made to the last config read.
+
+        Under an exclusive lock, the files are read again and only the entries
+        that differ between the last `read_config` result and `config` are
+        applied to them, so concurrent bf processes do not lose each other's
+        updates. Changed setups, pipelines and the default setup are written to
+        the layer that defines them; new ones go to `path` (the user config by
+        default). Included files are never written: an entry they define is
+        overridden in the config including them, and removing it fails.
+        Without a preceding `read_config`, `config` is written to `path` as a
+        whole.
+        """
+        config_file_path = path or USER_CONFIG_DIR
+        with locked(_write_lock_path()):
+            self._apply(config, config_file_path)
+        return config_file_path
+
+    def update_config(
+        self,
+        update: Callable[[BifrostConfig], BifrostConfig],
+        path: Path | None = None,
+    ) -> BifrostConfig:
+        """Atomically read the config, apply `update` and write the result.
+
+        The whole read-modify-write runs under the config write lock, so any
+        number of changes made by `update` cost a single write per file. If no
+        config exists yet, `update` starts from an empty one.
+        """
+        with locked(_write_lock_path()):
+            roots = self._roots
+            if not roots:
+                self._stamps = {}
+                self._directory = self._start_discovery()
+                roots = self._discover_roots()
+            if roots:
+                layers = self._load_layers(roots)
+                self._roots = roots
+                self._base = BifrostConfig.merge([layer.config for layer in layers])
+            config = update(self._base or BifrostConfig(setups={}))
+            self._apply(config, path or USER_CONFIG_DIR)
+        return config
+
+    def _apply(self, config: BifrostConfig, config_file_path: Path) -> None:
+        """Write the difference between `self._base` and `config` to disk."""
+        if self._base is None:
+            self._write_file(config_file_path, config, includes=())
+            return
+
+        base = self._base
+        target = config_file_path.resolve()
+        layers = self._load_layers(self._roots)
+        if all(layer.path != target for layer in layers):
+            layers.insert(0, ConfigLayer(path=target, config=BifrostConfig(setups={})))
+        edits = {layer.path: _LayerEdit(layer) for layer in layers}
+        # Included files may be shared by other projects; only the user and
+        # project configs themselves are written.
+        writable = {root.resolve() for root in self._roots} | {target}
+
+        def owner(kind: str, name: str) -> _LayerEdit:
+            """The layer to write the entry to; the target for new entries.
+
+            That is the last layer defining the entry, or if that is an
+            included file, the config including it, where it is overridden.
+            """
+            for index in range(len(layers) - 1, -1, -1):
+                if _defines(layers[index].config, kind, name):
+                    for layer in layers[index:]:
+                        if layer.path in writable:
+                            return edits[layer.path]
+            return edits[target]
+
+        for kind in ("setups", "pipelines"):
+            old: dict[str, Any] = getattr(base, kind)
+            new: dict[str, Any] = getattr(config, kind)
+            for name in dict.fromkeys([*old, *new]):
+                if name not in new:
+                    for layer in layers:
+                        if layer.path not in writable and _defines(
+                            layer.config, kind, name
+                        ):
+                            raise ConfigError(
+                                f"{kind[:-1].capitalize()} '{name}' is defined in "
+                                f"{layer.path}, which is included from another "
+                                "config; remove it there"
+                            )
+                    for path in writable:
+                        edits[path].remove(kind, name)
+                elif old.get(name) != new[name]:
+                    owner(kind, name).set(kind, name, new[name])
+
+        if config.default_setup != base.default_setup:
+            owner("defaults", "setup").set_default(config.default_setup)
+
+        # Concurrent changes may conflict (e.g. a removed pipeline still in
+        # use); nothing is written unless the merged result is valid.
+        merged = BifrostConfig.merge([edit.config() for edit in edits.values()])
+        written: set[str] = set()
+        for edit in edits.values():
+            if edit.changed:
+                self._write_file(edit.layer.path, edit.config(), edit.layer.includes)
+                written.add(str(edit.layer.path))
+                self._stamps[str(edit.layer.path)] = file_stamp(edit.layer.path)
+        self._base = merged
+        self._store_names(merged, written)
+
+    def _start_discovery(self) -> str:
+        """Stamp the candidate root files before discovering the roots."""
+        candidates = [USER_CONFIG_DIR, *(Path.cwd() / n for n in CONFIG_FILENAMES)]
+        for candidate in candidates:
+            self._stamps[str(candidate.resolve())] = file_stamp(candidate)
+        return str(Path.cwd())
+
+    def _store_names(
+        self, config: BifrostConfig, written: Collection[str] = ()
+    ) -> None:
+        if not self._use_cache or self._directory is None:
+            return
+        # Like snapshots, names from a file that may still change within its
+        # mtime tick are not cached, unless this process just wrote the file
+        # under the write lock.
+        racy_after = time.time_ns() - int(RACY_MTIME_WINDOW * 1e9)
+        if any(
+            stamp is not None and stamp[0] > racy_after and path not in written
+            for path, stamp in self._stamps.items()
+        ):
+            return
+        write_names(self._directory, self._stamps, config_names(config))
+
+    def _write_file(
+        self, config_file_path: Path, config: BifrostConfig, includes: tuple[str, ...]
+    ) -> None:
+        import yaml
+
+        data = config.to_dict()
+        if includes:
+            data = {"version": data.pop("version"), "include": list(includes), **data}
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        text = yaml.dump(data, Dumper=dumper, sort_keys=False, default_flow_style=False)
         try:
-            raw = yaml.safe_load(config_file_path.read_text())
+            mode = config_file_path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        write_bytes_atomic(config_file_path, text.encode(), mode=mode)
+
+    def _load_layers(self, roots: list[Path]) -> list[ConfigLayer]:
+        layers: list[ConfigLayer] = []
+        loaded: set[Path] = set()
+        for root in roots:
+            self._load_tree(root, layers, loaded, stack=())
+        return layers
+
+    def _load_tree(
+        self,
+        path: Path,
+        layers: list[ConfigLayer],
+        loaded: set[Path],
+        stack: tuple[Path, ...],
+    ) -> None:
+        """Append the layers of `path`, its includes first (depth-first)."""
+        resolved = path.resolve()
+        if resolved in stack:
+            chain = " -> ".join(str(p) for p in (*stack, resolved))
+            raise ConfigError(f"Config include cycle: {chain}")
+        if resolved in loaded:
+            return
+
+        layer = self._load_layer(path)
+        for include in layer.include_paths:
+            self._load_tree(include, layers, loaded, (*stack, resolved))
+        loaded.add(resolved)
+        layers.append(layer)
+
+    def _load_layer(self, path: Path) -> ConfigLayer:
+        try:
+            stat = path.stat()
+        except OSError as e:
+            raise ConfigError(f"Cannot read config file {path}: {e}") from e
+
+        self._stamps[str(path.resolve())] = [stat.st_mtime_ns, stat.st_size]
+        stamp = _snapshot_stamp(path, stat.st_mtime_ns, stat.st_size)
+        if not self._use_cache:
+            return self._parse(path)
+
+        resolved = path.resolve()
+        loaded = _loaded_layers.get(resolved)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded[1]
+
+        is_settled = time.time() - stat.st_mtime > RACY_MTIME_WINDOW
+        snapshot_path = _snapshot_path(path)
+        layer = _load_snapshot(snapshot_path, stamp)
+        if layer is None:
+            layer = self._parse(path)
+            if is_settled:
+                _store_snapshot(snapshot_path, stamp, layer)
+        if is_settled:
+            _loaded_layers[resolved] = (stamp, layer)
+        return layer
+
+    def _parse(self, config_file_path: Path) -> ConfigLayer:
+        import yaml
+
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        try:
+            raw = yaml.load(config_file_path.read_text(), Loader=loader)
         except yaml.YAMLError as e:
             raise ConfigError(f"Invalid YAML in {config_file_path}: {e}") from e
         except OSError as e:
@@ -24,16 +312,30 @@ class ConfigManager:
         if not isinstance(raw, dict):
             raise ConfigError(f"Config file {config_file_path} must be a YAML mapping")
 
-        return BifrostConfig.from_mapping(raw)
-
-    def write_config(self, config: BifrostConfig, path: Path | None = None) -> Path:
-        config_file_path = path or USER_CONFIG_DIR
-        config_file_path.parent.mkdir(parents=True, exist_ok=True)
-        data = config.to_dict()
-        config_file_path.write_text(
-            yaml.dump(data, sort_keys=False, default_flow_style=False)
+        includes = require_str_list(
+            as_mapping(raw, what="Bifrost config"),
+            "include",
+            what=f"Config file {config_file_path}",
+        )
+        base_dir = config_file_path.resolve().parent
+        return ConfigLayer(
+            path=config_file_path.resolve(),
+            config=BifrostConfig.from_mapping(raw, validate=False),
+            includes=includes,
+            include_paths=tuple(
+                base_dir / Path(include).expanduser() for include in includes
+            ),
         )
-        return config_file_path
+
+    def _discover_roots(self) -> list[Path]:
+        roots = [USER_CONFIG_DIR] if USER_CONFIG_DIR.is_file() else []
+        for name in CONFIG_FILENAMES:
+            project = Path.cwd() / name
+            if project.is_file():
+                if project.resolve() != USER_CONFIG_DIR.resolve():
+                    roots.append(project)
+                break
+        return roots
 
     def _find_config_file(self, start_dir: Path | None = None) -> Path:
         if start_dir is not None:
@@ -61,3 +363,87 @@ class ConfigManager:
             f"No config file found. Expected {' or '.join(CONFIG_FILENAMES)} "
             f"in project root, or {USER_CONFIG_DIR}"
         )
+
+
+def _defines(config: BifrostConfig, kind: str, name: str) -> bool:
+    if kind == "defaults":
+        return config.default_setup is not None
+    entries: dict[str, Any] = getattr(config, kind)
+    return name in entries
+
+
+class _LayerEdit:
+    """Pending changes to the entries of one layer."""
+
+    def __init__(self, layer: ConfigLayer) -> None:
+        self.layer = layer
+        self.setups = dict(layer.config.setups)
+        self.pipelines = dict(layer.config.pipelines)
+        self.default_setup = layer.config.default_setup
+        self.changed = False
+
+    def set(self, kind: str, name: str, value: Any) -> None:
+        getattr(self, kind)[name] = value
+        self.changed = True
+
+    def remove(self, kind: str, name: str) -> None:
+        if getattr(self, kind).pop(name, None) is not None:
+            self.changed = True
+
+    def set_default(self, name: str | None) -> None:
+        self.default_setup = name
+        self.changed = True
+
+    def config(self) -> BifrostConfig:
+        return BifrostConfig(
+            setups=self.setups,
+            default_setup=self.default_setup,
+            pipelines=self.pipelines,
+        )
+
+
+def _write_lock_path() -> Path:
+    """Lock serializing config writes of all bf processes of the user."""
+    return cache_dir() / "config" / "write"
+
+
+def _snapshot_path(config_file_path: Path) -> Path:
+    key = str(config_file_path.resolve())
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return cache_dir() / "config" / f"{digest}.pickle"
+
+
+def _snapshot_stamp(
+    config_file_path: Path, mtime_ns: int, size: int
+) -> tuple[Any, ...]:
+    """Identifies one version of a config file parsed by this version of bifrost."""
+    # The models' own mtime invalidates snapshots when bifrost is upgraded.
+    models_mtime_ns = Path(models.__file__).stat().st_mtime_ns
+    return (
+        COMPILED_CONFIG_FORMAT,
+        models_mtime_ns,
+        str(config_file_path.resolve()),
+        mtime_ns,
+        size,
+    )
+
+
+def _load_snapshot(snapshot_path: Path, stamp: tuple[Any, ...]) -> ConfigLayer | None:
+    try:
+        stored_stamp, layer = pickle.loads(snapshot_path.read_bytes())
+    except Exception:
+        # Missing, truncated or written by an incompatible bifrost.
+        return None
+    if stored_stamp != stamp or not isinstance(layer, ConfigLayer):
+        return None
+    return layer
+
+
+def _store_snapshot(
+    snapshot_path: Path, stamp: tuple[Any, ...], layer: ConfigLayer
+) -> None:
+    # The cache is an optimization; a read-only cache dir is not an error.
+    with suppress(OSError):
+        write_bytes_atomic(
+            snapshot_path, pickle.dumps((stamp, layer), pickle.HIGHEST_PROTOCOL)
+        )
@@ -14,5 +14,13 @@ class SshError(BifrostError):
     exit_code = 4
 
 
+class LeaseHeldError(BifrostError):
+    exit_code = 2
+
+
 class LogCopyError(BifrostError):
     exit_code = 6
+
+
+class PipelineGateError(BifrostError):
+    exit_code = 7
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import fnmatch
+import getpass
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any
 
-from bifrost.infra.utils import as_mapping, require_int, require_str
+from bifrost.infra.utils import (
+    as_mapping,
+    require_int,
+    require_str,
+    require_str_list,
+    require_str_mapping,
+)
 from bifrost.shared.errors import ConfigError
+from bifrost.shared.selector import LabelIndex, Selector, validate_label
 
 
 @dataclass(frozen=True, slots=True)
@@ -53,6 +62,49 @@ class PipelineConfig:
         }
 
 
+@dataclass(frozen=True, slots=True)
+class CiConfig:
+    """CI jobs that use a setup's hardware.
+
+    A setup with no tags and no jobs is considered busy whenever any pipeline
+    of its project is running or pending.
+    """
+
+    tags: tuple[str, ...] = ()
+    jobs: tuple[str, ...] = ()
+
+    @classmethod
+    def from_mapping(cls, raw: Any, *, what: str) -> CiConfig:
+        data = as_mapping(raw, what=what)
+        return cls(
+            tags=require_str_list(data, "tags", what=what),
+            jobs=require_str_list(data, "jobs", what=what),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.tags and not self.jobs
+
+    def matches(self, job_name: str, job_tags: list[str]) -> bool:
+        """Whether a CI job runs on the setup, by runner tag or job name glob."""
+        if not set(self.tags).isdisjoint(job_tags):
+            return True
+        return any(fnmatch.fnmatchcase(job_name, pattern) for pattern in self.jobs)
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {}
+        if self.tags:
+            data["tags"] = list(self.tags)
+        if self.jobs:
+            data["jobs"] = list(self.jobs)
+        return data
+
+
+# How bf reaches a setup: over ssh/rsync, or directly on this machine.
+TRANSPORTS = ("ssh", "local")
+LOCAL_HOST = "localhost"
+
+
 @dataclass(frozen=True, slots=True)
 class SetupConfig:
     name: str
@@ -62,12 +114,42 @@ class SetupConfig:
     runner: str | None = None
     logs: LogConfig = field(default_factory=LogConfig)
     pipeline: str | None = None
+    ci: CiConfig = field(default_factory=CiConfig)
+    pools: tuple[str, ...] = ()
+    labels: dict[str, str] = field(default_factory=dict, hash=False)
+    transport: str = "ssh"
+    # Directory commands of a local setup run in; the user's home by default.
+    root: str | None = None
+    # Serve operations through a resident bf agent instead of one ssh each.
+    agent: bool = False
 
     @classmethod
     def from_mapping(cls, name: str, raw: Any) -> SetupConfig:
         data = as_mapping(raw, what=f"Setup '{name}'")
-        host = require_str(data, "host", what=f"Setup '{name}'")
-        user = require_str(data, "user", what=f"Setup '{name}'")
+
+        transport = data.get("transport", "ssh")
+        if transport not in TRANSPORTS:
+            raise ConfigError(
+                f"Setup '{name}' transport must be one of {list(TRANSPORTS)}"
+            )
+        root = data.get("root")
+        if root is not None and (transport != "local" or not isinstance(root, str)):
+            raise ConfigError(
+                f"Setup '{name}' root must be a string and needs transport: local"
+            )
+
+        agent = data.get("agent", False)
+        if not isinstance(agent, bool) or (agent and transport != "ssh"):
+            raise ConfigError(
+                f"Setup '{name}' agent must be true or false and needs transport: ssh"
+            )
+
+        if transport == "local":
+            host = str(data.get("host", LOCAL_HOST))
+            user = str(data.get("user", getpass.getuser()))
+        else:
+            host = require_str(data, "host", what=f"Setup '{name}'")
+            user = require_str(data, "user", what=f"Setup '{name}'")
 
         port = data.get("port")
         if port is not None and not isinstance(port, int):
@@ -86,6 +168,12 @@ class SetupConfig:
         if pipeline is not None and not isinstance(pipeline, str):
             raise ConfigError(f"Setup '{name}' pipeline must be a string")
 
+        ci = CiConfig.from_mapping(data.get("ci"), what=f"Setup '{name}' ci")
+        pools = require_str_list(data, "pools", what=f"Setup '{name}'")
+        labels = require_str_mapping(data, "labels", what=f"Setup '{name}'")
+        for key, value in labels.items():
+            validate_label(key, value, what=f"Setup '{name}'")
+
         return cls(
             name=name,
             host=host,
@@ -94,13 +182,33 @@ class SetupConfig:
             runner=runner,
             logs=logs,
             pipeline=pipeline,
+            ci=ci,
+            pools=pools,
+            labels=labels,
+            transport=transport,
+            root=root,
+            agent=agent,
         )
 
+    @property
+    def is_local(self) -> bool:
+        return self.transport == "local"
+
     def default_logs(self) -> LogConfig:
         return LogConfig(local_log_dir=f".bifrost/{self.name}")
 
     def to_dict(self) -> dict[str, Any]:
-        data: dict[str, Any] = {"host": self.host, "user": self.user}
+        data: dict[str, Any] = {}
+        if self.is_local:
+            data["transport"] = self.transport
+            if self.root is not None:
+                data["root"] = self.root
+        if not self.is_local or self.host != LOCAL_HOST:
+            data["host"] = self.host
+        if not self.is_local or self.user != getpass.getuser():
+            data["user"] = self.user
+        if self.agent:
+            data["agent"] = True
         if self.port is not None:
             data["port"] = self.port
         if self.runner is not None:
@@ -112,6 +220,15 @@ class SetupConfig:
         if self.pipeline is not None:
             data["pipeline"] = self.pipeline
 
+        if not self.ci.is_empty:
+            data["ci"] = self.ci.to_dict()
+
+        if self.pools:
+            data["pools"] = list(self.pools)
+
+        if self.labels:
+            data["labels"] = dict(self.labels)
+
         return data
 
 
@@ -120,9 +237,19 @@ class BifrostConfig:
     setups: dict[str, SetupConfig]
     default_setup: str | None = None
     pipelines: dict[str, PipelineConfig] = field(default_factory=dict)
+    _label_index: LabelIndex = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        labels = {name: setup.labels for name, setup in self.setups.items()}
+        object.__setattr__(self, "_label_index", LabelIndex(labels))
 
     @classmethod
-    def from_mapping(cls, raw: Any) -> BifrostConfig:
+    def from_mapping(cls, raw: Any, *, validate: bool = True) -> BifrostConfig:
+        """Build a config from parsed YAML.
+
+        Without `validate`, references between setups, pipelines and defaults
+        are not checked; use this for one layer of a layered config.
+        """
         data = as_mapping(raw, what="Bifrost config")
 
         version = data.get("version")
@@ -149,6 +276,22 @@ class BifrostConfig:
             for name, pipeline_raw in pipelines_map.items()
         }
 
+        cfg = cls(setups=setups, default_setup=default_setup, pipelines=pipelines)
+        if validate:
+            cfg._validate()
+        return cfg
+
+    @classmethod
+    def merge(cls, layers: list[BifrostConfig]) -> BifrostConfig:
+        """Merge config layers; later layers override earlier ones by name."""
+        setups: dict[str, SetupConfig] = {}
+        pipelines: dict[str, PipelineConfig] = {}
+        default_setup = None
+        for layer in layers:
+            setups.update(layer.setups)
+            pipelines.update(layer.pipelines)
+            default_setup = layer.default_setup or default_setup
+
         cfg = cls(setups=setups, default_setup=default_setup, pipelines=pipelines)
         cfg._validate()
         return cfg
@@ -169,6 +312,15 @@ class BifrostConfig:
                     f"'{setup.pipeline}'. Available: {pipeline_list}"
                 )
 
+    def pool_members(self, pool: str) -> list[SetupConfig]:
+        return [setup for setup in self.setups.values() if pool in setup.pools]
+
+    def select(self, selector: Selector | str) -> list[SetupConfig]:
+        """Setups whose labels match `selector`, in config order."""
+        if isinstance(selector, str):
+            selector = Selector.parse(selector)
+        return [self.setups[name] for name in self._label_index.select(selector)]
+
     def to_dict(self) -> dict[str, Any]:
         result: dict[str, Any] = {
             "version": 1,
@@ -192,6 +344,34 @@ class RunMetadata:
     timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     exit_code: int = 0
     log_paths: list[str] = field(default_factory=list)
+    duration_s: float | None = None
+    # Seconds spent in each phase of the run, e.g. {"gate": 0.4, "execute": 12.1}.
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_mapping(cls, raw: Any) -> RunMetadata:
+        data = as_mapping(raw, what="Run metadata")
+        ref = data.get("ref")
+        duration = data.get("duration_s")
+        timings = as_mapping(data.get("timings") or {}, what="Run timings")
+        try:
+            timestamp = datetime.fromisoformat(
+                require_str(data, "timestamp", what="Run metadata")
+            )
+        except ValueError as e:
+            raise ConfigError(f"Run metadata timestamp is invalid: {e}") from e
+
+        return cls(
+            run_id=require_str(data, "run_id", what="Run metadata"),
+            setup=require_str(data, "setup", what="Run metadata"),
+            ref=ref if isinstance(ref, str) else None,
+            command=list(require_str_list(data, "command", what="Run metadata")),
+            timestamp=timestamp,
+            exit_code=require_int(data, "exit_code", what="Run metadata"),
+            log_paths=list(require_str_list(data, "log_paths", what="Run metadata")),
+            duration_s=float(duration) if isinstance(duration, int | float) else None,
+            timings={str(phase): float(seconds) for phase, seconds in timings.items()},
+        )
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -202,4 +382,38 @@ class RunMetadata:
             "timestamp": self.timestamp.isoformat(),
             "exit_code": self.exit_code,
             "log_paths": self.log_paths,
+            "duration_s": self.duration_s,
+            "timings": self.timings,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Lease:
+    """Exclusive claim on a setup, stored on the setup itself.
+
+    Times are epoch seconds by the setup's clock.
+    """
+
+    owner: str
+    run_id: str
+    acquired_at: int
+    expires_at: int
+
+    @classmethod
+    def from_mapping(cls, raw: Any) -> Lease:
+        data = as_mapping(raw, what="Lease")
+
+        return cls(
+            owner=require_str(data, "owner", what="Lease"),
+            run_id=require_str(data, "run_id", what="Lease"),
+            acquired_at=require_int(data, "acquired_at", what="Lease"),
+            expires_at=require_int(data, "expires_at", what="Lease"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "run_id": self.run_id,
+            "acquired_at": self.acquired_at,
+            "expires_at": self.expires_at,
         }
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from bifrost.shared.errors import ConfigError
+
+# Characters with a meaning in selector expressions.
+_RESERVED = frozenset("=!,|")
+
+
+@dataclass(frozen=True, slots=True)
+class LabelTerm:
+    """One comma-separated term of a selector.
+
+    `key=a|b` requires the label to have one of the values, `key` only that it
+    exists. A negated term (`key!=a`, `!key`) matches wherever the positive
+    one does not.
+    """
+
+    key: str
+    values: frozenset[str] = frozenset()
+    negate: bool = False
+
+    def matches(self, labels: Mapping[str, str]) -> bool:
+        value = labels.get(self.key)
+        hit = value is not None and (not self.values or value in self.values)
+        return hit != self.negate
+
+
+@dataclass(frozen=True, slots=True)
+class Selector:
+    """Conjunction of label terms, e.g. `lab=berlin,dut=gen3|gen4,!broken`."""
+
+    terms: tuple[LabelTerm, ...]
+
+    @classmethod
+    def parse(cls, expression: str) -> Selector:
+        terms = tuple(
+            _parse_term(term.strip(), expression) for term in expression.split(",")
+        )
+        return cls(terms=terms)
+
+    def matches(self, labels: Mapping[str, str]) -> bool:
+        return all(term.matches(labels) for term in self.terms)
+
+
+def _parse_term(term: str, expression: str) -> LabelTerm:
+    negate = False
+    if term.startswith("!"):
+        negate, term = True, term[1:].strip()
+        if "=" in term:
+            raise ConfigError(f"Invalid selector '{expression}': use 'key!=value'")
+
+    if "!=" in term:
+        negate = True
+        key, _, raw_values = term.partition("!=")
+    elif "=" in term:
+        key, _, raw_values = term.partition("=")
+    else:
+        key, raw_values = term, None
+
+    key = key.strip()
+    if not _is_plain(key):
+        raise ConfigError(f"Invalid selector '{expression}': bad label key '{key}'")
+    if raw_values is None:
+        return LabelTerm(key=key, negate=negate)
+
+    values = [value.strip() for value in raw_values.split("|")]
+    if not all(_is_plain(value) for value in values):
+        raise ConfigError(f"Invalid selector '{expression}': bad value for '{key}'")
+    return LabelTerm(key=key, values=frozenset(values), negate=negate)
+
+
+def _is_plain(text: str) -> bool:
+    return (
+        bool(text)
+        and _RESERVED.isdisjoint(text)
+        and not any(char.isspace() for char in text)
+    )
+
+
+def validate_label(key: str, value: str, *, what: str) -> None:
+    """Reject labels that a selector could not address."""
+    if not _is_plain(key) or not _is_plain(value):
+        raise ConfigError(
+            f"{what} label '{key}: {value}' must be non-empty and may not contain "
+            f"whitespace or any of {''.join(sorted(_RESERVED))}"
+        )
+
+
+def parse_label(text: str) -> tuple[str, str]:
+    """Parse a `key=value` label given on the command line."""
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise ConfigError(f"Invalid label '{text}': expected key=value")
+    validate_label(key, value, what="Setup")
+    return key, value
+
+
+class LabelIndex:
+    """Maps each label and label key to the names of the setups carrying it.
+
+    Selecting intersects the index entries of the positive terms, smallest
+    first, so a selector over a large fleet only touches matching setups.
+    Results keep the order in which setups were indexed.
+    """
+
+    def __init__(self, labels_by_name: Mapping[str, Mapping[str, str]]) -> None:
+        self._order = {name: position for position, name in enumerate(labels_by_name)}
+        self._by_label: dict[tuple[str, str], set[str]] = {}
+        self._by_key: dict[str, set[str]] = {}
+        for name, labels in labels_by_name.items():
+            for key, value in labels.items():
+                self._by_label.setdefault((key, value), set()).add(name)
+                self._by_key.setdefault(key, set()).add(name)
+
+    def select(self, selector: Selector) -> list[str]:
+        positive = [term for term in selector.terms if not term.negate]
+        negative = [term for term in selector.terms if term.negate]
+
+        if positive:
+            matches = sorted((self._names(term) for term in positive), key=len)
+            names = set(matches[0]).intersection(*matches[1:])
+        else:
+            names = set(self._order)
+        for term in negative:
+            names -= self._names(term)
+
+        return sorted(names, key=self._order.__getitem__)
+
+    def _names(self, term: LabelTerm) -> set[str]:
+        if not term.values:
+            return self._by_key.get(term.key, set())
+        return set().union(
+            *(self._by_label.get((term.key, value), set()) for value in term.values)
+        )
@@ -17,12 +17,15 @@ def tmp_config(tmp_path: Path) -> Callable[[str], Path]:
 
 @pytest.fixture
 def cli_app() -> typer.Typer:
-    """Return a properly initialized CLI app with all commands registered."""
-    import bifrost.commands.run.command
-    import bifrost.commands.ssh.command
-    import bifrost.commands.status.command  # noqa: F401
+    """Return the CLI app; its commands are loaded lazily on first use."""
     from bifrost.cli.app import app
-    from bifrost.commands.config import config_app
 
-    app.add_typer(config_app)
     return app
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Keep bf's on-disk caches out of the real user cache directory."""
+    cache_home = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
@@ -0,0 +1,79 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from benchmarks.harness import BenchEnvironment
+from bifrost.infra import trace
+from bifrost.infra.agent import AGENT_DIGEST, AgentTransport, close_agents
+from bifrost.shared import SetupConfig
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="shims are sh scripts")
+
+
+@pytest.fixture
+def env() -> Iterator[BenchEnvironment]:
+    with BenchEnvironment() as env:
+        yield env
+        close_agents()
+
+
+@pytest.fixture
+def setup() -> SetupConfig:
+    return SetupConfig(name="bench-0", host="bench-0", user="ci", agent=True)
+
+
+def _agent_file(env: BenchEnvironment) -> Path:
+    return env.remote_home("bench-0") / ".cache/bifrost" / f"agent-{AGENT_DIGEST}.py"
+
+
+def test_uploads_once_then_serves_over_one_ssh(
+    env: BenchEnvironment, setup: SetupConfig
+) -> None:
+    transport = AgentTransport(setup)
+    recorder = trace.start_tracing()
+    try:
+        first = transport.run(["echo", "hello", "&&", "exit", "4"])
+        second = transport.run(["pwd"])
+        close_agents()
+        transport.run(["true"])
+    finally:
+        trace.stop_tracing()
+
+    assert (first.returncode, first.stdout) == (4, "hello\n")
+    assert second.stdout.strip() == str(env.remote_home("bench-0"))
+    assert env.take_spawns() == {"ssh": 2}
+    starts = [e["args"] for e in recorder.events if e.get("name") == "agent start"]
+    assert [start["uploaded"] for start in starts] == [True, False]
+    assert _agent_file(env).is_file()
+
+
+def test_corrupt_upload_is_replaced(env: BenchEnvironment, setup: SetupConfig) -> None:
+    agent_file = _agent_file(env)
+    agent_file.parent.mkdir(parents=True)
+    agent_file.write_text("print('tampered')\n")
+
+    with pytest.raises(Exception, match="hash mismatch"):
+        AgentTransport(setup).run(["true"])
+
+    assert AgentTransport(setup).run(["true"]).returncode == 0
+
+
+def test_write_and_fetch_only_changed_files(
+    env: BenchEnvironment, setup: SetupConfig, tmp_path: Path
+) -> None:
+    transport = AgentTransport(setup)
+    transport.write_file("logs/run1/run.json", '{"exit_code": 0}')
+    transport.run(
+        ["mkdir", "-p", "logs/run1/out", "&&", "echo", "x", ">", "logs/run1/out/a.txt"]
+    )
+    local_dir = tmp_path / "local"
+
+    transport.fetch_dir("logs/run1", local_dir)
+    (local_dir / "out/a.txt").write_text("changed locally")
+    transport.fetch_dir("logs/run1", local_dir)
+
+    assert (local_dir / "run.json").read_text() == '{"exit_code": 0}'
+    # Restored because its size no longer matched the stored file.
+    assert (local_dir / "out/a.txt").read_text() == "x\n"
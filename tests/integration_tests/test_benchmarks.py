@@ -0,0 +1,106 @@
+import json
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.fake_gitlab import FakeGitLab
+from benchmarks.harness import (
+    BenchEnvironment,
+    bench_copy_logs,
+    bench_exec,
+    bench_run,
+    bench_status,
+)
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="shims are sh scripts")
+
+
+@pytest.fixture
+def env() -> Iterator[BenchEnvironment]:
+    with BenchEnvironment() as env:
+        yield env
+
+
+class TestSpawnCounts:
+    """Regression guard on the external calls each operation makes."""
+
+    def test_run(self, env: BenchEnvironment) -> None:
+        result = bench_run(env, repeats=1)
+
+        # Lease acquire, execute, mkdir + run.json, lease release; one rsync.
+        assert result.spawns == {"rsync": 1, "ssh": 5}
+        assert result.http_requests == 2
+        assert list(env.project.glob(".bifrost/bench-0/*/run.json"))
+
+    def test_agent_run_is_one_ssh(self, env: BenchEnvironment) -> None:
+        result = bench_run(env, repeats=2, transport="agent")
+
+        assert result.spawns == {"ssh": 1}
+        assert len(list(env.project.glob(".bifrost/bench-0/*/run.json"))) == 2
+
+    def test_local_run_spawns_no_ssh(self, env: BenchEnvironment) -> None:
+        result = bench_run(env, repeats=1, transport="local")
+
+        assert result.spawns == {}
+        assert list(env.remote_home("bench-0").glob(".bifrost/logs/*/run.json"))
+        assert list(env.project.glob(".bifrost/bench-0/*/run.json"))
+
+    def test_exec_is_one_ssh_without_gate(self, env: BenchEnvironment) -> None:
+        result = bench_exec(env, repeats=2)
+
+        assert result.spawns == {"ssh": 1}
+        assert result.http_requests == 0
+        assert not list(env.project.glob(".bifrost/*/*"))
+
+    def test_status_scales_with_setups(self, env: BenchEnvironment) -> None:
+        small = bench_status(env, setups=1, repeats=1)
+        large = bench_status(env, setups=4, repeats=1)
+
+        assert small.spawns == {"ssh": 2}
+        assert large.spawns == {"ssh": 8}
+        # One pipeline gate shared by every setup.
+        assert small.http_requests == large.http_requests == 2
+
+    def test_copy_logs_is_one_rsync(self, env: BenchEnvironment) -> None:
+        result = bench_copy_logs(env, files=25, repeats=2)
+
+        assert result.spawns == {"rsync": 1}
+        assert len(list(env.project.glob(".bifrost/bench-0/copy-25/*/*.log"))) == 25
+
+
+def test_fake_gitlab_revalidates_with_etag() -> None:
+    import httpx
+
+    with FakeGitLab(busy=True) as gitlab:
+        url = f"{gitlab.url}/api/v4/projects/1/pipelines"
+        headers = {"PRIVATE-TOKEN": "t"}
+        first = httpx.get(url, headers=headers)
+        again = httpx.get(
+            url, headers={**headers, "If-None-Match": first.headers["ETag"]}
+        )
+
+        assert first.json() == [{"id": 1, "status": "running"}]
+        assert again.status_code == 304
+        assert httpx.get(url).status_code == 401
+        assert gitlab.requests == 3
+
+
+def test_main_writes_json(tmp_path: Path) -> None:
+    out = tmp_path / "bench.json"
+
+    args = ["--latency", "0", "--repeats", "1", "--setups", "2", "--files", "3"]
+    code = main([*args, "--json", str(out)])
+
+    assert code == 0
+    results = json.loads(out.read_text())["results"]
+    assert [(r["scenario"], r["size"]) for r in results] == [
+        ("run", 1),
+        ("run (agent)", 1),
+        ("run (local)", 1),
+        ("exec", 1),
+        ("status", 2),
+        ("copy_logs", 3),
+    ]
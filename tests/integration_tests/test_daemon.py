@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+BF = "import sys; sys.argv[0] = 'bf'; from bifrost.cli.main import main; main()"
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="Unix sockets")
+
+
+@pytest.fixture
+def project() -> Iterator[Path]:
+    # Short, so the daemon's socket path fits.
+    root = Path(tempfile.mkdtemp(prefix="bf-"))
+    (root / "project").mkdir()
+    (root / "project" / ".bifrost.yml").write_text(
+        f"version: 1\nsetups:\n  here:\n    transport: local\n    root: {root}\n"
+    )
+    yield root / "project"
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _env(project: Path, **extra: str) -> dict[str, str]:
+    return {
+        **os.environ,
+        "PYTHONPATH": str(SRC_DIR),
+        "XDG_CACHE_HOME": str(project.parent / "cache"),
+        "HOME": str(project.parent),
+        **extra,
+    }
+
+
+def bf(project: Path, *args: str, **env: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-c", BF, *args],
+        cwd=project,
+        env=_env(project, **env),
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+
+
+@pytest.fixture
+def daemon(project: Path) -> Iterator[subprocess.Popen[str]]:
+    process = subprocess.Popen(
+        [sys.executable, "-c", BF, "daemon", "start", "--foreground"],
+        cwd=project,
+        env=_env(project),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    socket_path = project.parent / "cache" / "bifrost" / "daemon.sock"
+    deadline = time.monotonic() + 10
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield process
+    if process.poll() is None:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def test_daemon_runs_commands_for_the_caller(
+    project: Path, daemon: subprocess.Popen[str]
+) -> None:
+    command = "echo $PWD $BF_MARK >> marks; exit 3"
+    result = bf(project, "run", "-s", "here", "--", command, BF_MARK="client")
+    in_process = bf(project, "run", "-s", "here", "--", command, BF_NO_DAEMON="1")
+
+    assert "Command failed on 'here' (exit 3)" in result.stderr
+    assert result.returncode == in_process.returncode != 0
+    # Run in the setup's root with the caller's environment.
+    marks = (project.parent / "marks").read_text().splitlines()
+    assert marks[0].split() == [str(project.parent), "client"]
+
+    status = bf(project, "daemon", "status")
+    assert "1 served, 0 running" in status.stdout
+    runs = list((project / ".bifrost" / "here").rglob("run.json"))
+    assert len(runs) == 2
+    assert {json.loads(run.read_text())["exit_code"] for run in runs} == {3}
+
+
+def test_stop_lets_commands_run_in_process_again(
+    project: Path, daemon: subprocess.Popen[str]
+) -> None:
+    stopped = bf(project, "daemon", "stop")
+    daemon.wait(timeout=10)
+
+    assert "stopped" in stopped.stdout
+    assert daemon.returncode == 0
+    assert bf(project, "setups").returncode == 0
+    assert bf(project, "daemon", "status").returncode == 1
+
+
+def test_daemon_learns_the_config_of_commands_it_runs(
+    project: Path, daemon: subprocess.Popen[str]
+) -> None:
+    config = project / ".bifrost.yml"
+    config.write_text(
+        config.read_text()
+        + "    pipeline: ci\n"
+        + "pipelines:\n  ci:\n    url: http://127.0.0.1:9\n"
+        + "    project_id: 7\n    token_env: BF_TEST_TOKEN\n"
+    )
+
+    assert bf(project, "setups").returncode == 0
+
+    deadline = time.monotonic() + 10
+    status = bf(project, "daemon", "status")
+    while "http://127.0.0.1:9 #7" not in status.stdout:
+        assert time.monotonic() < deadline, status.stdout
+        time.sleep(0.1)
+        status = bf(project, "daemon", "status")
+    assert "0 running" in status.stdout
@@ -0,0 +1,169 @@
+import os
+import subprocess
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bifrost.cli.completion import complete_names, complete_pools, complete_setups
+from bifrost.shared import ConfigManager
+
+SRC_DIR = Path(__file__).resolve().parents[3] / "src"
+NAMES = {"setups": ["rig-1", "rig-2", "lab"], "pipelines": ["main"], "pools": []}
+CONFIG = """\
+version: 1
+setups:
+  rig-1:
+    host: "10.0.0.1"
+    user: "ci"
+    pools: [gen4]
+  lab:
+    host: "10.0.0.2"
+    user: "ci"
+"""
+
+
+@pytest.fixture
+def cached_names() -> Iterator[MagicMock]:
+    with patch("bifrost.cli.completion.read_names", return_value=NAMES) as mock:
+        yield mock
+
+
+def _bash(monkeypatch: pytest.MonkeyPatch, line: str) -> None:
+    monkeypatch.setenv("_BF_COMPLETE", "complete_bash")
+    monkeypatch.setenv("COMP_WORDS", line)
+    words = line.split()
+    monkeypatch.setenv("COMP_CWORD", str(len(words) - (not line.endswith(" "))))
+
+
+class TestCompleteNames:
+    @pytest.mark.usefixtures("cached_names")
+    def test_bash_completes_setup_option(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _bash(monkeypatch, "bf run --setup rig")
+
+        assert complete_names() is True
+        assert capsys.readouterr().out == "rig-1\nrig-2\n"
+
+    @pytest.mark.usefixtures("cached_names")
+    def test_bash_completes_command_argument(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _bash(monkeypatch, "bf pipeline edit ")
+
+        assert complete_names() is True
+        assert capsys.readouterr().out == "main\n"
+
+    @pytest.mark.usefixtures("cached_names")
+    def test_zsh_output(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setenv("_BF_COMPLETE", "complete_zsh")
+        monkeypatch.setenv("_TYPER_COMPLETE_ARGS", "bf ssh -s l")
+
+        assert complete_names() is True
+        assert capsys.readouterr().out == "_arguments '*: :((\"lab\"))'\n"
+
+    @pytest.mark.usefixtures("cached_names")
+    def test_fish_is_args_exits_with_match_status(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("_BF_COMPLETE", "complete_fish")
+        monkeypatch.setenv("_TYPER_COMPLETE_FISH_ACTION", "is-args")
+        monkeypatch.setenv("_TYPER_COMPLETE_ARGS", "bf run --any ")
+
+        with pytest.raises(SystemExit) as exc_info:
+            complete_names()
+
+        assert exc_info.value.code == 1
+
+    @pytest.mark.parametrize("line", ["bf ", "bf run --", "bf config add "])
+    def test_other_words_fall_through(
+        self, monkeypatch: pytest.MonkeyPatch, cached_names: MagicMock, line: str
+    ) -> None:
+        _bash(monkeypatch, line)
+
+        assert complete_names() is False
+        cached_names.assert_not_called()
+
+    def test_stale_names_fall_through(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        _bash(monkeypatch, "bf run --setup ")
+
+        with patch("bifrost.cli.completion.read_names", return_value=None):
+            assert complete_names() is False
+
+    def test_not_completing(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.delenv("_BF_COMPLETE", raising=False)
+
+        assert complete_names() is False
+
+
+class TestCompletionCallbacks:
+    def test_reads_config_when_names_are_stale(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            "bifrost.shared.config_manager.USER_CONFIG_DIR", tmp_path / "user.yml"
+        )
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / ".bifrost.yml").write_text(CONFIG)
+
+        assert complete_setups("r") == ["rig-1"]
+        assert complete_pools("") == ["gen4"]
+
+    def test_unreadable_config_completes_nothing(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            "bifrost.shared.config_manager.USER_CONFIG_DIR", tmp_path / "user.yml"
+        )
+        monkeypatch.chdir(tmp_path)
+
+        assert complete_setups("") == []
+
+
+def test_fast_path_skips_app_imports(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        "bifrost.shared.config_manager.USER_CONFIG_DIR", tmp_path / "user.yml"
+    )
+    monkeypatch.chdir(tmp_path)
+    project = tmp_path / ".bifrost.yml"
+    project.write_text(CONFIG)
+    then = project.stat().st_mtime - 60
+    os.utime(project, (then, then))
+    ConfigManager().read_config()
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from bifrost.cli.main import main; main()",
+        ],
+        capture_output=True,
+        text=True,
+        env={
+            **os.environ,
+            "PYTHONPATH": str(SRC_DIR),
+            "_BF_COMPLETE": "complete_bash",
+            "COMP_WORDS": "bf run --setup ",
+            "COMP_CWORD": "3",
+        },
+        check=True,
+    )
+
+    assert result.stdout == "rig-1\nlab\n"
+    imported = [
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    ]
+    assert "bifrost.cli.main" in imported
+    heavy = [m for m in ("typer", "rich", "yaml", "bifrost.shared") if m in imported]
+    assert heavy == []
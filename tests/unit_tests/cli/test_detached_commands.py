@@ -0,0 +1,136 @@
+"""Tests for 'run --detach' and the attach, wait and cancel commands."""
+
+from collections.abc import Iterator
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from bifrost.cli.app import app
+from bifrost.commands.run import RemoteCommandError
+from bifrost.infra.detached import DetachedRun
+from bifrost.infra.log_store import LogStore
+from bifrost.shared import BifrostConfig, ConfigError, RunMetadata, SetupConfig
+
+runner = CliRunner()
+
+SETUP = SetupConfig(name="lab", host="10.0.0.1", user="ci")
+METADATA = RunMetadata(run_id="abc123", setup="lab", ref=None, command=["pytest"])
+
+
+@pytest.fixture
+def container(tmp_path: Path) -> Iterator[MagicMock]:
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": SETUP}, default_setup="lab"
+    )
+    mock_container.get_log_store.return_value = LogStore(tmp_path)
+    with patch("bifrost.cli.app.create_container", return_value=mock_container):
+        yield mock_container
+
+
+@pytest.fixture
+def poll() -> Iterator[MagicMock]:
+    with (
+        patch("bifrost.infra.detached.poll") as mock_poll,
+        patch("bifrost.commands.run.detached.time.sleep"),
+    ):
+        yield mock_poll
+
+
+def test_run_detach_prints_the_run_id(container: MagicMock) -> None:
+    mock_runner = MagicMock()
+    mock_runner.detach.return_value = METADATA
+
+    with patch("bifrost.commands.run.command.Runner", return_value=mock_runner):
+        result = runner.invoke(app, ["run", "-s", "lab", "--detach", "--", "pytest"])
+
+    assert result.exit_code == 0
+    assert "bf attach abc123" in result.stdout
+    mock_runner.detach.assert_called_once_with(
+        setup_name="lab",
+        command=["pytest"],
+        ref=None,
+        latest=False,
+        force=False,
+        wait_timeout=None,
+    )
+    mock_runner.run.assert_not_called()
+
+
+def test_run_detach_rejects_a_matrix(container: MagicMock) -> None:
+    result = runner.invoke(
+        app, ["run", "-s", "lab", "-r", "a", "-r", "b", "--detach", "--", "pytest"]
+    )
+
+    assert isinstance(result.exception, ConfigError)
+
+
+def test_attach_streams_output_until_the_run_exits(
+    container: MagicMock, poll: MagicMock, tmp_path: Path
+) -> None:
+    (tmp_path / SETUP.logs.local_log_dir / "abc123").mkdir(parents=True)
+    poll.side_effect = [
+        DetachedRun(METADATA, "running", output="one\n", offset=3),
+        DetachedRun(METADATA, "running", offset=3),
+        DetachedRun(METADATA, "exited", output="two\n", offset=4),
+    ]
+
+    with patch("bifrost.commands.run.runner.Runner.finish_detached") as finish:
+        finish.return_value = METADATA
+        result = runner.invoke(app, ["attach", "abc123", "--offset", "2"])
+
+    assert result.exit_code == 0
+    assert result.stdout.startswith("one\ntwo\n")
+    assert "Run completed" in result.stdout
+    assert [c.args[2] for c in poll.call_args_list] == [2, 3, 3]
+
+
+def test_wait_fails_like_run_when_the_command_fails(
+    container: MagicMock, poll: MagicMock
+) -> None:
+    failed = replace(METADATA, exit_code=2)
+    poll.return_value = DetachedRun(failed, "exited")
+
+    with patch("bifrost.commands.run.runner.Runner.finish_detached") as finish:
+        finish.return_value = failed
+        result = runner.invoke(app, ["wait", "abc123", "-s", "lab"])
+
+    assert isinstance(result.exception, RemoteCommandError)
+    assert result.exception.remote_exit_code == 2
+
+
+def test_wait_releases_the_lease_of_a_lost_run(
+    container: MagicMock, poll: MagicMock
+) -> None:
+    poll.return_value = DetachedRun(METADATA, "lost")
+
+    result = runner.invoke(app, ["wait", "abc123", "-s", "lab"])
+
+    assert isinstance(result.exception, RemoteCommandError)
+    leases = container.get_lease_store.return_value
+    leases.release.assert_called_once_with(SETUP, "abc123")
+
+
+def test_attach_needs_the_setup_of_unknown_runs(container: MagicMock) -> None:
+    result = runner.invoke(app, ["attach", "abc123"])
+
+    assert isinstance(result.exception, ConfigError)
+
+
+def test_cancel_reports_the_exit_code(container: MagicMock, poll: MagicMock) -> None:
+    cancelled = replace(METADATA, exit_code=143)
+    poll.return_value = DetachedRun(cancelled, "exited")
+
+    with (
+        patch("bifrost.infra.detached.cancel", return_value=True),
+        patch("bifrost.commands.run.runner.Runner.finish_detached") as finish,
+    ):
+        finish.return_value = cancelled
+        result = runner.invoke(app, ["cancel", "abc123", "-s", "lab"])
+
+    assert result.exit_code == 0
+    assert "Run cancelled" in result.stdout
+    assert "exit 143" in result.stdout
@@ -0,0 +1,82 @@
+"""Tests for the 'exec' command."""
+
+import subprocess
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from bifrost.cli.app import app
+from bifrost.commands.run.errors import CiBusyError
+from bifrost.shared import BifrostConfig, ConfigError, PipelineConfig, SetupConfig
+
+runner = CliRunner()
+
+PIPELINE = PipelineConfig(
+    url="https://gitlab.example.com", project_id=1, token_env="TOKEN"
+)
+SETUP = SetupConfig(name="lab", host="10.0.0.1", user="ci", pipeline="main")
+
+
+@pytest.fixture
+def container() -> Iterator[MagicMock]:
+    with patch("bifrost.cli.app.create_container") as create_container:
+        container = MagicMock()
+        container.get_config.return_value = BifrostConfig(
+            setups={"lab": SETUP}, default_setup="lab", pipelines={"main": PIPELINE}
+        )
+        container.get_gate_registry.return_value.is_busy.return_value = False
+        create_container.return_value = container
+        yield container
+
+
+@pytest.fixture
+def run_remote() -> Iterator[MagicMock]:
+    with patch("bifrost.commands.exec.command.run_remote") as mock:
+        mock.return_value = subprocess.CompletedProcess(args=[], returncode=0)
+        yield mock
+
+
+def test_streams_command_without_gate_or_logs(
+    container: MagicMock, run_remote: MagicMock
+) -> None:
+    result = runner.invoke(app, ["exec", "-s", "lab", "--", "cat", "/proc/loadavg"])
+
+    assert result.exit_code == 0
+    run_remote.assert_called_once_with(SETUP, ["cat", "/proc/loadavg"], capture=False)
+    container.get_gate_registry.return_value.is_busy.assert_not_called()
+    container.get_log_store.return_value.copy_logs.assert_not_called()
+    container.get_lease_store.return_value.try_acquire.assert_not_called()
+
+
+def test_exits_with_the_command_exit_code(
+    container: MagicMock, run_remote: MagicMock
+) -> None:
+    run_remote.return_value = subprocess.CompletedProcess(args=[], returncode=7)
+
+    result = runner.invoke(app, ["exec", "--", "false"])
+
+    assert result.exit_code == 7
+    assert run_remote.call_args.args[0] == SETUP
+
+
+def test_gate_refuses_a_busy_setup(container: MagicMock, run_remote: MagicMock) -> None:
+    gates = container.get_gate_registry.return_value
+    gates.is_busy.return_value = True
+
+    result = runner.invoke(app, ["exec", "--gate", "--", "true"])
+
+    assert isinstance(result.exception, CiBusyError)
+    gates.is_busy.assert_called_once_with(PIPELINE, "lab", SETUP.ci)
+    run_remote.assert_not_called()
+
+
+def test_unknown_setup_is_a_config_error(
+    container: MagicMock, run_remote: MagicMock
+) -> None:
+    result = runner.invoke(app, ["exec", "-s", "nope", "--", "true"])
+
+    assert isinstance(result.exception, ConfigError)
+    assert "Available: ['lab']" in result.exception.message
+    run_remote.assert_not_called()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from bifrost.cli.forward import (
+    daemon_key,
+    daemon_socket_path,
+    forward_to_daemon,
+    read_frame,
+)
+from bifrost.infra.agent_server import pack_frame
+
+
+@pytest.fixture(autouse=True)
+def short_cache(monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """A cache dir short enough for a Unix socket path."""
+    cache_home = Path(tempfile.mkdtemp(prefix="bf-"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.delenv("BF_NO_DAEMON", raising=False)
+    yield cache_home
+    shutil.rmtree(cache_home, ignore_errors=True)
+
+
+class FakeDaemon:
+    """Accepts one request and answers it with `reply`."""
+
+    def __init__(self, reply: dict[str, Any]) -> None:
+        self.reply = reply
+        self.request: dict[str, Any] = {}
+        self.fd_count = 0
+        path = daemon_socket_path()
+        path.parent.mkdir(parents=True)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(str(path))
+        self._listener.listen(1)
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        conn, _ = self._listener.accept()
+        with conn:
+            data, fds, _, _ = socket.recv_fds(conn, 1 << 20, 3)
+            self.fd_count = len(fds)
+            for fd in fds:
+                os.close(fd)
+            client, server = socket.socketpair()
+            with client, server:
+                client.sendall(data)
+                client.shutdown(socket.SHUT_WR)
+                self.request = read_frame(server) or {}
+            conn.sendall(pack_frame(self.reply))
+
+    def join(self) -> None:
+        self._thread.join(timeout=5)
+        self._listener.close()
+
+
+class TestForwardToDaemon:
+    def test_runs_in_process_without_a_daemon(self) -> None:
+        assert forward_to_daemon(["status"]) is None
+
+    def test_runs_in_process_if_the_socket_is_stale(self) -> None:
+        path = daemon_socket_path()
+        path.parent.mkdir(parents=True)
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(path))
+        stale.close()
+
+        assert forward_to_daemon(["status"]) is None
+
+    @pytest.mark.parametrize("args", [[], ["daemon", "stop"], ["ssh", "-s", "lab"]])
+    def test_keeps_some_commands_in_process(self, args: list[str]) -> None:
+        daemon = FakeDaemon({"type": "exit", "code": 0})
+        try:
+            assert forward_to_daemon(args) is None
+        finally:
+            # Unblock the fake daemon's accept().
+            forward_to_daemon(["status"])
+            daemon.join()
+
+    def test_opting_out_keeps_commands_in_process(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("BF_NO_DAEMON", "1")
+        daemon = FakeDaemon({"type": "exit", "code": 0})
+        try:
+            assert forward_to_daemon(["status"]) is None
+        finally:
+            monkeypatch.delenv("BF_NO_DAEMON")
+            forward_to_daemon(["status"])
+            daemon.join()
+
+    def test_forwards_the_command_line_and_returns_its_exit_code(self) -> None:
+        daemon = FakeDaemon({"type": "exit", "code": 5})
+
+        code = forward_to_daemon(["run", "-s", "lab", "--", "make", "test"])
+        daemon.join()
+
+        assert code == 5
+        assert daemon.fd_count == 3
+        assert daemon.request["op"] == "run"
+        assert daemon.request["argv"] == ["run", "-s", "lab", "--", "make", "test"]
+        assert daemon.request["cwd"] == os.getcwd()
+        assert daemon.request["env"]["XDG_CACHE_HOME"] == os.environ["XDG_CACHE_HOME"]
+        assert daemon.request["key"] == daemon_key()
+
+    def test_runs_in_process_if_the_daemon_declines(self) -> None:
+        daemon = FakeDaemon({"type": "stale"})
+
+        code = forward_to_daemon(["status"])
+        daemon.join()
+
+        assert code is None
@@ -0,0 +1,85 @@
+"""Tests for the 'logs' command group."""
+
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from typer.testing import CliRunner
+
+from bifrost.cli.app import app
+from bifrost.infra.log_queue import MAX_ATTEMPTS, LogQueue
+from bifrost.shared import RunMetadata, SetupConfig
+
+runner = CliRunner()
+
+SETUP = SetupConfig(name="lab", host="10.0.0.1", user="ci")
+
+
+def _queue(tmp_path: Path, mock_create_container: MagicMock) -> LogQueue:
+    queue = LogQueue(tmp_path / "queue")
+    mock_container = MagicMock()
+    mock_container.get_log_queue.return_value = queue
+    mock_create_container.return_value = mock_container
+    return queue
+
+
+def _metadata(run_id: str) -> RunMetadata:
+    return RunMetadata(run_id=run_id, setup="lab", ref=None, command=["pytest"])
+
+
+@patch("bifrost.cli.app.create_container")
+def test_pending_lists_queued_runs(
+    mock_create_container: MagicMock, tmp_path: Path
+) -> None:
+    queue = _queue(tmp_path, mock_create_container)
+    queue.enqueue(SETUP, _metadata("fresh"), tmp_path)
+    failed = queue.enqueue(SETUP, _metadata("stuck"), tmp_path)
+    queue.save(replace(failed, attempts=MAX_ATTEMPTS, last_error="host down"))
+
+    result = runner.invoke(app, ["logs", "pending"], terminal_width=200)
+
+    assert result.exit_code == 0
+    assert "fresh" in result.stdout
+    assert "stuck" in result.stdout
+    assert "gave up" in result.stdout
+    assert "host down" in result.stdout
+    assert "No worker is running" in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_pending_without_jobs(mock_create_container: MagicMock, tmp_path: Path) -> None:
+    _queue(tmp_path, mock_create_container)
+
+    result = runner.invoke(app, ["logs", "pending"])
+
+    assert result.exit_code == 0
+    assert "No logs pending" in result.stdout
+
+
+@patch("bifrost.infra.log_queue.LogQueue.start_worker")
+@patch("bifrost.cli.app.create_container")
+def test_retry_resets_attempts_and_starts_a_worker(
+    mock_create_container: MagicMock, mock_start_worker: MagicMock, tmp_path: Path
+) -> None:
+    queue = _queue(tmp_path, mock_create_container)
+    job = queue.enqueue(SETUP, _metadata("stuck"), tmp_path)
+    queue.save(replace(job, attempts=MAX_ATTEMPTS))
+
+    result = runner.invoke(app, ["logs", "retry", "stuck"])
+
+    assert result.exit_code == 0
+    assert "Retrying 1 run(s)" in result.stdout
+    assert queue.jobs()[0].attempts == 0
+    mock_start_worker.assert_called_once()
+
+
+@patch("bifrost.cli.app.create_container")
+def test_retry_unknown_run_fails(
+    mock_create_container: MagicMock, tmp_path: Path
+) -> None:
+    _queue(tmp_path, mock_create_container)
+
+    result = runner.invoke(app, ["logs", "retry", "nope"])
+
+    assert result.exit_code == 1
+    assert "No logs pending for run nope" in result.stdout
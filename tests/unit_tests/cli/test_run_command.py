@@ -2,10 +2,12 @@
 
 from unittest.mock import MagicMock, patch
 
+import pytest
 from typer.testing import CliRunner
 
 from bifrost.cli.app import app
-from bifrost.shared import BifrostConfig
+from bifrost.commands.run.matrix import MatrixCell
+from bifrost.shared import BifrostConfig, ConfigError, RunMetadata, SetupConfig
 
 runner = CliRunner()
 
@@ -53,6 +55,8 @@ def test_run_with_all_long_options(mock_create_container: MagicMock) -> None:
         latest=True,
         force=True,
         dry_run=False,
+        wait_timeout=None,
+        background_logs=False,
     )
 
 
@@ -89,6 +93,8 @@ def test_run_with_all_short_options(mock_create_container: MagicMock) -> None:
         latest=True,
         force=True,
         dry_run=False,
+        wait_timeout=None,
+        background_logs=False,
     )
 
 
@@ -125,6 +131,8 @@ def test_run_with_dry_run_flag(mock_create_container: MagicMock) -> None:
         latest=False,
         force=False,
         dry_run=True,
+        wait_timeout=None,
+        background_logs=False,
     )
     assert "Dry run" in result.stdout
 
@@ -159,6 +167,8 @@ def test_run_without_optional_parameters(mock_create_container: MagicMock) -> No
         latest=False,
         force=False,
         dry_run=False,
+        wait_timeout=None,
+        background_logs=False,
     )
 
 
@@ -195,4 +205,195 @@ def test_run_with_multi_word_command(mock_create_container: MagicMock) -> None:
         latest=False,
         force=False,
         dry_run=False,
+        wait_timeout=None,
+        background_logs=False,
     )
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_with_multiple_refs_runs_matrix(mock_create_container: MagicMock) -> None:
+    mock_create_container.return_value = MagicMock()
+    mock_matrix = MagicMock()
+    mock_matrix.run.return_value = [
+        MatrixCell(
+            setup="lab",
+            ref=ref,
+            metadata=RunMetadata(run_id=f"id-{ref}", setup="lab", ref=ref, command=[]),
+        )
+        for ref in ("main", "release")
+    ]
+
+    with (
+        patch("bifrost.commands.run.command.Runner"),
+        patch("bifrost.commands.run.command.MatrixRunner", return_value=mock_matrix),
+    ):
+        result = runner.invoke(
+            app, ["run", "-s", "lab", "-r", "main", "-r", "release", "--", "pytest"]
+        )
+
+    assert result.exit_code == 0
+    mock_matrix.run.assert_called_once_with(
+        setup_names=["lab"],
+        refs=["main", "release"],
+        command=["pytest"],
+        latest=False,
+        force=False,
+        dry_run=False,
+        wait_timeout=None,
+        background_logs=False,
+    )
+    assert "id-main" in result.stdout
+    assert "id-release" in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_wait_with_several_setups_starts_on_first_free(
+    mock_create_container: MagicMock,
+) -> None:
+    mock_create_container.return_value = MagicMock()
+    mock_runner = MagicMock()
+    mock_runner.resolve_setups.side_effect = lambda names: names
+    mock_runner.wait_for_setup.return_value = MagicMock()
+    mock_runner.wait_for_setup.return_value.name = "lab-b"
+    mock_runner.run.return_value = MagicMock(
+        setup="lab-b", ref=None, command=["pytest"], run_id="222", log_paths=[]
+    )
+
+    clock = MagicMock()
+    clock.monotonic.side_effect = [100.0, 130.0]
+
+    with (
+        patch("bifrost.commands.run.command.Runner", return_value=mock_runner),
+        patch("bifrost.commands.run.command.time", clock),
+    ):
+        result = runner.invoke(
+            app,
+            ["run", "-s", "lab-a", "-s", "lab-b", "--wait", "--wait-timeout", "90"],
+        )
+
+    assert result.exit_code == 0
+    assert mock_runner.wait_for_setup.call_args.args == (["lab-a", "lab-b"], 90.0)
+    # The 30s spent waiting for a free setup count against the timeout.
+    mock_runner.run.assert_called_once_with(
+        setup_name="lab-b",
+        command=None,
+        ref=None,
+        latest=False,
+        force=False,
+        dry_run=False,
+        wait_timeout=60.0,
+        background_logs=False,
+    )
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_any_dispatches_to_chosen_pool_member(
+    mock_create_container: MagicMock,
+) -> None:
+    mock_create_container.return_value = MagicMock()
+    mock_runner = MagicMock()
+    mock_runner.resolve_setups.side_effect = lambda names: names
+    mock_runner.wait_for_setup.return_value.name = "lab-b"
+    mock_runner.run.return_value = MagicMock(
+        setup="lab-b", ref=None, command=["pytest"], run_id="333", log_paths=[]
+    )
+    mock_dispatcher = MagicMock()
+    mock_dispatcher.choose.return_value.setup.name = "lab-b"
+    mock_dispatcher.choose.return_value.is_idle = True
+
+    with (
+        patch("bifrost.commands.run.command.Runner", return_value=mock_runner),
+        patch(
+            "bifrost.commands.run.command.PoolDispatcher",
+            return_value=mock_dispatcher,
+        ),
+    ):
+        result = runner.invoke(app, ["run", "--any", "hil", "--", "pytest"])
+
+    assert result.exit_code == 0
+    assert "Dispatching to lab-b (idle)" in result.stdout
+    mock_dispatcher.probe.assert_called_once_with("hil", check_load=False)
+    assert mock_runner.run.call_args.kwargs["setup_name"] == "lab-b"
+    assert mock_runner.run.call_args.kwargs["wait_timeout"] == pytest.approx(
+        3600.0, abs=1
+    )
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_any_rejects_setup(mock_create_container: MagicMock) -> None:
+    mock_create_container.return_value = MagicMock()
+
+    with patch("bifrost.commands.run.command.Runner"):
+        result = runner.invoke(app, ["run", "--any", "hil", "-s", "lab-a"])
+
+    assert isinstance(result.exception, ConfigError)
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_select_runs_matrix_over_matching_setups(
+    mock_create_container: MagicMock,
+) -> None:
+    mock_create_container.return_value = MagicMock()
+    mock_runner = MagicMock()
+    mock_runner.resolve_selector.return_value = [
+        SetupConfig(name=name, host="h", user="ci") for name in ("ber-1", "ber-2")
+    ]
+    mock_matrix = MagicMock()
+    mock_matrix.run.return_value = []
+
+    with (
+        patch("bifrost.commands.run.command.Runner", return_value=mock_runner),
+        patch("bifrost.commands.run.command.MatrixRunner", return_value=mock_matrix),
+    ):
+        result = runner.invoke(app, ["run", "--select", "lab=berlin", "--", "pytest"])
+
+    assert result.exit_code == 0
+    mock_runner.resolve_selector.assert_called_once_with("lab=berlin")
+    assert mock_matrix.run.call_args.kwargs["setup_names"] == ["ber-1", "ber-2"]
+
+
+@patch("bifrost.cli.app.create_container")
+def test_run_timings_prints_phase_table(mock_create_container: MagicMock) -> None:
+    mock_runner = MagicMock()
+    mock_runner.run.return_value = RunMetadata(
+        run_id="123",
+        setup="office-a",
+        ref=None,
+        command=["pytest"],
+        timings={"resolve": 0.001, "gate": 0.25, "execute": 12.5, "copy": 0.75},
+    )
+    mock_create_container.return_value = MagicMock()
+
+    with patch("bifrost.commands.run.command.Runner", return_value=mock_runner):
+        result = runner.invoke(
+            app, ["run", "--setup", "office-a", "--timings", "--", "pytest"]
+        )
+
+    assert result.exit_code == 0
+    assert "Timings" in result.stdout
+    assert "12.500" in result.stdout
+    assert "13.501" in result.stdout
+    assert "Checkout" not in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_runner_and_pool_share_the_containers_lease_store(
+    mock_create_container: MagicMock,
+) -> None:
+    container = MagicMock()
+    mock_create_container.return_value = container
+    mock_runner = MagicMock()
+    mock_runner.resolve_setups.side_effect = lambda names: names
+    mock_runner.wait_for_setup.return_value.name = "lab-b"
+
+    with (
+        patch(
+            "bifrost.commands.run.command.Runner", return_value=mock_runner
+        ) as mock_runner_class,
+        patch("bifrost.commands.run.command.PoolDispatcher") as mock_dispatcher,
+    ):
+        runner.invoke(app, ["run", "--any", "hil", "--", "pytest"])
+
+    leases = container.get_lease_store.return_value
+    assert mock_runner_class.call_args.kwargs["leases"] is leases
+    assert mock_dispatcher.call_args.args[1] is leases
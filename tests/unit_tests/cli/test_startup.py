@@ -0,0 +1,73 @@
+import inspect
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from bifrost.cli.app import LAZY_COMMANDS, load_command
+
+SRC_DIR = Path(__file__).resolve().parents[3] / "src"
+# Generous enough for slow CI machines; tighten locally with BF_IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = float(os.environ.get("BF_IMPORT_BUDGET_MS", "500"))
+HEAVY_MODULES = [
+    "httpx",
+    "yaml",
+    "bifrost.infra.pipeline_gate",
+    "bifrost.infra.lease",
+    "bifrost.commands.run.command",
+    "bifrost.commands.config",
+    "bifrost.commands.pipeline",
+]
+
+
+def _import_times(*args: str) -> dict[str, int]:
+    """Run `bf *args` under `-X importtime`; map module -> cumulative µs."""
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import sys; from bifrost.cli.app import main; sys.argv[0] = 'bf'; main()",
+            *args,
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    @pytest.mark.parametrize("args", [["--help"], ["--version"]])
+    def test_does_not_import_command_modules(self, args: list[str]) -> None:
+        imported = _import_times(*args)
+
+        assert "bifrost.cli.app" in imported
+        assert [module for module in HEAVY_MODULES if module in imported] == []
+
+    def test_app_import_fits_budget(self) -> None:
+        imported = _import_times("--version")
+
+        assert imported["bifrost.cli.app"] / 1000 < IMPORT_BUDGET_MS
+
+
+class TestLazyCommands:
+    @pytest.mark.parametrize("name", sorted(LAZY_COMMANDS))
+    def test_help_matches_loaded_command(self, name: str) -> None:
+        *_, help_text = LAZY_COMMANDS[name]
+
+        command = load_command(name)
+
+        assert command.name == name
+        assert inspect.cleandoc(command.help or "").splitlines()[0] == help_text
@@ -0,0 +1,107 @@
+"""Tests for the 'stats' command."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from typer.testing import CliRunner
+
+from bifrost.cli.app import app
+from bifrost.infra.log_store import LogStore
+from bifrost.shared import BifrostConfig, LogConfig, SetupConfig
+
+runner = CliRunner()
+
+
+def _setup(name: str) -> SetupConfig:
+    return SetupConfig(
+        name=name,
+        host="10.0.0.1",
+        user="ci",
+        logs=LogConfig(local_log_dir=f".bifrost/{name}"),
+    )
+
+
+def _write_run(
+    root: Path, setup: str, run_id: str, total: float, exit_code: int = 0, age: int = 0
+) -> None:
+    run_dir = root / ".bifrost" / setup / run_id
+    run_dir.mkdir(parents=True)
+    timestamp = datetime.now(timezone.utc) - timedelta(days=age)
+    (run_dir / "run.json").write_text(
+        json.dumps(
+            {
+                "run_id": run_id,
+                "setup": setup,
+                "command": ["pytest"],
+                "timestamp": timestamp.isoformat(),
+                "exit_code": exit_code,
+                "duration_s": total - 1.0,
+                "timings": {"gate": 1.0, "execute": total - 1.0},
+            }
+        )
+    )
+
+
+@patch("bifrost.cli.app.create_container")
+def test_stats_reports_percentiles_and_failures(
+    mock_create_container: MagicMock, tmp_path: Path
+) -> None:
+    for index, total in enumerate([10.0, 20.0, 30.0, 40.0]):
+        _write_run(tmp_path, "lab", f"r{index}", total, exit_code=int(total == 40.0))
+    _write_run(tmp_path, "lab", "old", 500.0, age=60)
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": _setup("lab"), "rig": _setup("rig")}
+    )
+    mock_container.get_log_store.return_value = LogStore(tmp_path)
+    mock_create_container.return_value = mock_container
+
+    result = runner.invoke(app, ["stats", "--phases"], terminal_width=200)
+
+    assert result.exit_code == 0
+    row = next(line for line in result.stdout.splitlines() if "lab" in line)
+    assert " 4 │" in row
+    assert "25%" in row
+    assert "20.0s" in row
+    assert "40.0s" in row
+    assert "8m20s" not in result.stdout
+    assert "Phase times" in result.stdout
+    assert "rig" not in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_stats_trend_fits_a_narrow_terminal(
+    mock_create_container: MagicMock, tmp_path: Path
+) -> None:
+    for age in range(30):
+        _write_run(tmp_path, "lab", f"r{age}", 10.0 + age, age=age)
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": _setup("lab")}
+    )
+    mock_container.get_log_store.return_value = LogStore(tmp_path)
+    mock_create_container.return_value = mock_container
+
+    result = runner.invoke(app, ["stats"], terminal_width=80)
+
+    assert result.exit_code == 0
+    assert "p50 per 3d" in result.stdout
+    # Runs got faster day by day: the trend falls across all ten periods.
+    assert "█▇▆▆▅▄▃▃▂▁" in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_stats_without_runs(mock_create_container: MagicMock, tmp_path: Path) -> None:
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": _setup("lab")}
+    )
+    mock_container.get_log_store.return_value = LogStore(tmp_path)
+    mock_create_container.return_value = mock_container
+
+    result = runner.invoke(app, ["stats", "--days", "7"])
+
+    assert result.exit_code == 0
+    assert "No runs in the last 7 day(s)" in result.stdout
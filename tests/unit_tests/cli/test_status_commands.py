@@ -1,22 +1,32 @@
 """Tests for the 'status' and 'setups' commands parameter parsing."""
 
+import json
+import time
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 from typer.testing import CliRunner
 
 from bifrost.cli.app import app
-from bifrost.shared import BifrostConfig, LogConfig, SetupConfig
+from bifrost.infra.lease import LeaseState
+from bifrost.infra.pipeline_gate import PipelineGateRegistry
+from bifrost.shared import (
+    BifrostConfig,
+    CiConfig,
+    Lease,
+    LogConfig,
+    PipelineConfig,
+    SetupConfig,
+)
 
 runner = CliRunner()
 
 
-@patch("bifrost.commands.status.command.create_pipeline_gate")
 @patch("bifrost.commands.status.command.check_reachable")
 @patch("bifrost.cli.app.create_container")
 def test_status_with_specific_setup_long_option(
     mock_create_container: MagicMock,
     mock_check_reachable: MagicMock,
-    mock_create_pipeline_gate: MagicMock,
 ) -> None:
     setup_config = SetupConfig(
         name="prod",
@@ -30,6 +40,10 @@ def test_status_with_specific_setup_long_option(
     mock_container.get_config.return_value = BifrostConfig(
         setups={"prod": setup_config}, default_setup=None
     )
+    mock_create_pipeline_gate = MagicMock()
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        mock_create_pipeline_gate
+    )
     mock_create_container.return_value = mock_container
     mock_check_reachable.return_value = True
 
@@ -41,16 +55,14 @@ def test_status_with_specific_setup_long_option(
 
     assert result.exit_code == 0
     mock_check_reachable.assert_called_once_with(setup_config)
-    mock_pipeline_gate.is_busy.assert_called_once_with("prod")
+    mock_pipeline_gate.is_busy.assert_called_once_with("prod", CiConfig())
 
 
-@patch("bifrost.commands.status.command.create_pipeline_gate")
 @patch("bifrost.commands.status.command.check_reachable")
 @patch("bifrost.cli.app.create_container")
 def test_status_with_specific_setup_short_option(
     mock_create_container: MagicMock,
     mock_check_reachable: MagicMock,
-    mock_create_pipeline_gate: MagicMock,
 ) -> None:
     setup_config = SetupConfig(
         name="staging",
@@ -64,6 +76,10 @@ def test_status_with_specific_setup_short_option(
     mock_container.get_config.return_value = BifrostConfig(
         setups={"staging": setup_config}, default_setup=None
     )
+    mock_create_pipeline_gate = MagicMock()
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        mock_create_pipeline_gate
+    )
     mock_create_container.return_value = mock_container
     mock_check_reachable.return_value = False
 
@@ -75,16 +91,14 @@ def test_status_with_specific_setup_short_option(
 
     assert result.exit_code == 0
     mock_check_reachable.assert_called_once_with(setup_config)
-    mock_pipeline_gate.is_busy.assert_called_once_with("staging")
+    mock_pipeline_gate.is_busy.assert_called_once_with("staging", CiConfig())
 
 
-@patch("bifrost.commands.status.command.create_pipeline_gate")
 @patch("bifrost.commands.status.command.check_reachable")
 @patch("bifrost.cli.app.create_container")
 def test_status_without_setup_checks_all_setups(
     mock_create_container: MagicMock,
     mock_check_reachable: MagicMock,
-    mock_create_pipeline_gate: MagicMock,
 ) -> None:
     setups = {
         "prod": SetupConfig(
@@ -107,6 +121,10 @@ def test_status_without_setup_checks_all_setups(
     mock_container.get_config.return_value = BifrostConfig(
         setups=setups, default_setup=None
     )
+    mock_create_pipeline_gate = MagicMock()
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        mock_create_pipeline_gate
+    )
     mock_create_container.return_value = mock_container
     mock_check_reachable.return_value = True
 
@@ -118,7 +136,47 @@ def test_status_without_setup_checks_all_setups(
 
     assert result.exit_code == 0
     assert mock_check_reachable.call_count == 2
-    assert mock_pipeline_gate.is_busy.call_count == 2
+    assert mock_pipeline_gate.is_busy.call_count == 1
+
+
+@patch("bifrost.commands.status.command.check_reachable")
+@patch("bifrost.cli.app.create_container")
+def test_status_queries_each_pipeline_once(
+    mock_create_container: MagicMock,
+    mock_check_reachable: MagicMock,
+) -> None:
+    pipelines = {
+        name: PipelineConfig(url="https://gl.test", project_id=i, token_env="TOK")
+        for i, name in enumerate(["shared", "other"])
+    }
+    setups = {
+        f"lab-{i}": SetupConfig(
+            name=f"lab-{i}",
+            host=f"10.0.0.{i}",
+            user="ci",
+            pipeline="other" if i == 0 else "shared",
+        )
+        for i in range(5)
+    }
+
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups=setups, pipelines=pipelines
+    )
+    mock_gates = {config: MagicMock() for config in pipelines.values()}
+    for gate in mock_gates.values():
+        gate.is_busy.return_value = False
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        MagicMock(side_effect=mock_gates.__getitem__)
+    )
+    mock_create_container.return_value = mock_container
+    mock_check_reachable.return_value = True
+
+    result = runner.invoke(app, ["status"])
+
+    assert result.exit_code == 0
+    assert mock_gates[pipelines["shared"]].is_busy.call_count == 1
+    assert mock_gates[pipelines["other"]].is_busy.call_count == 1
 
 
 @patch("bifrost.cli.app.create_container")
@@ -153,3 +211,106 @@ def test_setups_lists_all_configured_setups(mock_create_container: MagicMock) ->
     assert "dev" in result.stdout
     assert "prod.example.com" in result.stdout
     assert "dev.example.com" in result.stdout
+
+
+@patch("bifrost.commands.status.command.check_reachable")
+@patch("bifrost.cli.app.create_container")
+def test_status_shows_lease_holder(
+    mock_create_container: MagicMock,
+    mock_check_reachable: MagicMock,
+) -> None:
+    setup_config = SetupConfig(name="lab", host="lab.example.com", user="ci")
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": setup_config}, default_setup=None
+    )
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        lambda config: MagicMock(is_busy=MagicMock(return_value=False))
+    )
+    mock_container.get_lease_store.return_value.peek.return_value = LeaseState(
+        acquired=False,
+        holder=Lease(
+            owner="alice@dev",
+            run_id="abc123",
+            acquired_at=int(time.time()),
+            expires_at=int(time.time()) + 600,
+        ),
+        queued=2,
+    )
+    mock_create_container.return_value = mock_container
+    mock_check_reachable.return_value = True
+
+    result = runner.invoke(app, ["status"])
+
+    assert result.exit_code == 0
+    assert "alice@dev" in result.stdout
+    assert "+2 waiting" in result.stdout
+
+
+@patch("bifrost.commands.status.command.check_reachable")
+@patch("bifrost.cli.app.create_container")
+def test_status_select_probes_only_matching_setups(
+    mock_create_container: MagicMock,
+    mock_check_reachable: MagicMock,
+) -> None:
+    setups = {
+        name: SetupConfig(name=name, host=f"{name}.example.com", user="ci", labels=lab)
+        for name, lab in [
+            ("ber-1", {"lab": "berlin"}),
+            ("mun-1", {"lab": "munich"}),
+        ]
+    }
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(setups=setups)
+    mock_container.get_gate_registry.return_value = PipelineGateRegistry(
+        lambda config: MagicMock(is_busy=MagicMock(return_value=False))
+    )
+    mock_create_container.return_value = mock_container
+    mock_check_reachable.return_value = False
+
+    result = runner.invoke(app, ["status", "--select", "lab=berlin"])
+
+    assert result.exit_code == 0
+    mock_check_reachable.assert_called_once_with(setups["ber-1"])
+
+
+@patch("bifrost.cli.app.create_container")
+def test_setups_select_lists_matching_setups_with_labels(
+    mock_create_container: MagicMock,
+) -> None:
+    setups = {
+        "ber-1": SetupConfig(
+            name="ber-1", host="h1", user="ci", labels={"lab": "berlin"}
+        ),
+        "mun-1": SetupConfig(
+            name="mun-1", host="h2", user="ci", labels={"lab": "munich"}
+        ),
+    }
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(setups=setups)
+    mock_create_container.return_value = mock_container
+
+    result = runner.invoke(app, ["setups", "--select", "lab=berlin"])
+
+    assert result.exit_code == 0
+    assert "ber-1" in result.stdout
+    assert "lab=berlin" in result.stdout
+    assert "mun-1" not in result.stdout
+
+
+@patch("bifrost.cli.app.create_container")
+def test_trace_option_writes_chrome_trace(
+    mock_create_container: MagicMock, tmp_path: Path
+) -> None:
+    mock_container = MagicMock()
+    mock_container.get_config.return_value = BifrostConfig(
+        setups={"lab": SetupConfig(name="lab", host="10.0.0.1", user="ci")}
+    )
+    mock_create_container.return_value = mock_container
+    trace_file = tmp_path / "trace.json"
+
+    result = runner.invoke(app, ["--trace", str(trace_file), "setups"])
+
+    assert result.exit_code == 0
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    assert [event["name"] for event in events if event["ph"] == "X"] == ["bf setups"]
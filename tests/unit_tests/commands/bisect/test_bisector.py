@@ -0,0 +1,112 @@
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+import pytest
+
+from bifrost.commands.bisect import Bisector
+from bifrost.commands.bisect.bisector import _pick_probes
+from bifrost.shared import ConfigError, RunMetadata, SetupConfig
+
+COMMITS = [f"{i:040x}" for i in range(1, 21)]
+FIRST_BAD = 13
+
+
+@pytest.fixture
+def setups() -> dict[str, SetupConfig]:
+    return {
+        name: SetupConfig(name=name, host=f"10.0.0.{i}", user="ci")
+        for i, name in enumerate(["lab-a", "lab-b", "lab-c"], start=1)
+    }
+
+
+@pytest.fixture
+def runner(setups: dict[str, SetupConfig]) -> MagicMock:
+    def execute(
+        setup: SetupConfig, command: list[str], *, run_id: str, ref: str
+    ) -> RunMetadata:
+        exit_code = 1 if COMMITS.index(ref) >= FIRST_BAD else 0
+        return RunMetadata(
+            run_id=run_id,
+            setup=setup.name,
+            ref=ref,
+            command=command,
+            exit_code=exit_code,
+        )
+
+    runner = MagicMock()
+    runner.resolve_setups.side_effect = lambda names: [
+        setups[name] for name in names or ["lab-a"]
+    ]
+    runner.resolve_command.side_effect = lambda setup, command: command
+    runner.execute.side_effect = execute
+    return runner
+
+
+@pytest.fixture(autouse=True)
+def remote_git(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    list_commits_mock = MagicMock(return_value=COMMITS)
+    monkeypatch.setattr(
+        "bifrost.commands.bisect.bisector.list_commits", list_commits_mock
+    )
+    monkeypatch.setattr("bifrost.commands.bisect.bisector.fetch_all", MagicMock())
+    monkeypatch.setattr(
+        "bifrost.commands.bisect.bisector.shared_connection",
+        MagicMock(side_effect=lambda setup: nullcontext()),
+    )
+    return list_commits_mock
+
+
+class TestBisect:
+    def test_finds_first_bad_commit_on_single_setup(self, runner: MagicMock) -> None:
+        result = Bisector(runner).bisect("good", "bad", command=["pytest"])
+
+        assert result.first_bad == COMMITS[FIRST_BAD]
+        assert all(step.metadata.setup == "lab-a" for step in result.steps)
+
+    def test_parallel_setups_need_fewer_rounds(self, runner: MagicMock) -> None:
+        single = Bisector(runner).bisect("good", "bad", command=["pytest"])
+        parallel = Bisector(runner).bisect(
+            "good", "bad", setup_names=["lab-a", "lab-b", "lab-c"], command=["pytest"]
+        )
+
+        assert parallel.first_bad == COMMITS[FIRST_BAD]
+        assert parallel.rounds < single.rounds
+        assert {step.metadata.setup for step in parallel.steps} == {
+            "lab-a",
+            "lab-b",
+            "lab-c",
+        }
+
+    def test_checks_gate_every_round_unless_forced(self, runner: MagicMock) -> None:
+        result = Bisector(runner).bisect("good", "bad", command=["pytest"])
+        assert runner.check_gate.call_count == result.rounds
+
+        runner.check_gate.reset_mock()
+        Bisector(runner).bisect("good", "bad", command=["pytest"], force=True)
+        runner.check_gate.assert_not_called()
+
+    def test_single_commit_range_needs_no_runs(
+        self, runner: MagicMock, remote_git: MagicMock
+    ) -> None:
+        remote_git.return_value = ["f" * 40]
+
+        result = Bisector(runner).bisect("good", "bad", command=["pytest"])
+
+        assert result.first_bad == "f" * 40
+        runner.execute.assert_not_called()
+
+    def test_raises_for_empty_range(
+        self, runner: MagicMock, remote_git: MagicMock
+    ) -> None:
+        remote_git.return_value = []
+
+        with pytest.raises(ConfigError, match="No commits"):
+            Bisector(runner).bisect("good", "bad", command=["pytest"])
+
+
+class TestPickProbes:
+    def test_spreads_probes_evenly(self) -> None:
+        assert _pick_probes(-1, 19, 3) == [4, 9, 14]
+
+    def test_never_returns_more_probes_than_candidates(self) -> None:
+        assert _pick_probes(3, 6, 5) == [4, 5]
@@ -71,3 +71,31 @@ class TestAddSetup:
         config_manager.write_config.assert_called_once()
         written_config = config_manager.write_config.call_args[0][0]
         assert written_config.setups["test-rig"].port == 2222
+
+
+class TestAddSetupLabels:
+    def test_adds_setup_with_labels(self, mock_container: MagicMock) -> None:
+        result = runner.invoke(
+            config_app,
+            [
+                "add",
+                "test-rig",
+                "--host",
+                "10.0.0.1",
+                "--user",
+                "ci",
+                "--label",
+                "lab=berlin",
+                "--label",
+                "dut=gen3",
+            ],
+            obj=mock_container,
+        )
+
+        assert result.exit_code == 0
+        config_manager = mock_container.get_config_manager.return_value
+        written_config = config_manager.write_config.call_args[0][0]
+        assert written_config.setups["test-rig"].labels == {
+            "lab": "berlin",
+            "dut": "gen3",
+        }
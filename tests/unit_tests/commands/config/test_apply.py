@@ -0,0 +1,111 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from typer.testing import CliRunner
+
+from bifrost.commands.config import config_app
+from bifrost.commands.config.apply import ConfigChanges
+from bifrost.di import Container
+from bifrost.shared import BifrostConfig, ConfigError, ConfigManager, SetupConfig
+
+runner = CliRunner()
+
+CHANGES = """\
+setups:
+  rig-1:
+    host: "10.0.0.1"
+    user: "ci"
+  rig-2:
+    host: "10.0.0.2"
+    user: "ci"
+  old: null
+defaults:
+  setup: rig-1
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path: Path) -> Path:
+    path = tmp_path / "config.yml"
+    path.write_text(
+        "version: 1\ndefaults:\n  setup: old\n"
+        "setups:\n  old:\n    host: h\n    user: u\n  keep:\n    host: h\n    user: u\n"
+    )
+    return path
+
+
+@pytest.fixture
+def mock_container(config_path: Path, monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    monkeypatch.setattr("bifrost.shared.config_manager.USER_CONFIG_DIR", config_path)
+    monkeypatch.chdir(config_path.parent)
+    container = MagicMock(spec=Container)
+    container.get_config_manager.return_value = ConfigManager()
+    return container
+
+
+class TestConfigChanges:
+    def test_adds_replaces_and_removes(self) -> None:
+        config = BifrostConfig(
+            setups={
+                "old": SetupConfig(name="old", host="h", user="u"),
+                "rig-1": SetupConfig(name="rig-1", host="stale", user="u"),
+            },
+            default_setup="old",
+        )
+        changes = ConfigChanges.from_mapping(
+            {"setups": {"rig-1": {"host": "new", "user": "ci"}, "old": None}}
+        )
+
+        result = changes.apply(config)
+
+        assert list(result.setups) == ["rig-1"]
+        assert result.setups["rig-1"].host == "new"
+        assert result.default_setup is None
+
+    def test_rejects_invalid_setup(self) -> None:
+        with pytest.raises(ConfigError, match="must have 'host'"):
+            ConfigChanges.from_mapping({"setups": {"rig": {"user": "ci"}}})
+
+
+class TestApplyCommand:
+    def test_applies_changes_from_file(
+        self, mock_container: MagicMock, config_path: Path, tmp_path: Path
+    ) -> None:
+        changes_file = tmp_path / "changes.yml"
+        changes_file.write_text(CHANGES)
+
+        result = runner.invoke(
+            config_app, ["apply", str(changes_file)], obj=mock_container
+        )
+
+        assert result.exit_code == 0
+        assert "Applied 4 change(s)" in result.stdout
+        config = ConfigManager().read_config(config_path)
+        assert list(config.setups) == ["keep", "rig-1", "rig-2"]
+        assert config.default_setup == "rig-1"
+
+    def test_reads_changes_from_stdin(
+        self, mock_container: MagicMock, config_path: Path
+    ) -> None:
+        result = runner.invoke(
+            config_app, ["apply", "-"], input=CHANGES, obj=mock_container
+        )
+
+        assert result.exit_code == 0
+        assert "rig-2" in ConfigManager().read_config(config_path).setups
+
+    def test_rejects_dangling_default(
+        self, mock_container: MagicMock, config_path: Path
+    ) -> None:
+        before = config_path.read_text()
+
+        result = runner.invoke(
+            config_app,
+            ["apply", "-"],
+            input="defaults:\n  setup: nope\n",
+            obj=mock_container,
+        )
+
+        assert isinstance(result.exception, ConfigError)
+        assert config_path.read_text() == before
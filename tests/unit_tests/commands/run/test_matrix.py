@@ -0,0 +1,201 @@
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+import pytest
+
+from bifrost.commands.run import CiBusyError
+from bifrost.commands.run.matrix import MatrixRunner
+from bifrost.shared import RunMetadata, SetupConfig, SshError
+
+
+@pytest.fixture
+def setups() -> dict[str, SetupConfig]:
+    return {
+        "lab-a": SetupConfig(name="lab-a", host="10.0.0.1", user="ci"),
+        "lab-b": SetupConfig(name="lab-b", host="10.0.0.2", user="ci"),
+    }
+
+
+@pytest.fixture
+def runner(setups: dict[str, SetupConfig]) -> MagicMock:
+    def execute(
+        setup: SetupConfig, command: list[str], *, run_id: str, **kwargs: str
+    ) -> RunMetadata:
+        exit_code = 1 if kwargs.get("ref") == "broken" else 0
+        return RunMetadata(
+            run_id=run_id,
+            setup=setup.name,
+            ref=kwargs.get("ref"),
+            command=command,
+            exit_code=exit_code,
+        )
+
+    runner = MagicMock()
+    runner.resolve_setups.side_effect = lambda names: [setups[n] for n in names]
+    runner.resolve_command.side_effect = lambda setup, command: command
+    runner.execute.side_effect = execute
+    return runner
+
+
+@pytest.fixture
+def git(monkeypatch: pytest.MonkeyPatch) -> dict[str, MagicMock]:
+    mocks = {
+        "fetch_refs": MagicMock(),
+        "resolve_refs": MagicMock(
+            side_effect=lambda setup, refs, latest: [f"sha-{r}" for r in refs]
+        ),
+        "add_worktree": MagicMock(),
+        "remove_worktree": MagicMock(),
+        "shared_connection": MagicMock(side_effect=lambda setup: nullcontext()),
+    }
+    for name, mock in mocks.items():
+        monkeypatch.setattr(f"bifrost.commands.run.matrix.{name}", mock)
+    return mocks
+
+
+class TestMatrixRunner:
+    def test_runs_every_cell_in_its_own_worktree(
+        self,
+        runner: MagicMock,
+        git: dict[str, MagicMock],
+        setups: dict[str, SetupConfig],
+    ) -> None:
+        cells = MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main", "release"], command=["pytest"], latest=True
+        )
+
+        assert [(c.setup, c.ref) for c in cells] == [
+            ("lab-a", "main"),
+            ("lab-a", "release"),
+            ("lab-b", "main"),
+            ("lab-b", "release"),
+        ]
+        assert all(cell.passed for cell in cells)
+        assert git["fetch_refs"].call_count == 2
+        git["fetch_refs"].assert_any_call(setups["lab-a"], ["main", "release"])
+        worktrees = {call.kwargs["workdir"] for call in runner.execute.call_args_list}
+        assert len(worktrees) == 4
+        assert git["remove_worktree"].call_count == 4
+
+    def test_skips_fetch_without_latest(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        MatrixRunner(runner).run(["lab-a"], ["main", "release"], command=["pytest"])
+
+        git["fetch_refs"].assert_not_called()
+        git["resolve_refs"].assert_called_once()
+
+    def test_failed_cell_does_not_stop_others(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        cells = MatrixRunner(runner).run(
+            ["lab-a"], ["broken", "main"], command=["pytest"]
+        )
+
+        assert [cell.passed for cell in cells] == [False, True]
+
+    def test_busy_setup_marks_its_row_as_error(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        def lease(setup: SetupConfig, run_id: str, **kwargs: object) -> MagicMock:
+            if setup.name == "lab-b":
+                raise CiBusyError("busy")
+            return MagicMock()
+
+        runner.lease.side_effect = lease
+
+        cells = MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main"], command=["pytest"]
+        )
+
+        assert cells[0].passed
+        assert cells[1].error == "busy"
+
+    def test_worktree_failure_is_reported_per_cell(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        git["add_worktree"].side_effect = SshError("disk full")
+
+        cells = MatrixRunner(runner).run(["lab-a"], ["main"], command=["pytest"])
+
+        assert cells[0].error == "disk full"
+        runner.execute.assert_not_called()
+
+    def test_failed_worktree_cleanup_keeps_the_cells_result(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        git["remove_worktree"].side_effect = SshError("busy")
+
+        cells = MatrixRunner(runner).run(["lab-a"], ["main"], command=["pytest"])
+
+        assert cells[0].passed
+        assert cells[0].metadata is not None
+
+    def test_failed_worktree_cleanup_keeps_the_commands_error(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        runner.execute.side_effect = SshError("timed out")
+        git["remove_worktree"].side_effect = SshError("busy")
+
+        cells = MatrixRunner(runner).run(["lab-a"], ["main"], command=["pytest"])
+
+        assert cells[0].error == "timed out"
+
+    def test_dry_run_plans_cells_without_executing(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        cells = MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main"], command=["pytest"], dry_run=True
+        )
+
+        assert len(cells) == 2
+        runner.execute.assert_not_called()
+        runner.lease.assert_not_called()
+        git["resolve_refs"].assert_not_called()
+
+    def test_dry_run_checks_each_rows_gate(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        def check_gate(setup: SetupConfig) -> None:
+            if setup.name == "lab-b":
+                raise CiBusyError("busy")
+
+        runner.check_gate.side_effect = check_gate
+
+        cells = MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main", "dev"], command=["pytest"], dry_run=True
+        )
+
+        assert [cell.error for cell in cells] == [None, None, "busy", "busy"]
+        assert runner.check_gate.call_count == 2
+        runner.wait_for_setup.assert_not_called()
+
+    def test_dry_run_waits_for_each_row_with_wait_timeout(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main"], dry_run=True, wait_timeout=60
+        )
+
+        assert runner.wait_for_setup.call_count == 2
+        runner.check_gate.assert_not_called()
+
+    def test_forced_dry_run_skips_the_gate(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        MatrixRunner(runner).run(["lab-a", "lab-b"], ["main"], dry_run=True, force=True)
+
+        runner.check_gate.assert_not_called()
+        runner.wait_for_setup.assert_not_called()
+
+    def test_leases_each_setup_with_wait_timeout(
+        self, runner: MagicMock, git: dict[str, MagicMock]
+    ) -> None:
+        cells = MatrixRunner(runner).run(
+            ["lab-a", "lab-b"], ["main"], command=["pytest"], wait_timeout=60
+        )
+
+        assert all(cell.passed for cell in cells)
+        assert runner.lease.call_count == 2
+        for call in runner.lease.call_args_list:
+            assert call.kwargs == {"check_gate": True, "wait_timeout": 60}
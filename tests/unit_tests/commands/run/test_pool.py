@@ -0,0 +1,159 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from bifrost.commands.run.pool import DEFAULT_RUN_DURATION, PoolDispatcher
+from bifrost.infra.lease import LeaseState
+from bifrost.shared import Lease, PipelineGateError, SetupConfig
+
+LAB_A = SetupConfig(name="lab-a", host="10.0.0.1", user="ci", pools=("hil",))
+LAB_B = SetupConfig(name="lab-b", host="10.0.0.2", user="ci", pools=("hil",))
+LAB_C = SetupConfig(name="lab-c", host="10.0.0.3", user="ci", pools=("hil",))
+
+
+def _held(minutes_ago: float, queued: int = 0) -> LeaseState:
+    acquired_at = int(time.time() - minutes_ago * 60)
+    return LeaseState(
+        acquired=False,
+        holder=Lease(
+            owner="bob@dev",
+            run_id="xyz",
+            acquired_at=acquired_at,
+            expires_at=acquired_at + 3600,
+        ),
+        queued=queued,
+    )
+
+
+@pytest.fixture
+def runner() -> MagicMock:
+    runner = MagicMock()
+    runner.resolve_pool.return_value = [LAB_A, LAB_B, LAB_C]
+    runner.is_busy.return_value = False
+    return runner
+
+
+@pytest.fixture
+def leases() -> MagicMock:
+    leases = MagicMock()
+    leases.peek.return_value = LeaseState(acquired=False)
+    return leases
+
+
+@pytest.fixture
+def log_store() -> MagicMock:
+    log_store = MagicMock()
+    log_store.recent_durations.return_value = [600.0, 600.0, 1200.0]
+    return log_store
+
+
+@pytest.fixture
+def probes(monkeypatch: pytest.MonkeyPatch) -> dict[str, MagicMock]:
+    mocks = {
+        "check_reachable": MagicMock(return_value=True),
+        "read_load": MagicMock(return_value=0.5),
+    }
+    for name, mock in mocks.items():
+        monkeypatch.setattr(f"bifrost.commands.run.pool.{name}", mock)
+    return mocks
+
+
+@pytest.fixture
+def dispatcher(
+    runner: MagicMock, leases: MagicMock, log_store: MagicMock
+) -> PoolDispatcher:
+    return PoolDispatcher(runner, leases, log_store)
+
+
+class TestPoolDispatcher:
+    def test_picks_first_idle_member(
+        self,
+        dispatcher: PoolDispatcher,
+        leases: MagicMock,
+        probes: dict[str, MagicMock],
+    ) -> None:
+        leases.peek.side_effect = lambda setup: (
+            _held(1) if setup is LAB_A else LeaseState(acquired=False)
+        )
+
+        chosen = dispatcher.choose(dispatcher.probe("hil"))
+
+        assert chosen is not None
+        assert chosen.setup is LAB_B
+        assert chosen.is_idle
+        probes["read_load"].assert_not_called()
+
+    def test_prefers_least_loaded_idle_member_with_load(
+        self, dispatcher: PoolDispatcher, probes: dict[str, MagicMock]
+    ) -> None:
+        loads = {"lab-a": 0.9, "lab-b": 0.7, "lab-c": 0.1}
+        probes["read_load"].side_effect = lambda setup: loads[setup.name]
+
+        chosen = dispatcher.choose(dispatcher.probe("hil", check_load=True))
+
+        assert chosen is not None
+        assert chosen.setup is LAB_C
+
+    def test_picks_lowest_expected_wait_when_none_idle(
+        self,
+        dispatcher: PoolDispatcher,
+        runner: MagicMock,
+        leases: MagicMock,
+        probes: dict[str, MagicMock],
+    ) -> None:
+        runner.is_busy.side_effect = lambda setup: setup is LAB_C
+        leases.peek.side_effect = lambda setup: {
+            "lab-a": _held(minutes_ago=2),
+            "lab-b": _held(minutes_ago=8),
+            "lab-c": LeaseState(acquired=False),
+        }[setup.name]
+
+        candidates = dispatcher.probe("hil")
+        chosen = dispatcher.choose(candidates)
+
+        assert chosen is not None
+        assert chosen.setup is LAB_B
+        # Typical run is the 600s median; lab-b's holder is 480s in.
+        assert chosen.expected_wait == pytest.approx(120, abs=5)
+        assert candidates[2].expected_wait == 600
+
+    def test_counts_queued_runs(
+        self,
+        dispatcher: PoolDispatcher,
+        leases: MagicMock,
+        probes: dict[str, MagicMock],
+    ) -> None:
+        leases.peek.return_value = LeaseState(acquired=False, queued=2)
+
+        candidates = dispatcher.probe("hil")
+
+        assert candidates[0].expected_wait == 1200
+
+    def test_assumes_default_duration_without_history(
+        self,
+        dispatcher: PoolDispatcher,
+        runner: MagicMock,
+        log_store: MagicMock,
+        probes: dict[str, MagicMock],
+    ) -> None:
+        runner.is_busy.return_value = True
+        log_store.recent_durations.return_value = []
+
+        candidates = dispatcher.probe("hil")
+
+        assert candidates[0].expected_wait == DEFAULT_RUN_DURATION
+
+    def test_skips_unreachable_and_failing_members(
+        self,
+        dispatcher: PoolDispatcher,
+        runner: MagicMock,
+        probes: dict[str, MagicMock],
+    ) -> None:
+        probes["check_reachable"].side_effect = lambda setup: setup is not LAB_A
+        runner.is_busy.side_effect = PipelineGateError("HTTP 502")
+
+        candidates = dispatcher.probe("hil")
+
+        assert not candidates[0].reachable
+        assert dispatcher.choose(candidates) is None
@@ -1,10 +1,21 @@
 import subprocess
+from dataclasses import replace
 from unittest.mock import MagicMock
 
 import pytest
 
 from bifrost.commands.run import CiBusyError, RemoteCommandError, Runner
-from bifrost.shared import BifrostConfig, ConfigError, SetupConfig
+from bifrost.infra.detached import DetachedRun
+from bifrost.infra.lease import LeaseState
+from bifrost.shared import (
+    BifrostConfig,
+    ConfigError,
+    Lease,
+    LeaseHeldError,
+    RunMetadata,
+    SetupConfig,
+    SshError,
+)
 
 
 @pytest.fixture
@@ -26,10 +37,18 @@ def config(setup_a: SetupConfig, setup_b: SetupConfig) -> BifrostConfig:
 
 
 @pytest.fixture
-def pipeline_gate() -> MagicMock:
-    gate = MagicMock()
-    gate.is_busy.return_value = False
-    return gate
+def gates() -> MagicMock:
+    registry = MagicMock()
+    registry.is_busy.return_value = False
+    return registry
+
+
+@pytest.fixture
+def leases() -> MagicMock:
+    store = MagicMock()
+    store.try_acquire.return_value = LeaseState(acquired=True)
+    store.peek.return_value = LeaseState(acquired=False)
+    return store
 
 
 @pytest.fixture
@@ -40,10 +59,18 @@ def log_store() -> MagicMock:
     return store
 
 
+@pytest.fixture
+def log_queue() -> MagicMock:
+    return MagicMock()
+
+
 @pytest.fixture
 def runner(
     config: BifrostConfig,
     log_store: MagicMock,
+    gates: MagicMock,
+    leases: MagicMock,
+    log_queue: MagicMock,
     monkeypatch: pytest.MonkeyPatch,
 ) -> Runner:
     run_remote_mock = MagicMock(
@@ -52,19 +79,13 @@ def runner(
         )
     )
     fetch_checkout_mock = MagicMock()
-    pipeline_gate_mock = MagicMock(
-        return_value=MagicMock(is_busy=MagicMock(return_value=False))
-    )
 
     monkeypatch.setattr("bifrost.commands.run.runner.run_remote", run_remote_mock)
     monkeypatch.setattr(
         "bifrost.commands.run.runner.fetch_and_checkout", fetch_checkout_mock
     )
-    monkeypatch.setattr(
-        "bifrost.commands.run.runner.create_pipeline_gate", pipeline_gate_mock
-    )
 
-    return Runner(config, log_store)
+    return Runner(config, log_store, gates, leases, log_queue)
 
 
 class TestResolveSetup:
@@ -80,7 +101,7 @@ class TestResolveSetup:
         self, config: BifrostConfig, log_store: MagicMock
     ) -> None:
         config_no_default = BifrostConfig(setups=config.setups)
-        r = Runner(config_no_default, log_store)
+        r = Runner(config_no_default, log_store, leases=MagicMock())
 
         with pytest.raises(ConfigError, match="No setup specified"):
             r.resolve_setup(None)
@@ -89,6 +110,10 @@ class TestResolveSetup:
         with pytest.raises(ConfigError, match="not found"):
             runner.resolve_setup("nonexistent")
 
+    def test_raises_when_selector_matches_nothing(self, runner: Runner) -> None:
+        with pytest.raises(ConfigError, match="No setups match"):
+            runner.resolve_selector("lab=berlin")
+
 
 class TestRun:
     def test_successful_run_with_command(
@@ -118,31 +143,145 @@ class TestRun:
         with pytest.raises(ConfigError, match="No command provided"):
             runner.run(setup_name="office-b")
 
-    def test_checks_pipeline_gate(
-        self, runner: Runner, monkeypatch: pytest.MonkeyPatch
+    def test_checks_pipeline_gate(self, runner: Runner, gates: MagicMock) -> None:
+        gates.is_busy.return_value = True
+
+        with pytest.raises(CiBusyError, match="busy"):
+            runner.run(setup_name="office-a", command=["pytest"])
+
+    def test_force_skips_pipeline_gate(self, runner: Runner, gates: MagicMock) -> None:
+        gates.is_busy.return_value = True
+
+        meta = runner.run(setup_name="office-a", command=["pytest"], force=True)
+
+        assert meta.exit_code == 0
+        gates.is_busy.assert_not_called()
+
+    def test_waits_for_busy_setup_with_wait_timeout(
+        self, runner: Runner, gates: MagicMock, monkeypatch: pytest.MonkeyPatch
     ) -> None:
-        busy_gate = MagicMock(is_busy=MagicMock(return_value=True))
-        monkeypatch.setattr(
-            "bifrost.commands.run.runner.create_pipeline_gate",
-            MagicMock(return_value=busy_gate),
+        gates.is_busy.side_effect = [True, False]
+        monkeypatch.setattr("bifrost.commands.run.waiter.time.sleep", MagicMock())
+
+        meta = runner.run(setup_name="office-a", command=["pytest"], wait_timeout=60)
+
+        assert meta.exit_code == 0
+        assert gates.is_busy.call_count == 2
+        gates.forget.assert_called_once()
+
+    def test_refreshes_queue_ticket_while_gate_is_busy(
+        self,
+        runner: Runner,
+        gates: MagicMock,
+        leases: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        gates.is_busy.side_effect = [True, True, False]
+        leases.try_acquire.side_effect = [
+            LeaseState(acquired=False, queued=1),
+            LeaseState(acquired=True),
+            LeaseState(acquired=True),
+        ]
+        monkeypatch.setattr("bifrost.commands.run.waiter.time.sleep", MagicMock())
+
+        meta = runner.run(setup_name="office-a", command=["pytest"], wait_timeout=600)
+
+        assert meta.exit_code == 0
+        assert leases.try_acquire.call_count == 3
+        leases.renew.assert_called_once_with(
+            runner.resolve_setup("office-a"), meta.run_id
         )
 
-        with pytest.raises(CiBusyError, match="busy"):
+    def test_holds_lease_until_logs_are_copied(
+        self, runner: Runner, leases: MagicMock, log_store: MagicMock
+    ) -> None:
+        manager = MagicMock()
+        manager.attach_mock(leases, "leases")
+        manager.attach_mock(log_store, "log_store")
+
+        meta = runner.run(setup_name="office-a", command=["pytest"])
+
+        names = [name for name, _, _ in manager.mock_calls]
+        assert names.index("leases.try_acquire") < names.index("log_store.copy_logs")
+        assert names[-1] == "leases.release"
+        leases.release.assert_called_once_with(
+            runner.resolve_setup("office-a"), meta.run_id
+        )
+
+    def test_background_logs_are_queued_not_copied_under_the_lease(
+        self,
+        runner: Runner,
+        leases: MagicMock,
+        log_store: MagicMock,
+        log_queue: MagicMock,
+    ) -> None:
+        manager = MagicMock()
+        manager.attach_mock(leases, "leases")
+        manager.attach_mock(log_queue, "log_queue")
+
+        meta = runner.run(
+            setup_name="office-a", command=["pytest"], background_logs=True
+        )
+
+        setup = runner.resolve_setup("office-a")
+        log_store.store_run_metadata.assert_not_called()
+        log_store.copy_logs.assert_not_called()
+        log_store.write_local_metadata.assert_called_once_with(setup, meta)
+        log_queue.enqueue.assert_called_once_with(setup, meta, log_store.project_root)
+        names = [name for name, _, _ in manager.mock_calls]
+        assert names == [
+            "leases.try_acquire",
+            "leases.keep_alive",
+            "leases.keep_alive().__enter__",
+            "log_queue.enqueue",
+            "log_queue.start_worker",
+            "leases.keep_alive().__exit__",
+            "leases.release",
+        ]
+        assert meta.log_paths == []
+        assert "copy" not in meta.timings
+
+    def test_raises_when_lease_is_held(
+        self, runner: Runner, leases: MagicMock, log_store: MagicMock
+    ) -> None:
+        leases.try_acquire.return_value = LeaseState(
+            acquired=False,
+            holder=Lease(owner="bob@lab", run_id="xyz", acquired_at=0, expires_at=0),
+        )
+
+        with pytest.raises(LeaseHeldError, match="leased by bob@lab"):
             runner.run(setup_name="office-a", command=["pytest"])
 
-    def test_force_skips_pipeline_gate(
-        self, runner: Runner, monkeypatch: pytest.MonkeyPatch
+        log_store.store_run_metadata.assert_not_called()
+        leases.release.assert_called_once()
+
+    def test_waits_in_queue_for_held_lease(
+        self, runner: Runner, leases: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        leases.try_acquire.side_effect = [
+            LeaseState(acquired=False, queued=1),
+            SshError("connection reset"),
+            LeaseState(acquired=True),
+        ]
+        monkeypatch.setattr("bifrost.commands.run.waiter.time.sleep", MagicMock())
+
+        meta = runner.run(setup_name="office-a", command=["pytest"], wait_timeout=600)
+
+        assert meta.exit_code == 0
+        assert all(c.kwargs["queue"] for c in leases.try_acquire.call_args_list)
+
+    def test_releases_lease_when_command_fails(
+        self, runner: Runner, leases: MagicMock, monkeypatch: pytest.MonkeyPatch
     ) -> None:
-        busy_gate = MagicMock(is_busy=MagicMock(return_value=True))
-        create_gate_mock = MagicMock(return_value=busy_gate)
         monkeypatch.setattr(
-            "bifrost.commands.run.runner.create_pipeline_gate", create_gate_mock
+            "bifrost.commands.run.runner.run_remote",
+            MagicMock(side_effect=SshError("timed out")),
         )
 
-        meta = runner.run(setup_name="office-a", command=["pytest"], force=True)
+        with pytest.raises(SshError):
+            runner.run(setup_name="office-a", command=["pytest"])
 
-        assert meta.exit_code == 0
-        busy_gate.is_busy.assert_not_called()
+        leases.release.assert_called_once()
 
     def test_dry_run_does_not_execute(
         self, runner: Runner, log_store: MagicMock, monkeypatch: pytest.MonkeyPatch
@@ -191,8 +330,113 @@ class TestRun:
 
         monkeypatch.setattr("bifrost.commands.run.runner.run_remote", run_remote_mock)
 
-        with pytest.raises(RemoteCommandError, match="Command failed"):
+        with pytest.raises(RemoteCommandError, match="Command failed") as exc_info:
             runner.run(setup_name="office-a", command=["pytest"])
 
         log_store.store_run_metadata.assert_called_once()
         log_store.copy_logs.assert_called_once()
+        assert exc_info.value.metadata is not None
+        assert exc_info.value.metadata.exit_code == 1
+
+    def test_records_phase_timings(self, runner: Runner, log_store: MagicMock) -> None:
+        meta = runner.run(setup_name="office-a", command=["pytest"], ref="main")
+
+        assert list(meta.timings) == [
+            "resolve",
+            "gate",
+            "checkout",
+            "execute",
+            "store",
+            "copy",
+        ]
+        assert all(seconds >= 0 for seconds in meta.timings.values())
+        stored = log_store.store_run_metadata.call_args.args[1]
+        assert list(stored.timings) == ["resolve", "gate", "checkout", "execute"]
+        log_store.write_local_metadata.assert_called_once_with(
+            runner.resolve_setup("office-a"), meta
+        )
+
+    def test_dry_run_records_resolve_and_gate(self, runner: Runner) -> None:
+        meta = runner.run(setup_name="office-a", dry_run=True)
+
+        assert list(meta.timings) == ["resolve", "gate"]
+
+
+class TestExecute:
+    def test_reports_remote_failure_without_raising(
+        self,
+        runner: Runner,
+        setup_a: SetupConfig,
+        log_store: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        run_remote_mock = MagicMock(
+            return_value=subprocess.CompletedProcess(
+                args=[], returncode=3, stdout="", stderr="fail"
+            )
+        )
+        monkeypatch.setattr("bifrost.commands.run.runner.run_remote", run_remote_mock)
+        log_store.copy_logs.return_value = [".bifrost/office-a/abc/run.json"]
+
+        meta = runner.execute(setup_a, ["pytest"], run_id="abc")
+
+        assert meta.exit_code == 3
+        assert meta.log_paths == [".bifrost/office-a/abc/run.json"]
+        log_store.store_run_metadata.assert_called_once()
+
+
+class TestDetach:
+    def test_hands_the_lease_to_the_launched_run(
+        self,
+        runner: Runner,
+        leases: MagicMock,
+        log_store: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        launch = MagicMock()
+        monkeypatch.setattr("bifrost.commands.run.runner.launch_detached", launch)
+
+        meta = runner.detach(setup_name="office-a", command=["pytest"])
+
+        setup = runner.resolve_setup("office-a")
+        launch.assert_called_once_with(
+            setup,
+            meta,
+            ttl=leases.ttl,
+            renew_interval=leases.renew_interval,
+        )
+        leases.try_acquire.assert_called_once_with(setup, meta.run_id)
+        leases.release.assert_not_called()
+        log_store.write_detached_metadata.assert_called_once_with(setup, meta)
+
+    def test_releases_the_lease_if_launching_fails(
+        self, runner: Runner, leases: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            "bifrost.commands.run.runner.launch_detached",
+            MagicMock(side_effect=SshError("unreachable")),
+        )
+
+        with pytest.raises(SshError):
+            runner.detach(setup_name="office-a", command=["pytest"])
+
+        leases.release.assert_called_once()
+
+    def test_finish_stores_and_copies_once(
+        self, runner: Runner, setup_a: SetupConfig, log_store: MagicMock
+    ) -> None:
+        metadata = RunMetadata(
+            run_id="abc", setup="office-a", ref=None, command=["pytest"], exit_code=2
+        )
+        log_store.read_local_metadata.return_value = None
+        log_store.copy_logs.return_value = [".bifrost/office-a/abc/output.log"]
+
+        meta = runner.finish_detached(setup_a, DetachedRun(metadata, "exited"))
+
+        assert meta == replace(metadata, log_paths=log_store.copy_logs.return_value)
+        log_store.store_run_metadata.assert_called_once_with(setup_a, metadata)
+        log_store.write_local_metadata.assert_called_once_with(setup_a, meta)
+
+        log_store.read_local_metadata.return_value = meta
+        assert runner.finish_detached(setup_a, DetachedRun(metadata, "exited")) == meta
+        log_store.copy_logs.assert_called_once()
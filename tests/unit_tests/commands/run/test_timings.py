@@ -0,0 +1,52 @@
+from collections.abc import Callable
+from itertools import count
+
+from bifrost.commands.run.timings import PhaseTimer
+
+
+def _clock(step: float = 0.5) -> Callable[[], float]:
+    ticks = count()
+    return lambda: next(ticks) * step
+
+
+class TestPhaseTimer:
+    def test_times_each_phase(self) -> None:
+        timer = PhaseTimer(clock=_clock())
+
+        with timer.phase("gate"):
+            pass
+        with timer.phase("execute"):
+            pass
+
+        assert timer.timings == {"gate": 0.5, "execute": 0.5}
+
+    def test_repeated_phase_accumulates(self) -> None:
+        timer = PhaseTimer(clock=_clock())
+
+        for _ in range(3):
+            with timer.phase("copy"):
+                pass
+
+        assert timer.timings == {"copy": 1.5}
+
+    def test_phase_is_timed_when_it_raises(self) -> None:
+        timer = PhaseTimer(clock=_clock())
+
+        try:
+            with timer.phase("checkout"):
+                raise RuntimeError("fetch failed")
+        except RuntimeError:
+            pass
+
+        assert timer.timings == {"checkout": 0.5}
+
+    def test_timings_are_in_phase_order_and_rounded(self) -> None:
+        timer = PhaseTimer(clock=_clock(step=0.00012345))
+
+        with timer.phase("copy"):
+            pass
+        with timer.phase("resolve"):
+            pass
+
+        assert list(timer.timings) == ["resolve", "copy"]
+        assert timer.timings["copy"] == 0.0
@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from bifrost.commands.run import CiBusyError
+from bifrost.commands.run.waiter import (
+    INITIAL_POLL_INTERVAL,
+    JITTER,
+    MAX_POLL_INTERVAL,
+    SetupWaiter,
+    WaitStatus,
+)
+from bifrost.shared import PipelineGateError, SetupConfig
+
+LAB_A = SetupConfig(name="lab-a", host="10.0.0.1", user="ci")
+LAB_B = SetupConfig(name="lab-b", host="10.0.0.2", user="ci")
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _busy_until(free_at: dict[str, float], clock: FakeClock) -> MagicMock:
+    return MagicMock(side_effect=lambda setup: clock.now < free_at[setup.name])
+
+
+class TestSetupWaiter:
+    def test_returns_immediately_when_free(self) -> None:
+        clock = FakeClock()
+        on_status = MagicMock()
+        waiter = SetupWaiter(
+            MagicMock(return_value=False),
+            timeout=60,
+            on_status=on_status,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        assert waiter.wait([LAB_A]) == LAB_A
+        assert clock.sleeps == []
+        on_status.assert_not_called()
+
+    def test_polls_until_setup_frees_up(self) -> None:
+        clock = FakeClock()
+        refresh = MagicMock()
+        statuses: list[WaitStatus] = []
+        waiter = SetupWaiter(
+            _busy_until({"lab-a": 30}, clock),
+            timeout=600,
+            refresh=refresh,
+            on_status=statuses.append,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        assert waiter.wait([LAB_A]) == LAB_A
+        assert clock.now >= 30
+        assert statuses[0].busy == ["lab-a"]
+        assert refresh.call_count == len(clock.sleeps)
+
+    def test_backs_off_with_jitter_up_to_the_cap(self) -> None:
+        clock = FakeClock()
+        waiter = SetupWaiter(
+            _busy_until({"lab-a": 3600}, clock),
+            timeout=7200,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        waiter.wait([LAB_A])
+
+        first, second = clock.sleeps[:2]
+        assert first >= INITIAL_POLL_INTERVAL * (1 - JITTER)
+        assert first <= INITIAL_POLL_INTERVAL * (1 + JITTER)
+        assert second > INITIAL_POLL_INTERVAL * (1 + JITTER)
+        assert max(clock.sleeps) <= MAX_POLL_INTERVAL * (1 + JITTER)
+
+    def test_starts_on_first_setup_to_free_up(self) -> None:
+        clock = FakeClock()
+        waiter = SetupWaiter(
+            _busy_until({"lab-a": 1000, "lab-b": 20}, clock),
+            timeout=600,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        assert waiter.wait([LAB_A, LAB_B]) == LAB_B
+
+    def test_raises_after_deadline(self) -> None:
+        clock = FakeClock()
+        waiter = SetupWaiter(
+            MagicMock(return_value=True), timeout=45, sleep=clock.sleep, clock=clock
+        )
+
+        with pytest.raises(CiBusyError, match="'lab-a' still busy"):
+            waiter.wait([LAB_A])
+        assert clock.now == pytest.approx(45)
+
+    def test_gate_errors_count_as_busy(self) -> None:
+        clock = FakeClock()
+        statuses: list[WaitStatus] = []
+        is_busy = MagicMock(side_effect=[PipelineGateError("HTTP 502"), False])
+        waiter = SetupWaiter(
+            is_busy,
+            timeout=600,
+            on_status=statuses.append,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        assert waiter.wait([LAB_A]) == LAB_A
+        assert statuses[0].errors == {"lab-a": "HTTP 502"}
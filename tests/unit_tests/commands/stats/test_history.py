@@ -0,0 +1,147 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from bifrost.commands.stats.history import RunHistory, RunRecord, percentile
+
+
+def write_run(
+    log_dir: Path,
+    run_id: str,
+    *,
+    exit_code: int = 0,
+    timings: dict[str, float] | None = None,
+    log_bytes: int = 0,
+) -> Path:
+    run_dir = log_dir / run_id
+    run_dir.mkdir(parents=True)
+    run_file = run_dir / "run.json"
+    run_file.write_text(
+        json.dumps(
+            {
+                "run_id": run_id,
+                "setup": "lab",
+                "ref": None,
+                "command": ["pytest", "-x"],
+                "timestamp": "2026-10-01T12:00:00+00:00",
+                "exit_code": exit_code,
+                "log_paths": [],
+                "duration_s": 2.0,
+                "timings": timings or {},
+            }
+        )
+    )
+    if log_bytes:
+        (run_dir / "out.log").write_bytes(b"x" * log_bytes)
+    return run_file
+
+
+class TestRunRecord:
+    def test_reads_run_file(self, tmp_path: Path) -> None:
+        run_file = write_run(
+            tmp_path,
+            "r1",
+            exit_code=1,
+            timings={"execute": 2.0, "copy": 0.5},
+            log_bytes=1000,
+        )
+
+        record = RunRecord.from_run_file(run_file)
+
+        assert record is not None
+        assert record.command == "pytest -x"
+        assert record.timestamp == datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+        assert record.failed
+        assert record.total_s == 2.5
+        assert record.throughput == 2000
+
+    def test_falls_back_to_duration_without_timings(self, tmp_path: Path) -> None:
+        record = RunRecord.from_run_file(write_run(tmp_path, "r1"))
+
+        assert record is not None
+        assert record.total_s == 2.0
+        assert record.throughput is None
+
+    def test_malformed_run_file_is_skipped(self, tmp_path: Path) -> None:
+        run_file = tmp_path / "r1" / "run.json"
+        run_file.parent.mkdir()
+        run_file.write_text('{"run_id": "r1"}')
+
+        assert RunRecord.from_run_file(run_file) is None
+
+
+class TestRunHistory:
+    def test_rescan_parses_only_new_and_changed_runs(self, tmp_path: Path) -> None:
+        write_run(tmp_path, "r1")
+        changed = write_run(tmp_path, "r2")
+        assert len(RunHistory().load(tmp_path)) == 2
+
+        changed.write_text(
+            changed.read_text().replace('"exit_code": 0', '"exit_code": 137')
+        )
+        write_run(tmp_path, "r3")
+        with patch.object(
+            RunRecord, "from_run_file", wraps=RunRecord.from_run_file
+        ) as parse:
+            records = RunHistory().load(tmp_path)
+
+        assert sorted(call.args[0].parent.name for call in parse.call_args_list) == [
+            "r2",
+            "r3",
+        ]
+        assert [record.exit_code for record in records] == [0, 137, 0]
+
+    def test_forgets_deleted_runs(self, tmp_path: Path) -> None:
+        write_run(tmp_path, "r1")
+        gone = write_run(tmp_path, "r2")
+        RunHistory().load(tmp_path)
+
+        gone.unlink()
+
+        assert [record.run_id for record in RunHistory().load(tmp_path)] == ["r1"]
+
+    @pytest.mark.parametrize(
+        "runs",
+        [
+            [],
+            {"r1": "garbage"},
+            {"r1": {"stamp": None}},
+            {"r1": {"record": {}}},
+        ],
+    )
+    def test_damaged_cache_entries_are_parsed_again(
+        self, tmp_path: Path, runs: object
+    ) -> None:
+        write_run(tmp_path / "logs", "r1")
+        RunHistory().load(tmp_path / "logs")
+        cache_file = next((tmp_path / "cache").rglob("stats/*.json"))
+        cache_file.write_text(json.dumps({"format": 1, "runs": runs}))
+
+        records = RunHistory().load(tmp_path / "logs")
+
+        assert [record.run_id for record in records] == ["r1"]
+
+    def test_damaged_cached_record_is_parsed_again(self, tmp_path: Path) -> None:
+        write_run(tmp_path / "logs", "r1")
+        RunHistory().load(tmp_path / "logs")
+        cache_file = next((tmp_path / "cache").rglob("stats/*.json"))
+        cached = json.loads(cache_file.read_text())
+        cached["runs"]["r1"]["record"]["timings"] = "garbage"
+        cache_file.write_text(json.dumps(cached))
+
+        records = RunHistory().load(tmp_path / "logs")
+
+        assert records[0].timings == {}
+
+    def test_missing_directory_has_no_runs(self, tmp_path: Path) -> None:
+        assert RunHistory().load(tmp_path / "missing") == []
+
+
+@pytest.mark.parametrize(
+    ("fraction", "expected"), [(0.5, 5.0), (0.95, 10.0), (0.0, 1.0)]
+)
+def test_percentile_uses_nearest_rank(fraction: float, expected: float) -> None:
+    assert percentile([float(v) for v in range(10, 0, -1)], fraction) == expected
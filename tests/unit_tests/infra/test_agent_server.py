@@ -0,0 +1,69 @@
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+from bifrost.infra.agent_server import FRAME_PREFIX, Server, pack_frame
+
+
+def _serve(*requests: bytes) -> list[tuple[dict[str, Any], bytes]]:
+    output = io.BytesIO()
+    Server(io.BytesIO(b"".join(requests)), output).serve()
+
+    frames = []
+    stream = io.BytesIO(output.getvalue())
+    while prefix := stream.read(FRAME_PREFIX.size):
+        header = json.loads(stream.read(FRAME_PREFIX.unpack(prefix)[0]))
+        frames.append((header, stream.read(header.get("size", 0))))
+    return frames
+
+
+def test_exec_streams_output_and_exit_code() -> None:
+    frames = _serve(
+        pack_frame({"id": 1, "op": "exec", "command": "echo out; echo err >&2; exit 3"})
+    )
+
+    output = {kind: b"" for kind in ("stdout", "stderr")}
+    for header, data in frames[:-1]:
+        output[header["type"]] += data
+    assert output == {"stdout": b"out\n", "stderr": b"err\n"}
+    assert frames[-1][0] == {"type": "exit", "code": 3, "id": 1}
+
+
+def test_write_then_manifest_and_read(tmp_path: Path) -> None:
+    path = tmp_path / "logs/run1/run.json"
+
+    frames = _serve(
+        pack_frame({"id": 1, "op": "write", "path": str(path)}, b"{}"),
+        pack_frame({"id": 2, "op": "manifest", "path": str(tmp_path / "logs")}),
+        pack_frame(
+            {
+                "id": 3,
+                "op": "read",
+                "root": str(tmp_path),
+                "paths": ["logs/run1/run.json"],
+            }
+        ),
+    )
+
+    assert path.read_bytes() == b"{}"
+    assert frames[0][0] == {"type": "ok", "id": 1}
+    manifest = frames[1][0]
+    assert manifest["files"] == [["run1/run.json", 2, path.stat().st_mtime_ns]]
+    assert [header["type"] for header, _ in frames[2:]] == ["file", "data", "end"]
+    assert frames[3][1] == b"{}"
+
+
+def test_errors_are_reported_per_request(tmp_path: Path) -> None:
+    frames = _serve(
+        pack_frame({"id": 1, "op": "manifest", "path": str(tmp_path / "missing")}),
+        pack_frame({"id": 2, "op": "reboot"}),
+        pack_frame({"id": 3, "op": "stat", "path": str(tmp_path)}),
+    )
+
+    assert [(h["id"], h["type"]) for h, _ in frames] == [
+        (1, "error"),
+        (2, "error"),
+        (3, "stat"),
+    ]
+    assert frames[2][0]["is_dir"] is True
@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from bifrost.infra import detached
+from bifrost.infra.detached import DetachedRun
+from bifrost.shared import ConfigError, RunMetadata, SetupConfig
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="POSIX shell")
+
+
+@pytest.fixture
+def setup(tmp_path: Path) -> SetupConfig:
+    return SetupConfig(
+        name="bench", host="localhost", user="ci", transport="local", root=str(tmp_path)
+    )
+
+
+def _launch(setup: SetupConfig, command: str, run_id: str = "run1") -> RunMetadata:
+    metadata = RunMetadata(run_id=run_id, setup=setup.name, ref=None, command=[command])
+    detached.launch(setup, metadata)
+    return metadata
+
+
+def _wait(setup: SetupConfig, run_id: str = "run1") -> DetachedRun:
+    deadline = time.monotonic() + 10
+    run = detached.poll(setup, run_id)
+    while run.running and time.monotonic() < deadline:
+        time.sleep(0.05)
+        run = detached.poll(setup, run_id)
+    return run
+
+
+class TestDetachedRuns:
+    def test_reports_output_and_exit_code(self, setup: SetupConfig) -> None:
+        metadata = _launch(setup, "echo one; echo two >&2; exit 3")
+
+        run = _wait(setup)
+
+        assert run.state == "exited"
+        assert run.metadata.exit_code == 3
+        assert run.metadata.command == metadata.command
+        assert run.output == "one\ntwo\n"
+        assert run.offset == 2
+
+    def test_polls_from_an_offset_in_chunks(self, setup: SetupConfig) -> None:
+        _launch(setup, "seq 1 5")
+        _wait(setup)
+
+        first = detached.poll(setup, "run1", offset=1, lines=2)
+        rest = detached.poll(setup, "run1", offset=first.offset, lines=2)
+
+        assert (first.output, first.offset, first.more) == ("2\n3\n", 3, True)
+        assert (rest.output, rest.offset) == ("4\n5\n", 5)
+
+    def test_holds_back_a_partial_line_while_running(self, setup: SetupConfig) -> None:
+        _launch(setup, "echo done; printf part; sleep 30")
+        time.sleep(0.3)
+
+        run = detached.poll(setup, "run1")
+        detached.cancel(setup, "run1")
+
+        assert run.running
+        assert run.output == "done\n"
+        assert run.offset == 1
+
+    def test_cancel_stops_the_command(self, setup: SetupConfig) -> None:
+        _launch(setup, "sleep 30")
+
+        assert detached.cancel(setup, "run1")
+        run = detached.poll(setup, "run1", lines=0)
+
+        assert run.state == "exited"
+        assert run.metadata.exit_code == 143
+        assert not detached.cancel(setup, "run1")
+
+    def test_cancel_without_setsid_stops_the_whole_tree(
+        self, setup: SetupConfig, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            detached,
+            "_LAUNCH_SCRIPT",
+            detached._LAUNCH_SCRIPT.replace("setsid=setsid", "setsid="),
+        )
+        _launch(setup, "sleep 30 & echo $!; wait")
+        output = tmp_path / detached.remote_run_dir(setup, "run1") / "output.log"
+        deadline = time.monotonic() + 10
+        while not output.read_text():
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        grandchild = Path(f"/proc/{output.read_text().strip()}/stat")
+
+        assert detached.cancel(setup, "run1")
+
+        assert not grandchild.exists() or grandchild.read_text().split()[2] == "Z"
+
+    def test_releases_the_runs_lease_on_exit(
+        self, setup: SetupConfig, tmp_path: Path
+    ) -> None:
+        lease = tmp_path / setup.logs.remote_log_dir / "lease.json"
+        lease.parent.mkdir(parents=True)
+        lease.write_text(json.dumps({"owner": "ci@dev", "run_id": "run1"}))
+
+        _launch(setup, "true")
+        _wait(setup)
+
+        assert not lease.exists()
+
+    def test_renews_the_runs_lease_while_running(
+        self, setup: SetupConfig, tmp_path: Path
+    ) -> None:
+        lease = tmp_path / setup.logs.remote_log_dir / "lease.json"
+        lease.parent.mkdir(parents=True)
+        lease.write_text(
+            json.dumps({"owner": "ci@dev", "run_id": "run1", "expires_at": 0})
+        )
+        metadata = RunMetadata(
+            run_id="run1", setup=setup.name, ref=None, command=["sleep 30"]
+        )
+
+        detached.launch(setup, metadata, ttl=600, renew_interval=1)
+        deadline = time.monotonic() + 10
+        while json.loads(lease.read_text())["expires_at"] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        detached.cancel(setup, "run1")
+
+        assert not lease.exists()
+
+    def test_unknown_run(self, setup: SetupConfig) -> None:
+        with pytest.raises(ConfigError, match="No detached run 'nope'"):
+            detached.poll(setup, "nope")
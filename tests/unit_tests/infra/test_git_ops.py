@@ -0,0 +1,50 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from bifrost.infra.git_ops import add_worktree, remove_worktree
+from bifrost.shared import SetupConfig, SshError
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="POSIX shell")
+
+
+@pytest.fixture
+def setup(tmp_path: Path) -> SetupConfig:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git(
+        "-c",
+        "user.name=ci",
+        "-c",
+        "user.email=ci@lab",
+        "commit",
+        "-q",
+        "--allow-empty",
+        "-m",
+        "init",
+    )
+    return SetupConfig(
+        name="bench", host="localhost", user="ci", transport="local", root=str(tmp_path)
+    )
+
+
+class TestWorktrees:
+    def test_removing_the_last_worktree_removes_its_directory(
+        self, setup: SetupConfig, tmp_path: Path
+    ) -> None:
+        add_worktree(setup, ".bifrost/worktrees/a", "HEAD")
+        add_worktree(setup, ".bifrost/worktrees/b", "HEAD")
+
+        remove_worktree(setup, ".bifrost/worktrees/a")
+        assert (tmp_path / ".bifrost" / "worktrees").is_dir()
+        remove_worktree(setup, ".bifrost/worktrees/b")
+
+        assert not (tmp_path / ".bifrost" / "worktrees").exists()
+
+    def test_failed_removal_raises(self, setup: SetupConfig) -> None:
+        with pytest.raises(SshError, match="git worktree remove"):
+            remove_worktree(setup, ".bifrost/worktrees/missing")
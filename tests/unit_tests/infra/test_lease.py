@@ -0,0 +1,166 @@
+import subprocess
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from bifrost.infra.lease import LeaseStore
+from bifrost.shared import SetupConfig, SshError
+
+SETUP = SetupConfig(name="lab", host="10.0.0.1", user="ci")
+
+
+@pytest.fixture(autouse=True)
+def local_shell(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Run the lease scripts in a local shell instead of over SSH."""
+
+    def run_remote(
+        setup: SetupConfig, command: list[str], capture: bool = True
+    ) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            ["sh", "-c", " ".join(command)], capture_output=True, text=True
+        )
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("bifrost.infra.lease.run_remote", run_remote)
+
+
+class TestLeaseStore:
+    def test_acquires_free_setup(self) -> None:
+        state = LeaseStore(owner="alice@dev").try_acquire(SETUP, "run1")
+
+        assert state.acquired
+        assert state.holder is not None
+        assert state.holder.owner == "alice@dev"
+        assert state.holder.run_id == "run1"
+
+    def test_second_acquirer_sees_holder(self) -> None:
+        LeaseStore(owner="alice@dev").try_acquire(SETUP, "run1")
+
+        state = LeaseStore(owner="bob@dev").try_acquire(SETUP, "run2")
+
+        assert not state.acquired
+        assert state.holder is not None
+        assert state.holder.owner == "alice@dev"
+
+    def test_acquiring_again_is_idempotent(self) -> None:
+        store = LeaseStore(owner="alice@dev")
+        store.try_acquire(SETUP, "run1")
+
+        assert store.try_acquire(SETUP, "run1").acquired
+
+    def test_release_frees_setup(self) -> None:
+        store = LeaseStore(owner="alice@dev")
+        store.try_acquire(SETUP, "run1")
+
+        store.release(SETUP, "run1")
+
+        assert store.peek(SETUP).is_free
+
+    def test_release_ignores_foreign_lease(self) -> None:
+        LeaseStore(owner="alice@dev").try_acquire(SETUP, "run1")
+
+        LeaseStore(owner="bob@dev").release(SETUP, "run2")
+
+        holder = LeaseStore().peek(SETUP).holder
+        assert holder is not None
+        assert holder.run_id == "run1"
+
+    def test_recovers_expired_lease(self) -> None:
+        LeaseStore(owner="crashed@dev", ttl=-10).try_acquire(SETUP, "run1")
+
+        state = LeaseStore(owner="bob@dev").try_acquire(SETUP, "run2")
+
+        assert state.acquired
+        assert state.holder is not None
+        assert state.holder.owner == "bob@dev"
+
+    def test_recovers_corrupt_lease(self) -> None:
+        lease_file = Path(".bifrost/logs/lease.json")
+        lease_file.parent.mkdir(parents=True)
+        lease_file.write_text("garbage\n")
+
+        assert LeaseStore().try_acquire(SETUP, "run1").acquired
+
+    def test_waiters_acquire_in_arrival_order(self) -> None:
+        alice = LeaseStore(owner="alice@dev")
+        alice.try_acquire(SETUP, "run1")
+        bob = LeaseStore(owner="bob@dev")
+        carol = LeaseStore(owner="carol@dev")
+
+        assert not bob.try_acquire(SETUP, "run2", queue=True).acquired
+        # Tickets are ordered by second; make carol's strictly later.
+        ticket = next(Path(".bifrost/logs/lease-queue").iterdir())
+        ticket.rename(ticket.with_name(f"000000000000-{ticket.name.split('-')[1]}"))
+        assert carol.try_acquire(SETUP, "run3", queue=True).queued == 2
+
+        alice.release(SETUP, "run1")
+
+        assert not carol.try_acquire(SETUP, "run3", queue=True).acquired
+        assert not LeaseStore().try_acquire(SETUP, "run4").acquired
+        assert bob.try_acquire(SETUP, "run2", queue=True).acquired
+
+    def test_peek_reports_queue_length(self) -> None:
+        LeaseStore().try_acquire(SETUP, "run1")
+        LeaseStore().try_acquire(SETUP, "run2", queue=True)
+
+        state = LeaseStore().peek(SETUP)
+
+        assert state.queued == 1
+        assert not state.is_free
+
+    def test_renewal_extends_the_lease(self) -> None:
+        LeaseStore(owner="alice@dev", ttl=-10).try_acquire(SETUP, "run1")
+
+        assert LeaseStore(owner="alice@dev").renew(SETUP, "run1")
+
+        state = LeaseStore().peek(SETUP)
+        assert not state.is_free
+        assert state.expires_in is not None
+        assert state.expires_in > 3000
+
+    def test_renewal_of_a_foreign_lease_is_refused(self) -> None:
+        LeaseStore(owner="alice@dev", ttl=-10).try_acquire(SETUP, "run1")
+
+        assert not LeaseStore(owner="bob@dev").renew(SETUP, "run2")
+        assert LeaseStore().peek(SETUP).is_free
+
+    def test_expiry_is_judged_by_the_setups_clock(self) -> None:
+        LeaseStore(owner="alice@dev", ttl=60).try_acquire(SETUP, "run1")
+
+        # A local clock an hour ahead must not free the setup.
+        with patch("time.time", return_value=time.time() + 3600):
+            state = LeaseStore().peek(SETUP)
+
+        assert state.now is not None
+        assert not state.is_free
+
+    def test_keep_alive_renews_until_the_block_exits(self) -> None:
+        store = LeaseStore(owner="alice@dev", ttl=-10)
+        store.try_acquire(SETUP, "run1")
+
+        with (
+            patch.object(LeaseStore, "renew_interval", 0.01),
+            patch.object(store, "renew", wraps=store.renew) as renew,
+            store.keep_alive(SETUP, "run1"),
+        ):
+            deadline = time.monotonic() + 5
+            while not renew.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        calls = renew.call_count
+        time.sleep(0.05)
+
+        assert calls > 0
+        assert renew.call_count == calls
+
+    def test_raises_on_remote_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(
+            "bifrost.infra.lease.run_remote",
+            lambda setup, command: subprocess.CompletedProcess(
+                args=[], returncode=255, stdout="", stderr="unreachable"
+            ),
+        )
+
+        with pytest.raises(SshError, match="unreachable"):
+            LeaseStore().peek(SETUP)
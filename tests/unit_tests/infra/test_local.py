@@ -0,0 +1,109 @@
+import json
+import subprocess
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from bifrost.infra.local import LocalTransport
+from bifrost.infra.log_store import LogStore
+from bifrost.infra.ssh import SshTransport
+from bifrost.infra.transport import run_remote, transport_for
+from bifrost.shared import LogCopyError, RunMetadata, SetupConfig, SshError
+
+
+@pytest.fixture
+def setup(tmp_path: Path) -> SetupConfig:
+    return SetupConfig(
+        name="bench",
+        host="localhost",
+        user="ci",
+        transport="local",
+        root=str(tmp_path / "bench"),
+    )
+
+
+@pytest.fixture
+def root(setup: SetupConfig) -> Path:
+    assert setup.root is not None
+    path = Path(setup.root)
+    path.mkdir()
+    return path
+
+
+def test_transport_for_picks_by_setup() -> None:
+    ssh_setup = SetupConfig(name="lab-a", host="10.0.0.5", user="ci")
+    local_setup = SetupConfig(
+        name="bench", host="localhost", user="ci", transport="local"
+    )
+
+    assert isinstance(transport_for(ssh_setup), SshTransport)
+    assert isinstance(transport_for(local_setup), LocalTransport)
+
+
+class TestLocalTransport:
+    def test_runs_command_in_root_without_ssh(
+        self, setup: SetupConfig, root: Path
+    ) -> None:
+        with patch("bifrost.infra.ssh.run_remote") as ssh_run:
+            result = run_remote(setup, ["pwd", "&&", "echo", "$((1 + 1))"])
+
+        assert result.returncode == 0
+        assert result.stdout.split() == [str(root), "2"]
+        ssh_run.assert_not_called()
+
+    def test_timeout_raises_ssh_error(self, setup: SetupConfig, root: Path) -> None:
+        with (
+            patch(
+                "bifrost.infra.local.run_process",
+                side_effect=subprocess.TimeoutExpired(cmd="sh", timeout=600),
+            ),
+            pytest.raises(SshError, match="timed out on bench"),
+        ):
+            LocalTransport(setup).run(["sleep", "1000"])
+
+    def test_reachable_while_root_exists(self, setup: SetupConfig) -> None:
+        transport = LocalTransport(setup)
+
+        assert not transport.is_reachable()
+        Path(str(setup.root)).mkdir()
+        assert transport.is_reachable()
+
+    def test_fetch_dir_hard_links_files(
+        self, setup: SetupConfig, root: Path, tmp_path: Path
+    ) -> None:
+        stored = root / "logs/run1/reports/junit.xml"
+        stored.parent.mkdir(parents=True)
+        stored.write_text("<testsuite/>")
+        local_dir = tmp_path / "local"
+        local_dir.mkdir()
+
+        LocalTransport(setup).fetch_dir("logs/run1", local_dir)
+
+        copied = local_dir / "reports/junit.xml"
+        assert copied.read_text() == "<testsuite/>"
+        assert copied.stat().st_ino == stored.stat().st_ino
+
+    def test_fetch_dir_without_logs_raises(
+        self, setup: SetupConfig, root: Path, tmp_path: Path
+    ) -> None:
+        with pytest.raises(LogCopyError, match="No logs for bench"):
+            LocalTransport(setup).fetch_dir("logs/missing", tmp_path)
+
+
+def test_log_store_round_trip_keeps_stored_run_json(
+    setup: SetupConfig, root: Path, tmp_path: Path
+) -> None:
+    project = tmp_path / "project"
+    store = LogStore(local_project_root=project)
+    metadata = RunMetadata(run_id="run1", setup="bench", ref=None, command=["true"])
+
+    store.store_run_metadata(setup, metadata)
+    paths = store.copy_logs(setup, "run1")
+    store.write_local_metadata(setup, replace(metadata, exit_code=3))
+
+    assert paths == [".bifrost/run1/run.json"]
+    stored = json.loads((root / ".bifrost/logs/run1/run.json").read_text())
+    local = json.loads((project / paths[0]).read_text())
+    assert (stored["exit_code"], local["exit_code"]) == (0, 3)
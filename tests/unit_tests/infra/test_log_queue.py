@@ -0,0 +1,130 @@
+import json
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from bifrost.infra.log_queue import MAX_ATTEMPTS, RETRY_MAX, LogQueue, retry_delay
+from bifrost.shared import LogCopyError, RunMetadata, SetupConfig
+
+
+@pytest.fixture
+def setup(tmp_path: Path) -> SetupConfig:
+    return SetupConfig(
+        name="bench",
+        host="localhost",
+        user="ci",
+        transport="local",
+        root=str(tmp_path / "setup"),
+    )
+
+
+@pytest.fixture
+def metadata() -> RunMetadata:
+    return RunMetadata(
+        run_id="abc123",
+        setup="bench",
+        ref="main",
+        command=["make", "test"],
+        timestamp=datetime(2026, 1, 1, 0, 0, 0),
+        exit_code=0,
+        duration_s=1.5,
+        timings={"execute": 1.5},
+    )
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> LogQueue:
+    return LogQueue(tmp_path / "queue")
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    (tmp_path / "project").mkdir()
+    return tmp_path / "project"
+
+
+class TestLogQueue:
+    def test_jobs_round_trip(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        job = queue.enqueue(setup, metadata, project)
+
+        assert queue.jobs() == [job]
+        assert queue.jobs()[0].metadata == metadata
+
+    def test_skips_corrupt_job_files(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        queue.enqueue(setup, metadata, project)
+        (queue.worker_log.parent / "jobs" / "broken.json").write_text("{")
+
+        assert [job.run_id for job in queue.jobs()] == ["abc123"]
+
+    def test_ship_stores_copies_and_removes_the_job(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        run_dir = Path(setup.root or "") / setup.logs.remote_log_dir / "abc123"
+        run_dir.mkdir(parents=True)
+        (run_dir / "output.log").write_text("ok\n")
+        job = queue.enqueue(setup, metadata, project)
+
+        assert queue.ship(job)
+
+        local_run = project / setup.logs.local_log_dir / "abc123"
+        assert (local_run / "output.log").read_text() == "ok\n"
+        stored = json.loads((local_run / "run.json").read_text())
+        assert stored["exit_code"] == 0
+        assert sorted(stored["log_paths"]) == [
+            f"{setup.logs.local_log_dir}/abc123/output.log",
+            f"{setup.logs.local_log_dir}/abc123/run.json",
+        ]
+        assert queue.jobs() == []
+
+    def test_failed_ship_is_retried_with_backoff(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        job = queue.enqueue(setup, metadata, project)
+
+        with patch(
+            "bifrost.infra.log_store.LogStore.copy_logs",
+            side_effect=LogCopyError("rsync failed"),
+        ):
+            assert not queue.ship(job)
+
+        (retried,) = queue.jobs()
+        assert retried.attempts == 1
+        assert retried.stored
+        assert retried.last_error == "rsync failed"
+        assert retried.next_attempt_at > job.created_at
+
+    def test_gives_up_after_max_attempts(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        job = queue.enqueue(setup, metadata, project)
+        queue.save(replace(job, attempts=MAX_ATTEMPTS))
+
+        # A worker leaves failed jobs alone until they are retried.
+        assert queue.work() == 0
+        assert queue.jobs()[0].failed
+
+        (retried,) = queue.retry("abc123")
+        assert retried.attempts == 0
+        assert not queue.jobs()[0].failed
+
+    def test_work_ships_due_jobs(
+        self, queue: LogQueue, setup: SetupConfig, metadata: RunMetadata, project: Path
+    ) -> None:
+        queue.enqueue(setup, metadata, project)
+        queue.enqueue(setup, replace(metadata, run_id="def456"), project)
+
+        assert queue.work() == 2
+        assert queue.jobs() == []
+        assert not queue.worker_running()
+
+
+def test_retry_delay_doubles_up_to_a_cap() -> None:
+    assert [retry_delay(n) for n in (1, 2, 3)] == [15.0, 30.0, 60.0]
+    assert retry_delay(MAX_ATTEMPTS + 10) == RETRY_MAX
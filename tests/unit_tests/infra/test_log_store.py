@@ -1,4 +1,7 @@
+import json
+import os
 import subprocess
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch
@@ -30,13 +33,31 @@ def metadata() -> RunMetadata:
     )
 
 
+class TestWriteLocalMetadata:
+    def test_replaces_local_run_json(
+        self, setup: SetupConfig, metadata: RunMetadata, tmp_path: Path
+    ) -> None:
+        store = LogStore(local_project_root=tmp_path)
+        run_json = tmp_path / ".bifrost" / "lab-a" / "abc123" / "run.json"
+        run_json.parent.mkdir(parents=True)
+        run_json.write_text("{}")
+        timed = replace(metadata, timings={"execute": 1.5, "copy": 0.2})
+
+        store.write_local_metadata(setup, timed)
+
+        assert json.loads(run_json.read_text())["timings"] == {
+            "execute": 1.5,
+            "copy": 0.2,
+        }
+
+
 class TestStoreRunMetadata:
     def test_creates_remote_dir_and_writes_json(
         self, setup: SetupConfig, metadata: RunMetadata, tmp_path: Path
     ) -> None:
         store = LogStore(local_project_root=tmp_path)
 
-        with patch("bifrost.infra.log_store.run_remote") as mock_run:
+        with patch("bifrost.infra.ssh.run_remote") as mock_run:
             mock_run.return_value = subprocess.CompletedProcess(
                 args=[], returncode=0, stdout="", stderr=""
             )
@@ -55,7 +76,7 @@ class TestCopyLogs:
     ) -> None:
         store = LogStore(local_project_root=tmp_path)
 
-        with patch("bifrost.infra.log_store.subprocess.run") as mock_run:
+        with patch("bifrost.infra.ssh.subprocess.run") as mock_run:
             mock_run.return_value = subprocess.CompletedProcess(
                 args=[], returncode=0, stdout="", stderr=""
             )
@@ -75,7 +96,7 @@ class TestCopyLogs:
     def test_raises_on_rsync_failure(self, setup: SetupConfig, tmp_path: Path) -> None:
         store = LogStore(local_project_root=tmp_path)
 
-        with patch("bifrost.infra.log_store.subprocess.run") as mock_run:
+        with patch("bifrost.infra.ssh.subprocess.run") as mock_run:
             mock_run.return_value = subprocess.CompletedProcess(
                 args=[], returncode=1, stdout="", stderr="connection refused"
             )
@@ -88,9 +109,29 @@ class TestCopyLogs:
 
         with (
             patch(
-                "bifrost.infra.log_store.subprocess.run",
+                "bifrost.infra.ssh.subprocess.run",
                 side_effect=subprocess.TimeoutExpired(cmd="rsync", timeout=120),
             ),
             pytest.raises(LogCopyError, match="rsync failed"),
         ):
             store.copy_logs(setup, "abc123")
+
+
+class TestRecentDurations:
+    def test_reads_durations_of_setup_newest_first(
+        self, setup: SetupConfig, tmp_path: Path
+    ) -> None:
+        runs = [("old", "lab-a", 30.0), ("other", "lab-b", 99.0), ("new", "lab-a", 10)]
+        for mtime, (run_id, setup_name, duration) in enumerate(runs):
+            run_file = tmp_path / ".bifrost/lab-a" / run_id / "run.json"
+            run_file.parent.mkdir(parents=True)
+            run_file.write_text(
+                json.dumps({"setup": setup_name, "duration_s": duration})
+            )
+            os.utime(run_file, (mtime, mtime))
+        (tmp_path / ".bifrost/lab-a/broken").mkdir()
+        (tmp_path / ".bifrost/lab-a/broken/run.json").write_text("{")
+
+        durations = LogStore(local_project_root=tmp_path).recent_durations(setup)
+
+        assert durations == [10.0, 30.0]
@@ -1,13 +1,23 @@
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
+from bifrost.infra import trace
 from bifrost.infra.pipeline_gate import (
     GitLabPipelineGate,
     NonePipelineGate,
+    PipelineGateRegistry,
     create_pipeline_gate,
+    get_http_client,
 )
-from bifrost.shared import ConfigError, PipelineConfig
+from bifrost.shared import CiConfig, ConfigError, PipelineConfig, PipelineGateError
 
 GITLAB_CONFIG = PipelineConfig(
     url="https://gitlab.example.com",
@@ -35,11 +45,9 @@ class TestGitLabPipelineGate:
         with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
             gate = GitLabPipelineGate(GITLAB_CONFIG)
 
-        mock_response = MagicMock()
-        mock_response.json.return_value = [{"id": 1, "status": "running"}]
-        mock_response.raise_for_status = MagicMock()
+        client = _client_returning({"running": [{"id": 1, "status": "running"}]})
 
-        with patch("bifrost.infra.pipeline_gate.httpx.get", return_value=mock_response):
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
             result = gate.is_busy("office-a")
 
             assert result is True
@@ -48,11 +56,9 @@ class TestGitLabPipelineGate:
         with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
             gate = GitLabPipelineGate(GITLAB_CONFIG)
 
-        mock_response = MagicMock()
-        mock_response.json.return_value = []
-        mock_response.raise_for_status = MagicMock()
+        client = _client_returning({})
 
-        with patch("bifrost.infra.pipeline_gate.httpx.get", return_value=mock_response):
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
             result = gate.is_busy("office-a")
 
             assert result is False
@@ -61,18 +67,202 @@ class TestGitLabPipelineGate:
         with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
             gate = GitLabPipelineGate(GITLAB_CONFIG)
 
-        responses = [
-            MagicMock(json=MagicMock(return_value=[]), raise_for_status=MagicMock()),
-            MagicMock(
-                json=MagicMock(return_value=[{"id": 2}]),
-                raise_for_status=MagicMock(),
-            ),
-        ]
+        client = _client_returning({"pending": [{"id": 2}]})
 
-        with patch("bifrost.infra.pipeline_gate.httpx.get", side_effect=responses):
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
             result = gate.is_busy("office-a")
 
             assert result is True
+            queried = {
+                call.kwargs["params"]["status"] for call in client.get.call_args_list
+            }
+            assert queried == {"running", "pending"}
+
+    def test_reuses_cached_answer_across_gates(self) -> None:
+        client = _client_returning({"running": [{"id": 1}]})
+
+        with (
+            patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}),
+            patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client),
+        ):
+            assert GitLabPipelineGate(GITLAB_CONFIG).is_busy("office-a") is True
+            assert GitLabPipelineGate(GITLAB_CONFIG).is_busy("office-b") is True
+
+        assert client.get.call_count == 2
+
+    def test_revalidates_expired_answer_with_etag(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG, cache_ttl=0)
+
+        responses = iter(
+            [
+                httpx.Response(200, json=[{"id": 1}], headers={"ETag": 'W/"p1"'}),
+                httpx.Response(200, json=[], headers={"ETag": 'W/"r1"'}),
+                httpx.Response(304),
+                httpx.Response(304),
+            ]
+        )
+        client = MagicMock(get=MagicMock(side_effect=lambda *a, **kw: next(responses)))
+
+        with (
+            patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client),
+            patch("bifrost.infra.pipeline_gate.ThreadPoolExecutor", _SerialExecutor),
+        ):
+            assert gate.is_busy("office-a") is True
+            assert gate.is_busy("office-a") is True
+
+        revalidations = client.get.call_args_list[2:]
+        assert [c.kwargs["headers"]["If-None-Match"] for c in revalidations] == [
+            'W/"p1"',
+            'W/"r1"',
+        ]
+
+    def test_retries_after_rate_limit(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "2"}),
+                httpx.Response(200, json=[]),
+                httpx.Response(200, json=[]),
+            ]
+        )
+        client = MagicMock(get=MagicMock(side_effect=lambda *a, **kw: next(responses)))
+
+        with (
+            patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client),
+            patch("bifrost.infra.pipeline_gate.ThreadPoolExecutor", _SerialExecutor),
+            patch("bifrost.infra.pipeline_gate.time.sleep") as mock_sleep,
+        ):
+            assert gate.is_busy("office-a") is False
+
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_raises_gate_error_when_rate_limit_persists(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+
+        client = MagicMock(get=MagicMock(return_value=httpx.Response(429)))
+
+        with (
+            patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client),
+            patch("bifrost.infra.pipeline_gate.time.sleep"),
+            pytest.raises(PipelineGateError, match="Rate limited"),
+        ):
+            gate.is_busy("office-a")
+
+    def test_raises_gate_error_on_connection_failure(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+
+        client = MagicMock(get=MagicMock(side_effect=httpx.ConnectError("refused")))
+
+        with (
+            patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client),
+            pytest.raises(PipelineGateError, match="refused"),
+        ):
+            gate.is_busy("office-a")
+
+    def test_traces_requests_without_token(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+        client = _client_returning({"running": [{"id": 1, "status": "running"}]})
+        recorder = trace.start_tracing()
+
+        try:
+            with patch(
+                "bifrost.infra.pipeline_gate.get_http_client", return_value=client
+            ):
+                gate.is_busy("office-a")
+        finally:
+            trace.stop_tracing()
+
+        events = [e for e in recorder.events if e["ph"] == "X"]
+        assert events
+        assert all(event["name"] == "GET" for event in events)
+        assert all(event["args"]["status"] == 200 for event in events)
+        assert "test-token" not in json.dumps(events)
+
+
+class TestGitLabJobFilter:
+    def test_busy_only_when_matching_job_is_active(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+        jobs = [
+            {"name": "lint", "tag_list": ["docker"]},
+            {"name": "hil-smoke", "tag_list": ["hw-lab-b"]},
+        ]
+        client = MagicMock(
+            get=MagicMock(return_value=httpx.Response(200, json=jobs)),
+        )
+
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
+            assert gate.is_busy("lab-a", CiConfig(tags=("hw-lab-a",))) is False
+            assert gate.is_busy("lab-b", CiConfig(tags=("hw-lab-b",))) is True
+            assert gate.is_busy("lab-c", CiConfig(jobs=("hil-*",))) is True
+
+        client.get.assert_called_once()
+        params = client.get.call_args.kwargs["params"]
+        assert params["scope[]"] == ["pending", "running"]
+
+    def test_fetches_remaining_pages(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+
+        def get(url: str, **kwargs: Any) -> httpx.Response:
+            page = kwargs["params"]["page"]
+            job = {"name": f"job-{page}", "tag_list": [f"tag-{page}"]}
+            return httpx.Response(200, json=[job], headers={"X-Total-Pages": "3"})
+
+        client = MagicMock(get=MagicMock(side_effect=get))
+
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
+            assert gate.is_busy("lab", CiConfig(tags=("tag-3",))) is True
+
+        pages = sorted(c.kwargs["params"]["page"] for c in client.get.call_args_list)
+        assert pages == [1, 2, 3]
+
+    def test_without_filter_checks_pipelines(self) -> None:
+        with patch.dict("os.environ", {"GITLAB_TOKEN": "test-token"}):
+            gate = GitLabPipelineGate(GITLAB_CONFIG)
+        client = _client_returning({"running": [{"id": 1}]})
+
+        with patch("bifrost.infra.pipeline_gate.get_http_client", return_value=client):
+            assert gate.is_busy("lab", CiConfig()) is True
+
+        assert all("/pipelines" in c.args[0] for c in client.get.call_args_list)
+
+
+class _SerialExecutor:
+    """Stand-in for ThreadPoolExecutor that runs tasks in order."""
+
+    def __init__(self, max_workers: int) -> None:
+        pass
+
+    def __enter__(self) -> "_SerialExecutor":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+        return iter([fn(item) for item in items])
+
+
+class TestGetHttpClient:
+    def test_returns_shared_client(self) -> None:
+        assert get_http_client() is get_http_client()
+
+
+def _client_returning(
+    pipelines_by_status: dict[str, list[dict[str, Any]]],
+) -> MagicMock:
+    def get(url: str, **kwargs: Any) -> httpx.Response:
+        status = kwargs["params"]["status"]
+        return httpx.Response(200, json=pipelines_by_status.get(status, []))
+
+    return MagicMock(get=MagicMock(side_effect=get))
 
 
 class TestCreatePipelineGate:
@@ -86,3 +276,79 @@ class TestCreatePipelineGate:
             gate = create_pipeline_gate(GITLAB_CONFIG)
 
         assert isinstance(gate, GitLabPipelineGate)
+
+
+class TestPipelineGateRegistry:
+    def test_builds_one_gate_per_pipeline(self) -> None:
+        factory = MagicMock(side_effect=lambda config: MagicMock())
+        registry = PipelineGateRegistry(factory)
+
+        gate = registry.gate_for(GITLAB_CONFIG)
+
+        assert registry.gate_for(GITLAB_CONFIG) is gate
+        factory.assert_called_once_with(GITLAB_CONFIG)
+
+    def test_memoizes_answers(self) -> None:
+        gate = MagicMock(is_busy=MagicMock(return_value=True))
+        registry = PipelineGateRegistry(lambda config: gate)
+
+        assert registry.is_busy(GITLAB_CONFIG, "office-a") is True
+        assert registry.is_busy(GITLAB_CONFIG, "office-b") is True
+        gate.is_busy.assert_called_once_with("office-a", None)
+
+    def test_memoizes_per_ci_filter(self) -> None:
+        gate = MagicMock(is_busy=MagicMock(return_value=False))
+        registry = PipelineGateRegistry(lambda config: gate)
+
+        registry.is_busy(GITLAB_CONFIG, "lab-a", CiConfig(tags=("a",)))
+        registry.is_busy(GITLAB_CONFIG, "lab-b", CiConfig(tags=("b",)))
+        registry.is_busy(GITLAB_CONFIG, "lab-a2", CiConfig(tags=("a",)))
+
+        assert gate.is_busy.call_count == 2
+
+    def test_requeries_after_max_age(self) -> None:
+        gate = MagicMock(is_busy=MagicMock(return_value=False))
+        registry = PipelineGateRegistry(lambda config: gate, max_age=0)
+
+        registry.is_busy(GITLAB_CONFIG, "office-a")
+        time.sleep(0.01)
+        registry.is_busy(GITLAB_CONFIG, "office-a")
+
+        assert gate.is_busy.call_count == 2
+
+    def test_coalesces_concurrent_queries(self) -> None:
+        release = threading.Event()
+        gate = MagicMock(
+            is_busy=MagicMock(side_effect=lambda name, ci: release.wait(5))
+        )
+        registry = PipelineGateRegistry(lambda config: gate)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(registry.is_busy, GITLAB_CONFIG, f"lab-{i}")
+                for i in range(4)
+            ]
+            time.sleep(0.05)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [True] * 4
+        gate.is_busy.assert_called_once()
+
+    def test_does_not_memoize_failures(self) -> None:
+        gate = MagicMock(is_busy=MagicMock(side_effect=[RuntimeError("down"), False]))
+        registry = PipelineGateRegistry(lambda config: gate)
+
+        with pytest.raises(RuntimeError, match="down"):
+            registry.is_busy(GITLAB_CONFIG, "office-a")
+
+        assert registry.is_busy(GITLAB_CONFIG, "office-a") is False
+
+    def test_forget_drops_memoized_answers(self) -> None:
+        gate = MagicMock(is_busy=MagicMock(side_effect=[True, False]))
+        registry = PipelineGateRegistry(lambda config: gate)
+
+        assert registry.is_busy(GITLAB_CONFIG, "office-a") is True
+        registry.forget()
+
+        assert registry.is_busy(GITLAB_CONFIG, "office-a") is False
@@ -1,9 +1,19 @@
+import shutil
 import subprocess
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from bifrost.infra.ssh import check_reachable, run_remote
+from bifrost.infra.ssh import (
+    check_reachable,
+    persistent_connection,
+    run_remote,
+    shared_connection,
+    ssh_options,
+)
 from bifrost.shared import SetupConfig, SshError
 
 
@@ -48,6 +58,88 @@ class TestRunRemote:
         ):
             run_remote(setup, ["pytest"])
 
+    def test_reuses_shared_connection(self, setup: SetupConfig) -> None:
+        with patch("bifrost.infra.ssh.subprocess.run") as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=0, stdout="", stderr=""
+            )
+
+            with shared_connection(setup):
+                run_remote(setup, ["true"])
+
+            master_args, run_args, exit_args = (
+                call[0][0] for call in mock_run.call_args_list
+            )
+            assert "ControlMaster=yes" in master_args
+            control_option = next(
+                a for a in master_args if a.startswith("ControlPath=")
+            )
+            assert control_option in run_args
+            assert exit_args[-3:] == ["-O", "exit", "ci@10.0.0.5"]
+
+    def test_shared_connection_raises_when_master_fails(
+        self, setup: SetupConfig
+    ) -> None:
+        with patch("bifrost.infra.ssh.subprocess.run") as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=255, stdout="", stderr="refused"
+            )
+
+            with pytest.raises(SshError, match="refused"), shared_connection(setup):
+                pass
+
+
+class TestPersistentConnection:
+    @pytest.fixture
+    def short_cache(self, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+        cache_home = Path(tempfile.mkdtemp(prefix="bf-"))
+        monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+        yield cache_home
+        shutil.rmtree(cache_home, ignore_errors=True)
+
+    def test_first_call_opens_a_lingering_master(
+        self, setup: SetupConfig, short_cache: Path
+    ) -> None:
+        with persistent_connection(setup, persist=30):
+            options = ssh_options(setup)
+
+        control_path = options[1].removeprefix("ControlPath=")
+        assert Path(control_path).parent == short_cache / "bifrost" / "ssh"
+        assert options[2:] == [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            "ControlPersist=30",
+        ]
+        assert ssh_options(setup) == []
+
+    def test_same_target_shares_the_socket(
+        self, setup: SetupConfig, short_cache: Path
+    ) -> None:
+        twin = SetupConfig(name="lab-a-again", host=setup.host, user=setup.user)
+
+        with persistent_connection(setup), persistent_connection(twin):
+            assert ssh_options(setup)[:2] == ssh_options(twin)[:2]
+
+    @pytest.mark.usefixtures("short_cache")
+    def test_defers_to_a_shared_connection(self, setup: SetupConfig) -> None:
+        with patch("bifrost.infra.ssh.subprocess.run") as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=0, stdout="", stderr=""
+            )
+            with shared_connection(setup), persistent_connection(setup):
+                options = ssh_options(setup)
+
+        assert len(options) == 2
+
+    def test_skipped_when_the_socket_path_is_too_long(
+        self, setup: SetupConfig, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/" + "x" * 80)
+
+        with persistent_connection(setup):
+            assert ssh_options(setup) == []
+
 
 class TestCheckReachable:
     def test_returns_true_when_ssh_succeeds(self, setup: SetupConfig) -> None:
@@ -1,10 +1,17 @@
+import os
+import time
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
+from bifrost.infra.name_cache import read_names
 from bifrost.shared import (
     BifrostConfig,
+    CiConfig,
     ConfigError,
     ConfigManager,
     LogConfig,
@@ -220,6 +227,71 @@ setups:
 
         assert config.setups["lab"].port == 2222
 
+    def test_loads_config_with_ci_filter(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        config_text = """\
+version: 1
+setups:
+  lab:
+    host: "1.2.3.4"
+    user: "ci"
+    ci:
+      tags: [hw-lab]
+      jobs: ["hil-*"]
+"""
+        path = tmp_config(config_text)
+
+        config = config_manager.read_config(path)
+
+        assert config.setups["lab"].ci == CiConfig(tags=("hw-lab",), jobs=("hil-*",))
+
+    def test_rejects_non_list_ci_tags(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(
+            "version: 1\nsetups:\n  lab:\n    host: h\n    user: u\n"
+            "    ci:\n      tags: hw-lab\n"
+        )
+
+        with pytest.raises(ConfigError, match="'tags' must be a list of strings"):
+            config_manager.read_config(path)
+
+    def test_parses_pools(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(
+            "version: 1\nsetups:\n"
+            "  lab-a:\n    host: h\n    user: u\n    pools: [hil]\n"
+            "  lab-b:\n    host: h\n    user: u\n    pools: [hil, nightly]\n"
+            "  other:\n    host: h\n    user: u\n"
+        )
+
+        config = config_manager.read_config(path)
+
+        assert config.setups["lab-b"].pools == ("hil", "nightly")
+        assert [s.name for s in config.pool_members("hil")] == ["lab-a", "lab-b"]
+        assert config.pool_members("missing") == []
+
+    def test_parses_labels(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(
+            MINIMAL_CONFIG + "    labels:\n      lab: berlin\n      gen: 3\n"
+        )
+
+        config = config_manager.read_config(path)
+
+        assert config.setups["lab"].labels == {"lab": "berlin", "gen": "3"}
+
+    def test_rejects_labels_with_selector_syntax(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(MINIMAL_CONFIG + "    labels:\n      lab: a,b\n")
+
+        with pytest.raises(ConfigError, match="label"):
+            config_manager.read_config(path)
+
 
 class TestConfigToDict:
     def test_minimal(self) -> None:
@@ -282,6 +354,35 @@ class TestConfigToDict:
 
         assert "port" not in result["setups"]["lab"]
 
+    def test_includes_ci_filter_only_when_set(self) -> None:
+        setup = SetupConfig(
+            name="lab", host="10.0.0.1", user="ci", ci=CiConfig(tags=("hw",))
+        )
+        config = BifrostConfig(setups={"lab": setup, "plain": _minimal_setup("plain")})
+
+        result = config.to_dict()
+
+        assert result["setups"]["lab"]["ci"] == {"tags": ["hw"]}
+        assert "ci" not in result["setups"]["plain"]
+
+    def test_includes_labels_only_when_set(self) -> None:
+        setup = _minimal_setup()
+        labelled = SetupConfig(
+            name="lab", host="10.0.0.1", user="ci", labels={"lab": "berlin"}
+        )
+
+        assert "labels" not in setup.to_dict()
+        assert labelled.to_dict()["labels"] == {"lab": "berlin"}
+
+    def test_includes_pools_only_when_set(self) -> None:
+        setup = SetupConfig(name="lab", host="10.0.0.1", user="ci", pools=("hil",))
+        config = BifrostConfig(setups={"lab": setup, "plain": _minimal_setup("plain")})
+
+        result = config.to_dict()
+
+        assert result["setups"]["lab"]["pools"] == ["hil"]
+        assert "pools" not in result["setups"]["plain"]
+
 
 class TestWriteConfigRoundTrip:
     def test_round_trip(self, tmp_path: Path, config_manager: ConfigManager) -> None:
@@ -327,3 +428,412 @@ class TestWriteConfigRoundTrip:
         loaded = config_manager.read_config(target)
 
         assert loaded.setups["a"].port == 2222
+
+
+def _age(path: Path, seconds: float = 60) -> None:
+    """Backdate `path` so it is old enough to be snapshotted."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+class TestCompiledConfigCache:
+    def test_unchanged_config_is_not_parsed_again(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        _age(path)
+        first = config_manager.read_config(path)
+
+        with patch.object(ConfigManager, "_parse") as parse:
+            second = ConfigManager().read_config(path)
+
+        parse.assert_not_called()
+        assert second == first
+
+    def test_process_reuses_loaded_layers(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        _age(path)
+        first = config_manager.read_config(path)
+
+        with patch("bifrost.shared.config_manager._load_snapshot") as load:
+            second = ConfigManager().read_config(path)
+
+        load.assert_not_called()
+        assert second == first
+
+    def test_modified_config_is_parsed_again(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        _age(path, 120)
+        config_manager.read_config(path)
+
+        path.write_text(MINIMAL_CONFIG)
+        _age(path)
+        loaded = config_manager.read_config(path)
+
+        assert list(loaded.setups) == ["lab"]
+
+    def test_recently_modified_config_is_not_snapshotted(
+        self, tmp_config: Callable[[str], Path], config_manager: ConfigManager
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        config_manager.read_config(path)
+
+        with patch.object(
+            ConfigManager, "_parse", wraps=config_manager._parse
+        ) as parse:
+            config_manager.read_config(path)
+
+        parse.assert_called_once_with(path)
+
+    def test_ignores_corrupt_snapshot(
+        self,
+        tmp_config: Callable[[str], Path],
+        config_manager: ConfigManager,
+        isolated_cache: Path,
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        _age(path)
+        config_manager.read_config(path)
+        for snapshot in (isolated_cache / "bifrost" / "config").iterdir():
+            snapshot.write_bytes(b"not a pickle")
+
+        loaded = config_manager.read_config(path)
+
+        assert set(loaded.setups) == {"office-a", "office-b"}
+
+    def test_cache_can_be_disabled(
+        self, tmp_config: Callable[[str], Path], isolated_cache: Path
+    ) -> None:
+        path = tmp_config(VALID_CONFIG)
+        _age(path)
+
+        ConfigManager(use_cache=False).read_config(path)
+
+        assert not (isolated_cache / "bifrost" / "config").exists()
+
+
+INVENTORY = """\
+version: 1
+pipelines:
+  main:
+    url: "https://gitlab.example.com"
+    project_id: 1
+    token_env: "GITLAB_TOKEN"
+setups:
+  bench-1:
+    host: "10.0.0.1"
+    user: "ci"
+    pipeline: main
+  bench-2:
+    host: "10.0.0.2"
+    user: "ci"
+"""
+
+
+@pytest.fixture
+def layered(tmp_path: Path) -> Path:
+    """A project config including a shared inventory and overriding bench-2."""
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "shared" / "inventory.yml").write_text(INVENTORY)
+    project = tmp_path / ".bifrost.yml"
+    project.write_text(
+        """\
+version: 1
+include:
+  - shared/inventory.yml
+defaults:
+  setup: bench-1
+setups:
+  bench-2:
+    host: "10.9.9.9"
+    user: "me"
+"""
+    )
+    return project
+
+
+class TestLayeredConfig:
+    def test_merges_included_files_below_the_including_file(
+        self, layered: Path, config_manager: ConfigManager
+    ) -> None:
+        config = config_manager.read_config(layered)
+
+        assert list(config.setups) == ["bench-1", "bench-2"]
+        assert config.setups["bench-1"].pipeline == "main"
+        assert config.setups["bench-2"].host == "10.9.9.9"
+        assert config.default_setup == "bench-1"
+
+    def test_merges_user_config_below_project_config(
+        self,
+        layered: Path,
+        tmp_path: Path,
+        config_manager: ConfigManager,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        user_config = tmp_path / "user.yml"
+        user_config.write_text(MINIMAL_CONFIG)
+        monkeypatch.setattr(
+            "bifrost.shared.config_manager.USER_CONFIG_DIR", user_config
+        )
+        monkeypatch.chdir(tmp_path)
+
+        config = config_manager.read_config()
+
+        assert list(config.setups) == ["lab", "bench-1", "bench-2"]
+
+    def test_rejects_include_cycles(
+        self, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        (tmp_path / "a.yml").write_text("version: 1\ninclude: [b.yml]\n")
+        (tmp_path / "b.yml").write_text("version: 1\ninclude: [a.yml]\n")
+
+        with pytest.raises(ConfigError, match="include cycle"):
+            config_manager.read_config(tmp_path / "a.yml")
+
+    def test_rejects_missing_include(
+        self, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        (tmp_path / "a.yml").write_text("version: 1\ninclude: [missing.yml]\n")
+
+        with pytest.raises(ConfigError, match=r"missing\.yml"):
+            config_manager.read_config(tmp_path / "a.yml")
+
+    def test_validates_references_across_layers(
+        self, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        (tmp_path / "a.yml").write_text(
+            "version: 1\ninclude: [b.yml]\nsetups:\n"
+            "  x:\n    host: h\n    user: u\n    pipeline: nope\n"
+        )
+        (tmp_path / "b.yml").write_text(INVENTORY)
+
+        with pytest.raises(ConfigError, match="unknown pipeline 'nope'"):
+            config_manager.read_config(tmp_path / "a.yml")
+
+    def test_only_changed_files_are_parsed_again(
+        self, layered: Path, config_manager: ConfigManager
+    ) -> None:
+        inventory = layered.parent / "shared" / "inventory.yml"
+        _age(inventory)
+        config_manager.read_config(layered)
+
+        manager = ConfigManager()
+        with patch.object(manager, "_parse", wraps=manager._parse) as parse:
+            manager.read_config(layered)
+
+        parse.assert_called_once_with(layered)
+
+
+class TestLayeredWrite:
+    def test_writes_changes_to_the_owning_layer(
+        self, layered: Path, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        user_config = tmp_path / "user.yml"
+        config = config_manager.read_config(layered)
+        new_setups = {
+            **config.setups,
+            "bench-2": replace(config.setups["bench-2"], host="10.9.9.10"),
+            "new": _minimal_setup("new"),
+        }
+
+        config_manager.write_config(
+            replace(config, setups=new_setups), path=user_config
+        )
+
+        assert "10.9.9.10" in layered.read_text()
+        assert list(ConfigManager().read_config(user_config).setups) == ["new"]
+        assert ConfigManager().read_config(layered).setups["bench-2"].host == (
+            "10.9.9.10"
+        )
+
+    def test_overrides_included_entries_in_the_including_config(
+        self, layered: Path, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        inventory = layered.parent / "shared" / "inventory.yml"
+        inventory_text = inventory.read_text()
+        config = config_manager.read_config(layered)
+        new_setups = {
+            **config.setups,
+            "bench-1": replace(config.setups["bench-1"], host="10.0.0.100"),
+        }
+
+        config_manager.write_config(
+            replace(config, setups=new_setups), path=tmp_path / "user.yml"
+        )
+
+        assert inventory.read_text() == inventory_text
+        assert "10.0.0.100" in layered.read_text()
+        merged = ConfigManager().read_config(layered)
+        assert merged.setups["bench-1"].host == "10.0.0.100"
+        assert merged.setups["bench-1"].pipeline == "main"
+        assert not (tmp_path / "user.yml").exists()
+
+    def test_refuses_to_remove_included_entries(
+        self, layered: Path, tmp_path: Path, config_manager: ConfigManager
+    ) -> None:
+        inventory = layered.parent / "shared" / "inventory.yml"
+        project_text = layered.read_text()
+        config = config_manager.read_config(layered)
+        remaining = {k: v for k, v in config.setups.items() if k != "bench-2"}
+
+        with pytest.raises(ConfigError, match=r"defined in .*inventory\.yml"):
+            config_manager.write_config(
+                replace(config, setups=remaining), path=tmp_path / "user.yml"
+            )
+
+        assert inventory.read_text() == INVENTORY
+        assert layered.read_text() == project_text
+
+
+class TestLockedWrites:
+    def test_concurrent_writers_do_not_lose_updates(self, tmp_path: Path) -> None:
+        (tmp_path / "etc").mkdir()
+        path = tmp_path / "etc" / "config.yml"
+        path.write_text(MINIMAL_CONFIG)
+
+        def add(index: int) -> None:
+            manager = ConfigManager()
+            config = manager.read_config(path)
+            setup = _minimal_setup(f"rig-{index}")
+            manager.write_config(
+                BifrostConfig(setups={**config.setups, setup.name: setup}), path=path
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(add, range(16)))
+
+        setups = ConfigManager().read_config(path).setups
+        assert set(setups) == {"lab", *(f"rig-{i}" for i in range(16))}
+        assert [p.name for p in path.parent.iterdir()] == ["config.yml"]
+
+    def test_keeps_file_mode(self, tmp_path: Path) -> None:
+        path = tmp_path / "config.yml"
+        path.write_text(MINIMAL_CONFIG)
+        path.chmod(0o640)
+        manager = ConfigManager()
+        config = manager.read_config(path)
+
+        manager.write_config(replace(config, default_setup="lab"), path=path)
+
+        assert path.stat().st_mode & 0o777 == 0o640
+
+    def test_writes_nothing_when_result_is_invalid(self, tmp_path: Path) -> None:
+        path = tmp_path / "config.yml"
+        path.write_text(MINIMAL_CONFIG)
+        manager = ConfigManager()
+        config = manager.read_config(path)
+        broken = SetupConfig(name="x", host="h", user="u", pipeline="missing")
+
+        with pytest.raises(ConfigError, match="unknown pipeline"):
+            manager.write_config(
+                BifrostConfig(setups={**config.setups, "x": broken}), path=path
+            )
+
+        assert path.read_text() == MINIMAL_CONFIG
+
+    def test_update_config_reads_and_writes_under_the_lock(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        user_config = tmp_path / "user.yml"
+        monkeypatch.setattr(
+            "bifrost.shared.config_manager.USER_CONFIG_DIR", user_config
+        )
+        monkeypatch.chdir(tmp_path)
+        setup = _minimal_setup("rig")
+
+        ConfigManager().update_config(
+            lambda config: replace(config, setups={**config.setups, "rig": setup})
+        )
+        ConfigManager().update_config(
+            lambda config: replace(config, default_setup="rig")
+        )
+
+        config = ConfigManager().read_config()
+        assert list(config.setups) == ["rig"]
+        assert config.default_setup == "rig"
+
+
+POOLED_CONFIG = """\
+version: 1
+pipelines:
+  main:
+    url: "https://gitlab.example.com"
+    project_id: 1
+    token_env: "GITLAB_TOKEN"
+setups:
+  rig-1:
+    host: "10.0.0.1"
+    user: "ci"
+    pipeline: main
+    pools: [gen4, nightly]
+  rig-2:
+    host: "10.0.0.2"
+    user: "ci"
+    pools: [gen4]
+"""
+
+
+class TestCompletionNames:
+    @pytest.fixture
+    def project(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+        monkeypatch.setattr(
+            "bifrost.shared.config_manager.USER_CONFIG_DIR", tmp_path / "user.yml"
+        )
+        monkeypatch.chdir(tmp_path)
+        project = tmp_path / ".bifrost.yml"
+        project.write_text(POOLED_CONFIG)
+        _age(project)
+        return project
+
+    def test_discovered_config_names_are_cached(self, project: Path) -> None:
+        ConfigManager().read_config()
+
+        assert read_names(os.getcwd()) == {
+            "setups": ["rig-1", "rig-2"],
+            "pipelines": ["main"],
+            "pools": ["gen4", "nightly"],
+        }
+
+    def test_config_read_by_path_is_not_cached(self, project: Path) -> None:
+        ConfigManager().read_config(project)
+
+        assert read_names(os.getcwd()) is None
+
+    def test_changed_config_file_makes_names_stale(self, project: Path) -> None:
+        ConfigManager().read_config()
+
+        project.write_text(POOLED_CONFIG + "# edited\n")
+
+        assert read_names(os.getcwd()) is None
+
+    def test_new_config_file_makes_names_stale(
+        self, project: Path, tmp_path: Path
+    ) -> None:
+        ConfigManager().read_config()
+
+        (tmp_path / "user.yml").write_text(MINIMAL_CONFIG)
+
+        assert read_names(os.getcwd()) is None
+
+    def test_recently_modified_config_is_not_cached(self, project: Path) -> None:
+        project.write_text(POOLED_CONFIG)
+
+        ConfigManager().read_config()
+
+        assert read_names(os.getcwd()) is None
+
+    def test_write_config_refreshes_names(self, project: Path) -> None:
+        manager = ConfigManager()
+        config = manager.read_config()
+
+        manager.write_config(
+            replace(config, setups={**config.setups, "rig-3": _minimal_setup("rig-3")})
+        )
+
+        names = read_names(os.getcwd())
+        assert names is not None
+        assert sorted(names["setups"]) == ["rig-1", "rig-2", "rig-3"]
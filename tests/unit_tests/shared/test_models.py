@@ -1,6 +1,8 @@
+import getpass
+
 import pytest
 
-from bifrost.shared import LogConfig, RunMetadata, SetupConfig
+from bifrost.shared import ConfigError, LogConfig, RunMetadata, SetupConfig
 
 
 class TestSetupConfig:
@@ -29,6 +31,39 @@ class TestSetupConfig:
 
         assert setup.port is None
 
+    def test_local_setup_needs_no_host_or_user(self) -> None:
+        setup = SetupConfig.from_mapping(
+            "bench", {"transport": "local", "root": "~/hil"}
+        )
+
+        assert setup.is_local
+        assert (setup.host, setup.user) == ("localhost", getpass.getuser())
+        assert setup.to_dict() == {"transport": "local", "root": "~/hil"}
+
+    def test_ssh_setup_to_dict_omits_transport(self) -> None:
+        setup = SetupConfig.from_mapping("lab-a", {"host": "10.0.0.1", "user": "ci"})
+
+        assert not setup.is_local
+        assert setup.to_dict() == {"host": "10.0.0.1", "user": "ci"}
+
+    def test_agent_round_trips(self) -> None:
+        raw = {"host": "10.0.0.1", "user": "ci", "agent": True}
+
+        assert SetupConfig.from_mapping("lab-a", raw).to_dict() == raw
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            {"transport": "telnet", "host": "h", "user": "u"},
+            {"host": "h", "user": "u", "root": "/srv"},
+            {"transport": "local", "agent": True},
+            {"host": "h", "user": "u", "agent": "yes"},
+        ],
+    )
+    def test_rejects_invalid_transport(self, raw: dict[str, str]) -> None:
+        with pytest.raises(ConfigError, match="transport"):
+            SetupConfig.from_mapping("lab-a", raw)
+
 
 class TestRunMetadata:
     def test_creates_with_defaults(self) -> None:
@@ -43,3 +78,25 @@ class TestRunMetadata:
         assert meta.exit_code == 0
         assert meta.log_paths == []
         assert meta.timestamp
+
+    def test_round_trips_through_dict(self) -> None:
+        meta = RunMetadata(
+            run_id="abc123",
+            setup="lab-a",
+            ref=None,
+            command=["pytest"],
+            exit_code=3,
+            log_paths=[".bifrost/lab-a/abc123/run.json"],
+            duration_s=1.25,
+            timings={"execute": 1.25},
+        )
+
+        assert RunMetadata.from_mapping(meta.to_dict()) == meta
+
+    def test_rejects_invalid_timestamp(self) -> None:
+        data = RunMetadata(
+            run_id="abc123", setup="lab-a", ref=None, command=["pytest"]
+        ).to_dict()
+
+        with pytest.raises(ConfigError, match="timestamp"):
+            RunMetadata.from_mapping({**data, "timestamp": "yesterday"})
@@ -0,0 +1,77 @@
+import pytest
+
+from bifrost.shared import BifrostConfig, ConfigError, Selector, SetupConfig
+from bifrost.shared.selector import LabelIndex, LabelTerm, parse_label
+
+FLEET = {
+    "ber-1": {"lab": "berlin", "dut": "gen3"},
+    "ber-2": {"lab": "berlin", "dut": "gen4", "broken": "yes"},
+    "mun-1": {"lab": "munich", "dut": "gen3"},
+    "bare": {},
+}
+
+
+class TestSelectorParse:
+    def test_parses_terms(self) -> None:
+        selector = Selector.parse("lab=berlin, dut!=gen3|gen4,flaky,!broken")
+
+        assert selector.terms == (
+            LabelTerm("lab", frozenset({"berlin"})),
+            LabelTerm("dut", frozenset({"gen3", "gen4"}), negate=True),
+            LabelTerm("flaky"),
+            LabelTerm("broken", negate=True),
+        )
+
+    @pytest.mark.parametrize(
+        "expression", ["", "lab=", "=berlin", "lab=berlin,,dut=gen3", "!lab=x", "a b"]
+    )
+    def test_rejects_malformed_expressions(self, expression: str) -> None:
+        with pytest.raises(ConfigError, match="Invalid selector"):
+            Selector.parse(expression)
+
+
+class TestLabelIndex:
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            ("lab=berlin", ["ber-1", "ber-2"]),
+            ("lab=berlin,dut=gen3", ["ber-1"]),
+            ("dut=gen3|gen4", ["ber-1", "ber-2", "mun-1"]),
+            ("lab!=berlin", ["mun-1", "bare"]),
+            ("dut,!broken", ["ber-1", "mun-1"]),
+            ("lab=paris", []),
+        ],
+    )
+    def test_selects_matching_names_in_order(
+        self, expression: str, expected: list[str]
+    ) -> None:
+        selector = Selector.parse(expression)
+
+        assert LabelIndex(FLEET).select(selector) == expected
+        assert [n for n, labels in FLEET.items() if selector.matches(labels)] == (
+            expected
+        )
+
+
+class TestBifrostConfigSelect:
+    def test_returns_setups_in_config_order(self) -> None:
+        config = BifrostConfig(
+            setups={
+                name: SetupConfig(name=name, host="h", user="u", labels=labels)
+                for name, labels in FLEET.items()
+            }
+        )
+
+        selected = config.select("dut=gen3")
+
+        assert [setup.name for setup in selected] == ["ber-1", "mun-1"]
+
+
+class TestParseLabel:
+    def test_parses_key_value(self) -> None:
+        assert parse_label("lab=berlin") == ("lab", "berlin")
+
+    @pytest.mark.parametrize("text", ["lab", "lab=", "lab=a|b"])
+    def test_rejects_invalid_labels(self, text: str) -> None:
+        with pytest.raises(ConfigError):
+            parse_label(text)